@@ -0,0 +1,12 @@
+-- File: migrations/001_owl_activity_log_event_key.sql
+-- Purpose: Idempotency key for owl_activity_log rows
+--
+-- push_log_to_supabase tags every row with event_key (camera|detection type|capture
+-- time, see make_event_key) and the activity log spool upserts batches on it, so a
+-- batch retried after a lost response doesn't insert the same events twice.
+-- Upserting on event_key needs this unique index. Run once in the Supabase SQL editor.
+
+alter table owl_activity_log add column if not exists event_key text;
+
+create unique index if not exists owl_activity_log_event_key
+    on owl_activity_log (event_key);
@@ -0,0 +1,21 @@
+-- File: migrations/002_get_alert_statistics.sql
+-- Purpose: Grouped alert statistics for the after action report
+--
+-- get_alert_statistics in push_to_supabase.py calls this function through rpc() to
+-- get the count and average confidence of every alert type in one query, instead of
+-- reading each activity log row of the period. Without it, the rows are read and
+-- aggregated in Python. Run once in the Supabase SQL editor.
+
+create or replace function get_alert_statistics(start_time timestamptz)
+returns table (alert_type text, alert_count bigint, average_confidence double precision)
+language sql stable as $$
+  select t.alert_type, count(*), avg(l.owl_confidence_score)
+  from owl_activity_log l
+  cross join lateral (values
+    ('Owl In Box', l.owl_in_box), ('Owl On Box', l.owl_on_box),
+    ('Owl In Area', l.owl_in_area), ('Two Owls', l.two_owls),
+    ('Two Owls In Box', l.two_owls_in_box), ('Eggs Or Babies', l.eggs_or_babies)
+  ) as t(alert_type, flag)
+  where l.created_at > start_time and t.flag = 1
+  group by t.alert_type;
+$$;
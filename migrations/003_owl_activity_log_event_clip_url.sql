@@ -0,0 +1,9 @@
+-- File: migrations/003_owl_activity_log_event_clip_url.sql
+-- Purpose: Link owl_activity_log rows to their event clips
+--
+-- When event recording is on, push_log_to_supabase stores the storage URL of the
+-- event's clip (uploaded once the clip is written, see upload_event_clip) on the
+-- activity log row. Without this column, clips are still recorded and uploaded but
+-- never linked to their row. Run once in the Supabase SQL editor.
+
+alter table owl_activity_log add column if not exists event_clip_url text;
@@ -34,7 +34,8 @@ if not EMAIL_PASSWORD:
     logger.error(error_msg)
     raise ValueError(error_msg)
 
-def send_email_alert(camera_name, alert_type, is_test=False, test_prefix="", image_url=None, alert_id=None):
+def send_email_alert(camera_name, alert_type, is_test=False, test_prefix="", image_url=None, alert_id=None,
+                     preview_url=None):
     """
     Send email alerts based on camera name and alert type.
     
@@ -45,6 +46,8 @@ def send_email_alert(camera_name, alert_type, is_test=False, test_prefix="", ima
         test_prefix (str, optional): Prefix to add for test alerts (e.g., "TEST: ")
         image_url (str, optional): URL to the comparison image
         alert_id (str, optional): Unique ID for the alert for tracking
+        preview_url (str, optional): URL to a downscaled preview shown inline;
+            the full image_url is still linked
     """
     # Check if email alerts are enabled
     if os.environ.get('OWL_EMAIL_ALERTS', 'True').lower() != 'true':
@@ -86,6 +89,8 @@ def send_email_alert(camera_name, alert_type, is_test=False, test_prefix="", ima
     # Ensure URL is valid and complete
     if image_url and not (image_url.startswith('http://') or image_url.startswith('https://')):
         image_url = f"https://{image_url}"
+    if preview_url and not (preview_url.startswith('http://') or preview_url.startswith('https://')):
+        preview_url = f"https://{preview_url}"
 
     # Get email subscribers
     subscribers = get_subscribers(notification_type="email", owl_location=alert_type)
@@ -129,7 +134,7 @@ def send_email_alert(camera_name, alert_type, is_test=False, test_prefix="", ima
                 if image_url:
                     html_content += f"""
                         <p><strong>Detection Image:</strong></p>
-                        <p><a href='{image_url}'><img src='{image_url}' 
+                        <p><a href='{image_url}'><img src='{preview_url or image_url}' 
                             alt='Detection Image' style='max-width: 600px; max-height: 400px;' /></a></p>
                         <p><small>If the image doesn't display, <a href='{image_url}'>click here</a> to view it.</small></p>
                     """
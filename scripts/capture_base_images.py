@@ -8,7 +8,6 @@
 # - Added additional image annotation for transition period captures
 
 import os
-import pyautogui
 from PIL import Image, ImageDraw, ImageFont
 import json
 from datetime import datetime
@@ -23,9 +22,14 @@ from utilities.constants import (
     BASE_IMAGES_DIR,
     CONFIGS_DIR,
     get_base_image_path,
-    get_saved_image_path,
 )
 from utilities.logging_utils import get_logger
+from utilities.frame_sources import ScreenFrameSource
+from utilities.frame_capture import read_camera_frame
+from utilities.frame_statistics import compute_frame_statistics
+from utilities.base_image_cache import invalidate_base_images
+from utilities.image_encoding import write_encoded_image
+from utilities.content_store import get_content_store, compute_content_hash
 from utilities.time_utils import (
     get_current_lighting_condition,
     is_lighting_condition_stable,
@@ -53,18 +57,14 @@ def capture_real_image(roi):
     Capture a screenshot of the specified region.
     
     Args:
-        roi (tuple): Region of interest (x, y, width, height)
+        roi (list): Region of interest [x1, y1, x2, y2]
     
     Returns:
         PIL.Image: Captured screenshot
     """
-    x, y, width, height = roi
-    width = abs(width - x)
-    height = abs(height - y)
-    logger.info(f"Capturing screenshot: x={x}, y={y}, width={width}, height={height}")
-    if width <= 0 or height <= 0:
-        raise ValueError(f"Invalid ROI dimensions: {roi}")
-    return pyautogui.screenshot(region=(x, y, width, height))
+    logger.info(f"Capturing screenshot: roi={roi}")
+    with ScreenFrameSource("screenshot", roi) as source:
+        return Image.fromarray(source.read())
 
 def get_latest_base_image(camera_name, lighting_condition):
     """
@@ -209,7 +209,7 @@ def add_lighting_annotation(image, lighting_condition, is_transition=False):
         logger.warning(f"Error adding annotation: {e}")
         return image  # Return original if annotation fails
 
-def save_base_image(image, camera_name, lighting_condition):
+def save_base_image(image, camera_name, lighting_condition, frame_statistics=None):
     """
     Save base image to fixed location and upload to Supabase.
     If local saving is enabled, also save a copy to the saved_images directory.
@@ -219,6 +219,8 @@ def save_base_image(image, camera_name, lighting_condition):
         image (PIL.Image): The base image to save
         camera_name (str): Name of the camera
         lighting_condition (str): Current lighting condition
+        frame_statistics (FrameStatistics, optional): Statistics computed when the
+            image was captured; computed from the image in memory if not given
         
     Returns:
         tuple: (local_path, supabase_url)
@@ -246,15 +248,18 @@ def save_base_image(image, camera_name, lighting_condition):
         if annotated_image.mode == "RGBA":
             annotated_image = annotated_image.convert("RGB")
             
-        annotated_image.save(base_path)
+        write_encoded_image(annotated_image, base_path, "base_image")
+        invalidate_base_images(base_path)
         logger.info(f"Saved base image: {base_path}")
         
+        # Identical content is only stored and uploaded once
+        content_hash = compute_content_hash(annotated_image)
+        
         # Check if local saving is enabled to save a copy to logs
         local_saving = os.getenv('OWL_LOCAL_SAVING', 'False').lower() == 'true'
         if local_saving:
-            # Save a copy with timestamp to the saved_images folder
-            saved_path = get_saved_image_path(camera_name, "base", timestamp)
-            annotated_image.save(saved_path)
+            # Save a copy to the content store shared with the saved image sets
+            _, saved_path = get_content_store().put(annotated_image, camera_name)
             logger.info(f"Saved copy to logs: {saved_path}")
         
         # Upload to Supabase with consistent timestamp format
@@ -266,7 +271,17 @@ def save_base_image(image, camera_name, lighting_condition):
             condition_label = f"transition_{detailed}"
             
         supabase_filename = f"{camera_name.lower().replace(' ', '_')}_{condition_label}_base_{timestamp.strftime('%Y%m%d%H%M%S')}.jpg"
-        supabase_url = upload_base_image(base_path, supabase_filename, camera_name, lighting_condition)
+        if frame_statistics is None:
+            frame_statistics = compute_frame_statistics(image)
+        
+        supabase_url = upload_base_image(
+            base_path,
+            supabase_filename,
+            camera_name,
+            lighting_condition,
+            content_hash=content_hash,
+            light_level=frame_statistics.mean_luminance
+        )
         
         # Record that we captured a base image
         record_base_image_capture(lighting_condition)
@@ -366,14 +381,17 @@ def capture_base_images(lighting_condition=None, force_capture=False, show_ui_me
             logger.info(f"Capturing base image for {camera_name}...")
             
             try:
-                # Capture new image
-                new_image = capture_real_image(config["roi"])
+                # Capture new image from the camera's configured frame source
+                # (always RGB, even when detection runs on luminance frames)
+                frame = read_camera_frame(camera_name, config, grayscale=False)
+                new_image = Image.fromarray(frame)
                 
-                # Save and upload
+                # Save and upload, with the light level of exactly this frame
                 local_path, supabase_url = save_base_image(
                     new_image,
                     camera_name,
-                    lighting_condition
+                    lighting_condition,
+                    frame_statistics=compute_frame_statistics(frame)
                 )
                 
                 # Check if save was successful
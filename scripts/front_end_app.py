@@ -387,6 +387,10 @@ def clear_local_images(self):
     """Clear all local images from storage directories"""
     try:
         from utilities.constants import BASE_IMAGES_DIR, IMAGE_COMPARISONS_DIR, SAVED_IMAGES_DIR
+        from utilities.local_image_store import get_local_image_store
+        
+        # Delete indexed saved images and empty the index, then sweep the folders
+        get_local_image_store().clear()
         
         for directory in [BASE_IMAGES_DIR, IMAGE_COMPARISONS_DIR, SAVED_IMAGES_DIR]:
             if os.path.exists(directory):
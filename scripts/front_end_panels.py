@@ -12,6 +12,7 @@ import threading
 import time
 from utilities.logging_utils import get_logger
 from utilities.time_utils import get_lighting_info, format_time_until, get_current_lighting_condition
+from utilities.image_comparison_utils import request_comparison_preview
 
 class LogWindow(tk.Toplevel):
     """Enhanced logging window with filtering and search"""
@@ -235,6 +236,14 @@ class ControlPanel(ttk.Frame):
         )
         self.clear_images_button.pack(side=tk.LEFT, padx=5)
         
+        # Ask the running detection to render its latest (deferred) comparisons
+        self.preview_button = ttk.Button(
+            button_frame,
+            text="Preview Comparisons",
+            command=request_comparison_preview
+        )
+        self.preview_button.pack(side=tk.LEFT, padx=5)
+        
         # View logs button
         self.view_logs_button = ttk.Button(
             button_frame,
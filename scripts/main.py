@@ -16,15 +16,14 @@ from utilities.constants import (
 from utilities.configs_loader import load_camera_config
 from utilities.logging_utils import get_logger
 from utilities.time_utils import get_current_lighting_condition
+from utilities.frame_capture import ContinuousCaptureThread, get_latest_frames
+from utilities.event_recorder import is_event_recording, get_event_recorder
+from utilities.image_comparison_utils import service_comparison_preview_request
 
 # Local imports
 from motion_workflow import process_cameras, initialize_system
-from push_to_supabase import push_log_to_supabase
 from capture_base_images import capture_base_images
 
-# Import from push_to_supabase
-from push_to_supabase import format_detection_results  # Changed to push_to_supabase
-
 # Set up logging
 logger = get_logger()
 
@@ -82,33 +81,66 @@ def motion_detection():
             logger.warning("Invalid capture interval value, defaulting to 60 seconds")
             capture_interval = 60
         
+        # Continuous mode samples the cameras at several Hz into ring buffers and
+        # runs detection on the newest frames instead of sleeping between cycles
+        continuous_capture = os.getenv('OWL_CONTINUOUS_CAPTURE', 'False').lower() == 'true'
+        capture_thread = None
+        consumed_sequences = {}
+        if continuous_capture:
+            try:
+                capture_hz = float(os.getenv('OWL_CONTINUOUS_CAPTURE_HZ', '4'))
+                buffer_seconds = float(os.getenv('OWL_FRAME_BUFFER_SECONDS', '30'))
+            except ValueError:
+                logger.warning("Invalid continuous capture settings, defaulting to 4 Hz with 30 second buffers")
+                capture_hz, buffer_seconds = 4.0, 30.0
+
+            # Event clips are cut from the buffers, so they must hold the whole clip
+            if is_event_recording():
+                recorder = get_event_recorder()
+                clip_seconds = recorder.pre_roll + recorder.post_roll
+                if clip_seconds > buffer_seconds:
+                    logger.warning(
+                        f"Frame buffers hold {buffer_seconds} seconds but event clips need "
+                        f"{clip_seconds}; clips will be truncated"
+                    )
+
+            capture_thread = ContinuousCaptureThread(CAMERA_CONFIGS, capture_hz, buffer_seconds)
+            capture_thread.start()
+            logger.info(f"Continuous capture enabled: {capture_hz} Hz, {buffer_seconds} second buffers")
+        
         logger.info("Starting motion detection...")
 
         # Main detection loop
         while True:
             try:
-                # Process all cameras in one batch
-                camera_results = process_cameras(CAMERA_CONFIGS)
+                # Render deferred comparison images if the GUI asked for a preview
+                service_comparison_preview_request()
+                
+                if capture_thread:
+                    # Only detect on frames that haven't been processed yet
+                    capture_times = {}
+                    frames = get_latest_frames(CAMERA_CONFIGS, consumed_sequences, capture_times)
+                    if not frames:
+                        time.sleep(capture_thread.capture_interval)
+                        continue
+                    camera_configs = {name: CAMERA_CONFIGS[name] for name in frames}
+                    camera_results = process_cameras(camera_configs, frames=frames, capture_times=capture_times)
+                else:
+                    # Process all cameras in one batch
+                    camera_results = process_cameras(CAMERA_CONFIGS)
                 
-                # Format and upload results for each camera
-                for result in camera_results:
-                    try:
-                        # Format detection log for Supabase
-                        log_entry = format_detection_results(result)
-                        
-                        # Push log entry to Supabase
-                        push_log_to_supabase(log_entry)
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing results for camera {result.get('camera', 'unknown')}: {e}")
+                # process_camera logged each camera's observation to owl_activity_log
+                # (owl or not, once per event key); failed cameras were only logged locally
+                logger.debug(f"Processed {len(camera_results)} cameras")
 
                 # Wait before next iteration using the configured interval
-                logger.debug(f"Waiting {capture_interval} seconds for next detection cycle")
-                time.sleep(capture_interval)
+                if not capture_thread:
+                    logger.debug(f"Waiting {capture_interval} seconds for next detection cycle")
+                    time.sleep(capture_interval)
 
             except Exception as e:
                 logger.error(f"Error in detection cycle: {e}")
-                time.sleep(capture_interval)  # Still wait before retry
+                time.sleep(capture_thread.capture_interval if capture_thread else capture_interval)  # Still wait before retry
 
     except Exception as e:
         logger.error(f"Fatal error in motion detection: {e}")
@@ -3,19 +3,16 @@
 
 import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from PIL import Image
-import pyautogui
 import pytz
-import numpy as np
 import json
 
 # Import utilities
 from utilities.constants import (
     BASE_IMAGES_DIR,
-    get_comparison_image_path,
-    CAMERA_MAPPINGS,
-    get_base_image_path
+    CAMERA_MAPPINGS
 )
 from utilities.logging_utils import get_logger
 from utilities.time_utils import (
@@ -24,13 +21,17 @@ from utilities.time_utils import (
     get_luminance_threshold_multiplier
 )
 from utilities.owl_detection_utils import detect_owl_in_box
-from utilities.image_comparison_utils import create_comparison_image
+from utilities.image_comparison_utils import ComparisonRenderHandle, is_deferred_rendering
 from utilities.alert_manager import AlertManager
 from utilities.confidence_utils import reset_frame_history
+from utilities.frame_capture import capture_camera_frames, read_camera_frame
+from utilities.base_image_cache import get_base_image
+from utilities.event_recorder import is_event_recording, get_event_recorder
 from capture_base_images import capture_base_images, get_latest_base_image
 
 # Import from push_to_supabase
 from push_to_supabase import push_log_to_supabase, format_detection_results
+from upload_images_to_supabase import upload_event_clip, get_event_clip_url
 
 # Initialize logger and alert manager
 logger = get_logger()
@@ -39,6 +40,57 @@ alert_manager = AlertManager()
 # Set timezone
 PACIFIC_TIME = pytz.timezone("America/Los_Angeles")
 
+# Alert state spans cameras, so concurrent cameras process detections one at a time
+alert_lock = threading.Lock()
+
+# Worker pool for concurrent camera processing and the camera jobs still running
+_camera_executor = None
+_camera_futures = {}
+
+def get_camera_worker_settings():
+    """
+    Get the concurrent camera processing settings from the environment.
+    
+    Returns:
+        tuple: (worker_count, timeout_seconds); one worker means sequential
+            processing, and the timeout applies to each camera from when its
+            job starts on a worker
+    """
+    try:
+        workers = max(int(os.getenv('OWL_CAMERA_WORKERS', '1')), 1)
+    except ValueError:
+        logger.warning("Invalid camera worker count, defaulting to 1")
+        workers = 1
+    
+    try:
+        timeout = float(os.getenv('OWL_CAMERA_TIMEOUT', '30'))
+    except ValueError:
+        logger.warning("Invalid camera timeout, defaulting to 30 seconds")
+        timeout = 30.0
+    
+    return workers, timeout
+
+def get_camera_executor(workers):
+    """Get the shared camera worker pool, creating it on first use."""
+    global _camera_executor
+    if _camera_executor is None:
+        _camera_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="camera")
+        logger.info(f"Processing cameras concurrently with {workers} workers")
+    return _camera_executor
+
+def create_error_result(camera_name, error_message):
+    """Create the result reported for a camera that failed to process."""
+    return {
+        "camera": camera_name,
+        "status": "Error",
+        "error_message": error_message,
+        "is_owl_present": False,
+        "owl_confidence": 0.0,
+        "consecutive_owl_frames": 0,
+        "confidence_factors": {},
+        "timestamp": datetime.now(PACIFIC_TIME).isoformat()
+    }
+
 def initialize_system(camera_configs, is_test=False):
     """Initialize the motion detection system."""
     try:
@@ -90,25 +142,27 @@ def initialize_system(camera_configs, is_test=False):
         logger.error(f"Error during motion detection system initialization: {e}")
         return False
 
-def capture_real_image(roi):
-    """Capture a screenshot of the specified region"""
-    try:
-        x, y, width, height = roi
-        region = (x, y, width - x, height - y)
-        logger.debug(f"Capturing screenshot with ROI: {region}")
-        screenshot = pyautogui.screenshot(region=region)
-        return screenshot.convert("RGB")
-    except Exception as e:
-        logger.error(f"Error capturing screenshot: {e}")
-        raise
-
-def process_camera(camera_name, config, lighting_info=None, test_images=None):
-    """Process motion detection for a specific camera with confidence-based detection"""
+def process_camera(camera_name, config, lighting_info=None, test_images=None, frame=None, capture_time=None):
+    """
+    Process motion detection for a specific camera with confidence-based detection.
+    
+    Args:
+        camera_name (str): Name of the camera
+        config (dict): Camera configuration
+        lighting_info (dict, optional): Shared lighting condition and threshold multiplier
+        test_images (dict, optional): Base and test images for test mode
+        frame (numpy.ndarray, optional): Pre-captured RGB frame for this camera's ROI;
+            read from the camera's frame source when not provided
+        capture_time (float, optional): Epoch time the frame was captured; it
+            timestamps the detection and so identifies its event (see make_event_key)
+    """
     try:
         logger.info(f"Processing camera: {camera_name} {'(Test Mode)' if test_images else ''}")
         base_image = None
         new_image = None
-        timestamp = datetime.now(PACIFIC_TIME)
+        if capture_time is None:
+            capture_time = time.time()
+        timestamp = datetime.fromtimestamp(capture_time, PACIFIC_TIME)
         
         try:
             # Get or use provided lighting condition
@@ -125,6 +179,7 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
             base_image_age = 0
             if test_images:
                 base_image = test_images['base']
+                base_gray = base_image
                 new_image = test_images['test']
                 is_test = True
             else:
@@ -132,13 +187,22 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
                 base_image_path = get_latest_base_image(camera_name, lighting_condition)
                 logger.info(f"Using base image: {base_image_path}")
                 
+                # Decoded base image is cached until the file changes
+                cached_base = get_base_image(camera_name, lighting_condition, base_image_path)
+                
                 # Calculate base image age from the file
-                base_image_age = int(time.time() - os.path.getctime(base_image_path))
+                base_image_age = int(time.time() - cached_base['ctime'])
                 logger.debug(f"Base image age: {base_image_age} seconds")
                 
                 # Load the images
-                base_image = Image.open(base_image_path).convert("RGB")
-                new_image = capture_real_image(config["roi"])
+                base_image = cached_base['rgb']
+                base_gray = cached_base['gray']
+                if frame is not None:
+                    new_image = frame
+                else:
+                    new_image = read_camera_frame(camera_name, config)
+                    capture_time = time.time()
+                    timestamp = datetime.fromtimestamp(capture_time, PACIFIC_TIME)
                 is_test = False
 
             # Get camera type and initialize detection results
@@ -161,14 +225,14 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
             # Pass camera name to detect_owl_in_box for temporal confidence
             is_owl_present, detection_info = detect_owl_in_box(
                 new_image, 
-                base_image,
+                base_gray,
                 config,
                 is_test=is_test,
                 camera_name=camera_name
             )
             
-            # Always create comparison image with confidence data
-            comparison_path = create_comparison_image(
+            # Prepare the comparison image with confidence data
+            comparison_render = ComparisonRenderHandle(
                 base_image, 
                 new_image,
                 camera_name,
@@ -179,6 +243,14 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
                 timestamp=timestamp
             )
             
+            # Only encode the JPEG when it will be logged, alerted on or saved
+            local_saving = os.getenv('OWL_LOCAL_SAVING', 'False').lower() == 'true'
+            comparison_path = None
+            if not is_deferred_rendering() or is_owl_present or is_test or local_saving:
+                comparison_path = comparison_render.render()
+            else:
+                comparison_render.defer()
+            
             # Update detection results with detection info
             detection_results.update({
                 "status": alert_type,
@@ -186,12 +258,23 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
                 "owl_confidence": detection_info.get("owl_confidence", 0.0),
                 "consecutive_owl_frames": detection_info.get("consecutive_owl_frames", 0),
                 "confidence_factors": detection_info.get("confidence_factors", {}),
-                "comparison_path": comparison_path,
                 "pixel_change": detection_info.get("pixel_change", 0.0),
                 "luminance_change": detection_info.get("luminance_change", 0.0),
                 "threshold_used": config.get("owl_confidence_threshold", 60.0)
             })
             
+            if comparison_path:
+                detection_results["comparison_path"] = comparison_path
+            
+            # Keep a clip around the detection from the continuous capture buffer
+            if is_owl_present and not is_test and is_event_recording():
+                # The clip is uploaded once written; its URL is known up front
+                event_clip_path = get_event_recorder().record_event(
+                    camera_name, event_time=capture_time, timestamp=timestamp, on_written=upload_event_clip
+                )
+                if event_clip_path:
+                    detection_results["event_clip_url"] = get_event_clip_url(event_clip_path)
+            
             logger.info(
                 f"Detection results for {camera_name}: Owl Present: {is_owl_present}, "
                 f"Confidence: {detection_results['owl_confidence']:.1f}%, "
@@ -202,27 +285,31 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
             # Format the results for database
             formatted_results = format_detection_results(detection_results)
             
-            # Only push to Supabase if motion was detected or in test mode
-            if is_owl_present or is_test:
-                log_entry = push_log_to_supabase(formatted_results, lighting_condition, base_image_age)
-                
-                # Process alert only if we have a successful log entry and owl was detected
-                if log_entry and is_owl_present and not is_test:
+            # Log every observation, owl or not, exactly once (keyed by its event
+            # key). The entry is spooled and uploaded in the background; its future
+            # resolves to the row so the alert can be linked to it
+            log_future = push_log_to_supabase(formatted_results, lighting_condition, base_image_age)
+            
+            # The comparison image URL is generated while the entry is built
+            if formatted_results.get("comparison_image_url"):
+                detection_results["comparison_image_url"] = formatted_results["comparison_image_url"]
+            
+            # Process alert only if the log entry was queued and owl was detected
+            if log_future and is_owl_present and not is_test:
+                with alert_lock:
                     alert_manager.process_detection(
                         camera_name,
                         detection_results,
-                        log_entry.get("id")
+                        log_future
                     )
-            else:
-                logger.debug(f"No owl detected for {camera_name}, skipping database push")
 
             return detection_results
 
         finally:
-            # Clean up image objects
-            if base_image and hasattr(base_image, 'close'):
+            # Clean up image objects (cached base images and captured frames are arrays)
+            if base_image is not None and hasattr(base_image, 'close'):
                 base_image.close()
-            if new_image and hasattr(new_image, 'close'):
+            if new_image is not None and hasattr(new_image, 'close'):
                 new_image.close()
 
     except Exception as e:
@@ -241,8 +328,18 @@ def process_camera(camera_name, config, lighting_info=None, test_images=None):
             "timestamp": datetime.now(PACIFIC_TIME).isoformat()
         }
 
-def process_cameras(camera_configs, test_images=None):
-    """Process all cameras in batch for efficient motion detection"""
+def process_cameras(camera_configs, test_images=None, frames=None, capture_times=None):
+    """
+    Process all cameras in batch for efficient motion detection.
+    
+    Args:
+        camera_configs (dict): Camera configurations keyed by camera name
+        test_images (dict, optional): Per-camera base and test images for test mode
+        frames (dict, optional): Pre-captured RGB frames keyed by camera name,
+            e.g. the newest frames from continuous capture; cameras without a
+            frame are captured as usual
+        capture_times (dict, optional): Epoch capture time of each pre-captured frame
+    """
     try:
         # Get lighting information once for all cameras
         lighting_condition = get_current_lighting_condition()
@@ -257,11 +354,30 @@ def process_cameras(camera_configs, test_images=None):
         
         # Only verify base images in real-time mode
         if not test_images:
-            if should_capture_base_image():
+            should_capture, _ = should_capture_base_image()
+            if should_capture:
                 logger.info("Time to capture new base images")
                 capture_base_images(lighting_condition, force_capture=True)
                 time.sleep(3)  # Allow system to stabilize after capture
         
+        # Grab every camera ROI from a single desktop capture so all cameras
+        # see the same instant and capture cost doesn't grow with camera count
+        if frames is None:
+            frames = {}
+        if capture_times is None:
+            capture_times = {}
+        if not test_images and not frames:
+            try:
+                frames = capture_camera_frames(camera_configs, capture_times=capture_times)
+            except Exception as e:
+                logger.warning(f"Shared desktop capture failed, capturing cameras individually: {e}")
+        
+        workers, timeout = get_camera_worker_settings()
+        if workers > 1:
+            return process_cameras_concurrently(
+                camera_configs, lighting_info, test_images, frames, workers, timeout, capture_times
+            )
+        
         # Process each camera with shared lighting info
         results = []
         for camera_name, config in camera_configs.items():
@@ -271,21 +387,14 @@ def process_cameras(camera_configs, test_images=None):
                     camera_name, 
                     config, 
                     lighting_info,
-                    test_images=camera_test_images
+                    test_images=camera_test_images,
+                    frame=frames.get(camera_name),
+                    capture_time=capture_times.get(camera_name)
                 )
                 results.append(result)
             except Exception as e:
                 logger.error(f"Error processing camera {camera_name}: {e}")
-                results.append({
-                    "camera": camera_name,
-                    "status": "Error",
-                    "error_message": str(e),
-                    "is_owl_present": False,
-                    "owl_confidence": 0.0,
-                    "consecutive_owl_frames": 0,
-                    "confidence_factors": {},
-                    "timestamp": datetime.now(PACIFIC_TIME).isoformat()
-                })
+                results.append(create_error_result(camera_name, str(e)))
         
         return results
 
@@ -293,6 +402,97 @@ def process_cameras(camera_configs, test_images=None):
         logger.error(f"Error in camera processing cycle: {e}")
         raise
 
+def process_cameras_concurrently(camera_configs, lighting_info, test_images, frames, workers, timeout,
+                                 capture_times=None):
+    """
+    Process cameras on a bounded worker pool so one slow camera doesn't delay the others.
+    
+    A camera whose previous job is still running (e.g. stuck on a network call)
+    is skipped this cycle rather than queued behind itself.
+    
+    Args:
+        camera_configs (dict): Camera configurations keyed by camera name
+        lighting_info (dict): Shared lighting condition and threshold multiplier
+        test_images (dict, optional): Per-camera base and test images for test mode
+        frames (dict): Pre-captured frames keyed by camera name
+        workers (int): Maximum number of cameras processed at once
+        timeout (float): Seconds each camera may take, counted from when its job
+            starts on a worker (or from submission while it waits for one)
+        capture_times (dict, optional): Epoch capture time of each pre-captured frame
+        
+    Returns:
+        list: Detection results for the cameras that finished
+    """
+    executor = get_camera_executor(workers)
+    
+    submitted = {}
+    started = {}
+    submitted_at = time.monotonic()
+    for camera_name, config in camera_configs.items():
+        previous = _camera_futures.get(camera_name)
+        if previous is not None and not previous.done():
+            logger.warning(f"Previous cycle for {camera_name} still running, skipping this cycle")
+            continue
+        
+        camera_test_images = test_images.get(camera_name) if test_images else None
+        future = executor.submit(
+            _run_camera_job,
+            started,
+            camera_name,
+            config,
+            lighting_info,
+            test_images=camera_test_images,
+            frame=frames.get(camera_name),
+            capture_time=(capture_times or {}).get(camera_name)
+        )
+        _camera_futures[camera_name] = future
+        submitted[camera_name] = future
+    
+    # Each camera has its own deadline, counted from when its job starts on a worker,
+    # so a slow camera doesn't use up the others' time
+    results = {}
+    pending = dict(submitted)
+    while pending:
+        for camera_name, future in list(pending.items()):
+            if future.done():
+                try:
+                    results[camera_name] = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing camera {camera_name}: {e}")
+                    results[camera_name] = create_error_result(camera_name, str(e))
+                del pending[camera_name]
+        
+        now = time.monotonic()
+        deadlines = {
+            camera_name: started[camera_name] + timeout
+            for camera_name in pending if camera_name in started
+        }
+        running = any(deadline > now for deadline in deadlines.values())
+        for camera_name in pending:
+            if camera_name not in deadlines:
+                # A queued job waits for a worker while another camera is within its
+                # time; once every worker is stuck it times out from submission
+                deadlines[camera_name] = float('inf') if running else submitted_at + timeout
+        
+        for camera_name, deadline in deadlines.items():
+            if deadline <= now:
+                # A queued job is dropped; a running one is abandoned to its worker
+                pending[camera_name].cancel()
+                logger.error(f"Processing {camera_name} timed out after {timeout:.0f} seconds")
+                results[camera_name] = create_error_result(camera_name, f"Timed out after {timeout:.0f} seconds")
+                del pending[camera_name]
+        
+        if pending:
+            next_deadline = min(deadlines[camera_name] for camera_name in pending)
+            wait(list(pending.values()), timeout=next_deadline - now, return_when=FIRST_COMPLETED)
+    
+    return [results[camera_name] for camera_name in submitted]
+
+def _run_camera_job(started, camera_name, *args, **kwargs):
+    """Record when a camera's job starts on a worker, then process the camera."""
+    started[camera_name] = time.monotonic()
+    return process_camera(camera_name, *args, **kwargs)
+
 def update_thresholds(camera_configs, new_thresholds):
     """
     Update confidence thresholds in camera configurations.
@@ -12,44 +12,49 @@ import os
 import datetime
 import json
 import random
-import supabase
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 # Import utilities
 from utilities.logging_utils import get_logger
 from utilities.constants import ALERT_PRIORITIES, SUPABASE_STORAGE, get_detection_folder
+from utilities.supabase_client import get_supabase_client, get_supabase_url
 
 # Import from database_utils
 from utilities.database_utils import get_subscribers, get_table_columns, check_column_exists
 
+# Import the activity log spool
+from concurrent.futures import Future
+from utilities.activity_log_spool import is_activity_log_spooled, get_activity_log_spool
+
+# Import the alert cooldown cache
+from utilities.alert_cooldown_cache import get_alert_cooldown_cache
+
 # Initialize logger
 logger = get_logger()
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Retrieve Supabase credentials
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Shared Supabase client (or the local stand-in, see utilities/supabase_client.py)
+supabase_client = get_supabase_client()
+
+# Retrieve Supabase settings
+SUPABASE_URL = get_supabase_url()
 SUPABASE_BUCKET_DETECTIONS = os.getenv("SUPABASE_BUCKET_DETECTIONS", "owl_detections")
 SUPABASE_BUCKET_IMAGES = os.getenv("SUPABASE_BUCKET_IMAGES", "base_images")
 
-# Validate credentials
-if not all([SUPABASE_URL, SUPABASE_KEY]):
-    error_msg = "Supabase credentials are missing. Check the .env file."
-    logger.error(error_msg)
-    raise ValueError(error_msg)
+# Recently emitted detection events by idempotency key (LRU), to prevent duplicates
+RECENT_EVENTS_LIMIT = 1000
+recent_events = OrderedDict()
+recent_events_lock = threading.Lock()
 
-# Initialize Supabase client
-try:
-    supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
-    logger.info("Supabase client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Supabase client: {e}")
-    raise
+# Serializes the one-time warm-up of the alert cooldown cache
+_cooldown_warm_lock = threading.Lock()
 
-# Track uploaded entries to prevent duplicates
-last_uploaded_entries = {}
+# Missing owl_activity_log columns that have already been reported
+_missing_columns_logged = set()
 
 # Cache for column existence checks to avoid repeated queries
 _column_cache = {}
@@ -91,9 +96,24 @@ def get_last_alert_time(alert_type):
         logger.error(f"Error getting last alert time: {e}")
         return None
 
+def warm_alert_cooldown_cache():
+    """
+    Load the last alert time of every alert type from Supabase into the local
+    cooldown cache. Only the first call per process queries the database; it
+    runs on the first eligibility check rather than at import.
+    """
+    cache = get_alert_cooldown_cache()
+    if cache.warmed:
+        return
+    with _cooldown_warm_lock:
+        if not cache.warmed:
+            cache.warm(get_last_alert_time, ALERT_PRIORITIES.keys())
+
 def check_alert_eligibility(alert_type, cooldown_minutes):
     """
     Check if enough time has passed since the last alert of the specified type.
+    Uses the local alert cooldown cache, so no database query is made after
+    the cache is warmed by the first check.
 
     Args:
         alert_type (str): Type of alert
@@ -103,19 +123,12 @@ def check_alert_eligibility(alert_type, cooldown_minutes):
         tuple: (bool, dict or None) - (is_eligible, last_alert_data)
     """
     try:
-        last_alert_time = get_last_alert_time(alert_type)
+        warm_alert_cooldown_cache()
+        
+        # The cache holds timezone-aware times
+        last_alert_time = get_alert_cooldown_cache().get_last_alert_time(alert_type)
         if not last_alert_time:
             return True, None
-            
-        # Ensure the timestamp has timezone information
-        if isinstance(last_alert_time, str):
-            if 'Z' in last_alert_time or '+' in last_alert_time:
-                # ISO format with timezone
-                last_alert_time = datetime.datetime.fromisoformat(last_alert_time.replace('Z', '+00:00'))
-            else:
-                # Assume UTC if no timezone info
-                last_alert_time = datetime.datetime.fromisoformat(last_alert_time)
-                last_alert_time = last_alert_time.replace(tzinfo=datetime.timezone.utc)
         
         # Always use timezone-aware now
         now = datetime.datetime.now(datetime.timezone.utc)
@@ -194,6 +207,8 @@ def create_alert_entry(alert_type, activity_log_id=None, alert_id=None, trigger_
         
         if response and hasattr(response, 'data') and len(response.data) > 0:
             logger.info(f"Created new alert entry: {alert_id} for {alert_type} (priority {priority})")
+            # Write through to the local cooldown cache
+            get_alert_cooldown_cache().record_alert(alert_type, now)
             return response.data[0]
         
         logger.error("Failed to create alert entry in Supabase")
@@ -273,6 +288,22 @@ def update_alert_status(
     except Exception as e:
         logger.error(f"Error updating alert status: {e}")
 
+def link_alert_to_activity_log(alert_id, activity_log_id):
+    """
+    Set the activity log entry of an alert created before the entry was uploaded.
+
+    Args:
+        alert_id (str): Unique identifier of the alert (alerts.alert_id)
+        activity_log_id (int): ID of the owl_activity_log entry
+    """
+    try:
+        supabase_client.table('alerts').update(
+            {'owl_activity_log_id': activity_log_id}
+        ).eq('alert_id', alert_id).execute()
+        logger.debug(f"Linked alert {alert_id} to activity log entry {activity_log_id}")
+    except Exception as e:
+        logger.error(f"Error linking alert {alert_id} to activity log entry: {e}")
+
 def format_confidence_factors(confidence_factors):
     """
     Format confidence factors to ensure they can be properly serialized to JSON.
@@ -358,19 +389,80 @@ def generate_image_url(local_image_path, alert_type, camera_name=None):
         logger.error(f"Error generating image URL: {e}")
         return None
 
+def make_event_key(camera_name, alert_type, timestamp):
+    """
+    Build the idempotency key of a detection event.
+    The same camera, detection type and capture time always give the same key.
+    
+    Args:
+        camera_name (str): Name of the camera
+        alert_type (str): Detection type (e.g. "Owl In Box")
+        timestamp (str): Capture timestamp of the frame (from its capture time, not
+            the time it was processed, so each frame is its own event)
+        
+    Returns:
+        str: Idempotency key
+    """
+    return f"{camera_name}|{alert_type}|{timestamp}"
+
+def insert_activity_log_batch(log_entries):
+    """
+    Write activity log rows to Supabase in one request.
+    Rows carrying an event_key are upserted on it, so a batch retried after a
+    lost response doesn't create duplicates (needs the unique index on event_key
+    from migrations/001_owl_activity_log_event_key.sql).
+    
+    Args:
+        log_entries (list): Row dictionaries for owl_activity_log
+        
+    Returns:
+        list: The written rows, including their generated IDs
+    """
+    table = supabase_client.table('owl_activity_log')
+    if all('event_key' in entry for entry in log_entries):
+        response = table.upsert(log_entries, on_conflict='event_key').execute()
+    else:
+        response = table.insert(log_entries).execute()
+    return response.data
+
+def report_missing_activity_log_column(column, consequence, migration):
+    """
+    Log an error, once per process, that an owl_activity_log column is missing.
+    
+    Args:
+        column (str): Missing column
+        consequence (str): What is lost without it
+        migration (str): Migration that adds the column
+    """
+    if column in _missing_columns_logged:
+        return
+    if not get_table_columns('owl_activity_log'):
+        # The columns couldn't be determined (e.g. Supabase unreachable), so the
+        # column may well exist
+        return
+    _missing_columns_logged.add(column)
+    logger.error(f"owl_activity_log has no {column} column, so {consequence}; apply {migration}")
+
 def push_log_to_supabase(detection_results, lighting_condition=None, base_image_age=None):
     """
     Push detection results to the owl_activity_log table in Supabase.
-    Checks for duplicates to prevent multiple uploads of the same data.
+    This is the single path detection events are written through. Each event is
+    identified by make_event_key, so pushing the same observation again returns
+    the first push's result instead of writing another row.
     Now includes confidence metrics and image URLs.
     
+    Rows are appended to the local activity log spool and uploaded in batches
+    by its background flusher, so this never waits on the network unless
+    OWL_ACTIVITY_LOG_SPOOL is disabled.
+    
     Args:
         detection_results (dict): Dictionary containing detection results with confidence
         lighting_condition (str, optional): Current lighting condition
         base_image_age (int, optional): Age of base image in seconds
         
     Returns:
-        dict: The created log entry or None if failed
+        concurrent.futures.Future or None: Resolves to the created log entry
+            (with its ID) once uploaded, or None if the row could not be built
     """
     try:
         # Validate detection results
@@ -383,11 +475,13 @@ def push_log_to_supabase(detection_results, lighting_condition=None, base_image_
         alert_type = detection_results.get('status')
         timestamp = detection_results.get('timestamp')
         
-        # Check if we've already uploaded this entry
-        entry_key = f"{camera_name}_{alert_type}_{timestamp}"
-        if entry_key in last_uploaded_entries:
-            logger.debug(f"Skipping duplicate upload for {entry_key}")
-            return last_uploaded_entries[entry_key]
+        # Check if we've already emitted this event
+        event_key = make_event_key(camera_name, alert_type, timestamp)
+        with recent_events_lock:
+            if event_key in recent_events:
+                recent_events.move_to_end(event_key)
+                logger.debug(f"Skipping duplicate upload for {event_key}")
+                return recent_events[event_key]
         
         # Validate alert type is in our priority list
         if alert_type not in ALERT_PRIORITIES:
@@ -442,6 +536,28 @@ def push_log_to_supabase(detection_results, lighting_condition=None, base_image_
         if comparison_image_url:
             detection_results['comparison_image_url'] = comparison_image_url
             
+        # Add the event clip's storage URL if a clip is being recorded and the column exists
+        event_clip_url = detection_results.get('event_clip_url')
+        if event_clip_url:
+            if check_column_exists('owl_activity_log', 'event_clip_url'):
+                log_entry["event_clip_url"] = event_clip_url
+            else:
+                report_missing_activity_log_column(
+                    'event_clip_url',
+                    "event clips are uploaded but not linked to their rows",
+                    "migrations/003_owl_activity_log_event_clip_url.sql"
+                )
+            
+        # Add the idempotency key if the column exists, so retried writes upsert
+        if check_column_exists('owl_activity_log', 'event_key'):
+            log_entry["event_key"] = event_key
+        else:
+            report_missing_activity_log_column(
+                'event_key',
+                "retried uploads can duplicate rows",
+                "migrations/001_owl_activity_log_event_key.sql"
+            )
+            
         # Add multiple owl detection fields
         if "multiple_owls" in detection_results:
             log_entry["multiple_owls"] = 1 if detection_results["multiple_owls"] else 0
@@ -497,30 +613,36 @@ def push_log_to_supabase(detection_results, lighting_condition=None, base_image_
                     else:
                         log_entry[key] = str(value)
         
-        # Send to Supabase - using insert with correct method to handle all data types
-        # IMPORTANT: Let Supabase handle the ID generation
-        response = supabase_client.table('owl_activity_log').insert(log_entry).execute()
-        
-        if response and hasattr(response, 'data') and len(response.data) > 0:
-            # Get the priority level for better logging
-            priority_level = ALERT_PRIORITIES.get(alert_type, 1)
+        # Queue for upload - IMPORTANT: Let Supabase handle the ID generation
+        priority_level = ALERT_PRIORITIES.get(alert_type, 1)
+        if is_activity_log_spooled():
+            log_future = get_activity_log_spool(insert_activity_log_batch).enqueue(log_entry)
+            logger.info(
+                f"Queued {alert_type} data for owl_activity_log "
+                f"with {owl_confidence:.1f}% confidence, {consecutive_frames} consecutive frames "
+                f"(Priority: {priority_level})"
+            )
+        else:
+            # Direct insert, as before the spool
+            log_future = Future()
+            inserted = insert_activity_log_batch([log_entry])
+            if not inserted:
+                logger.error("Failed to insert into owl_activity_log")
+                return None
+            log_future.set_result(inserted[0])
             logger.info(
                 f"Successfully uploaded {alert_type} data to owl_activity_log "
                 f"with {owl_confidence:.1f}% confidence, {consecutive_frames} consecutive frames "
                 f"(Priority: {priority_level})"
             )
-            # Store this entry to prevent duplicates
-            last_uploaded_entries[entry_key] = response.data[0]
-            # Keep only the last 100 entries to prevent memory growth
-            if len(last_uploaded_entries) > 100:
-                # Remove oldest entries
-                keys_to_remove = list(last_uploaded_entries.keys())[:-100]
-                for key in keys_to_remove:
-                    del last_uploaded_entries[key]
-            return response.data[0]
         
-        logger.error("Failed to insert into owl_activity_log")
-        return None
+        # Remember this event to prevent duplicates, evicting the least recent
+        with recent_events_lock:
+            recent_events[event_key] = log_future
+            recent_events.move_to_end(event_key)
+            if len(recent_events) > RECENT_EVENTS_LIMIT:
+                recent_events.popitem(last=False)
+        return log_future
     except Exception as e:
         logger.error(f"Failed to upload log to Supabase: {e}")
         return None
@@ -559,6 +681,8 @@ def format_detection_results(detection_result):
             formatted_entry["snapshot_path"] = detection_result["snapshot_path"]
         if "comparison_path" in detection_result:
             formatted_entry["comparison_path"] = detection_result["comparison_path"]
+        if "event_clip_url" in detection_result:
+            formatted_entry["event_clip_url"] = detection_result["event_clip_url"]
         # Add image URL if available - New in v1.1.0
         if "comparison_image_url" in detection_result:
             formatted_entry["comparison_image_url"] = detection_result["comparison_image_url"]
@@ -604,11 +728,86 @@ def format_detection_results(detection_result):
             "confidence_factors": {}
         }
 
+# Page size and page limit when statistics fall back to reading activity log rows
+STATISTICS_PAGE_SIZE = 1000
+STATISTICS_MAX_PAGES = 5
+
+# Error codes for a database function that doesn't exist: PostgREST's "not found in
+# the schema cache" and PostgreSQL's undefined_function
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+def _is_missing_function_error(error):
+    """
+    Check whether an rpc() error means the database function doesn't exist.
+    
+    Args:
+        error (Exception): Error raised by rpc().execute()
+        
+    Returns:
+        bool: True if the function is missing, rather than failing
+    """
+    if isinstance(error, NotImplementedError):
+        # The local client has no implementation registered
+        return True
+    if getattr(error, 'code', None) in MISSING_FUNCTION_CODES:
+        return True
+    message = str(error)
+    return any(code in message for code in MISSING_FUNCTION_CODES) or "Could not find the function" in message
+
+def _aggregate_alert_statistics(start_time_str):
+    """
+    Aggregate counts and confidence sums per alert type from activity log rows.
+    Used when the get_alert_statistics database function isn't available.
+    
+    Only rows with an alert flag set are read, and at most STATISTICS_MAX_PAGES
+    pages of them, so a long period can't turn into an unbounded scan.
+    
+    Args:
+        start_time_str (str): ISO start of the period
+        
+    Returns:
+        tuple: (dict of alert type to (count, confidence sum), whether every row was read)
+    """
+    field_names = {alert_type: alert_type.lower().replace(" ", "_") for alert_type in ALERT_PRIORITIES}
+    columns = ",".join(list(field_names.values()) + ["owl_confidence_score"])
+    any_flag = ",".join(f"{field_name}.eq.1" for field_name in field_names.values())
+    totals = {alert_type: [0, 0.0] for alert_type in ALERT_PRIORITIES}
+    
+    for page in range(STATISTICS_MAX_PAGES):
+        offset = page * STATISTICS_PAGE_SIZE
+        response = (
+            supabase_client.table('owl_activity_log')
+            .select(columns)
+            .gt('created_at', start_time_str)
+            .or_(any_flag)
+            .order('id')
+            .range(offset, offset + STATISTICS_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = response.data or []
+        for row in rows:
+            confidence = float(row.get('owl_confidence_score') or 0.0)
+            for alert_type, field_name in field_names.items():
+                if row.get(field_name) == 1:
+                    totals[alert_type][0] += 1
+                    totals[alert_type][1] += confidence
+        if len(rows) < STATISTICS_PAGE_SIZE:
+            return totals, True
+    
+    return totals, False
+
 def get_alert_statistics(days=1):
     """
     Get statistics about alerts from the database for the after action report.
     New in v1.1.0 to support after action reports.
     
+    Counts and average confidence for every alert type come from one call to the
+    get_alert_statistics database function (migrations/002_get_alert_statistics.sql).
+    If the function doesn't exist, a warning asks for the migration and up to
+    STATISTICS_MAX_PAGES pages of the period's alert rows are read and aggregated
+    here ("complete" is False if rows were left unread); any other error is
+    logged and no statistics are returned.
+    
     Args:
         days (int): Number of days to look back
         
@@ -620,41 +819,45 @@ def get_alert_statistics(days=1):
         start_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
         start_time_str = start_time.isoformat()
         
-        # Define alert types directly from ALERT_PRIORITIES
-        alert_types = [(alert_type, alert_type.lower().replace(" ", "_")) 
-                       for alert_type in ALERT_PRIORITIES.keys()]
-        
         # Initialize statistics
         stats = {
             "period_start": start_time_str,
             "period_end": datetime.datetime.now(datetime.timezone.utc).isoformat(),
             "total_alerts": 0,
-            "alert_counts": {},
-            "average_confidence": {}
+            "alert_counts": {alert_type: 0 for alert_type in ALERT_PRIORITIES},
+            "average_confidence": {},
+            "complete": True
         }
         
-        # Get counts for each alert type
-        for alert_type, field_name in alert_types:
-            try:
-                # Query for count of this alert type
-                query = f"select count(*) from owl_activity_log where {field_name} = 1 and created_at > '{start_time_str}'"
-                response = supabase_client.rpc('execute_sql', {'query': query}).execute()
-                
-                if response and hasattr(response, 'data') and len(response.data) > 0:
-                    count = response.data[0].get('count', 0)
-                    stats["alert_counts"][alert_type] = count
-                    stats["total_alerts"] += count
-                    
-                # Get average confidence
-                avg_query = f"select avg(owl_confidence_score) from owl_activity_log where {field_name} = 1 and created_at > '{start_time_str}'"
-                avg_response = supabase_client.rpc('execute_sql', {'query': avg_query}).execute()
-                
-                if avg_response and hasattr(avg_response, 'data') and len(avg_response.data) > 0:
-                    avg = avg_response.data[0].get('avg', 0)
-                    if avg:
-                        stats["average_confidence"][alert_type] = float(avg)
-            except Exception as e:
-                logger.error(f"Error getting statistics for {alert_type}: {e}")
+        try:
+            # One grouped, parameterized query for all alert types
+            response = supabase_client.rpc('get_alert_statistics', {'start_time': start_time_str}).execute()
+            totals = {}
+            for row in response.data or []:
+                count = int(row.get('alert_count') or 0)
+                average = float(row.get('average_confidence') or 0.0)
+                totals[row.get('alert_type')] = (count, average * count)
+        except Exception as e:
+            if not _is_missing_function_error(e):
+                raise
+            logger.warning(
+                f"The get_alert_statistics database function is missing ({e}); apply "
+                f"migrations/002_get_alert_statistics.sql. Aggregating a limited number of rows instead"
+            )
+            totals, stats["complete"] = _aggregate_alert_statistics(start_time_str)
+            if not stats["complete"]:
+                logger.warning(
+                    f"Alert statistics cover only the first {STATISTICS_MAX_PAGES * STATISTICS_PAGE_SIZE} "
+                    f"alert rows of the period"
+                )
+        
+        for alert_type, (count, confidence_sum) in totals.items():
+            if alert_type not in stats["alert_counts"]:
+                continue
+            stats["alert_counts"][alert_type] = count
+            stats["total_alerts"] += count
+            if count and confidence_sum:
+                stats["average_confidence"][alert_type] = confidence_sum / count
         
         return stats
     except Exception as e:
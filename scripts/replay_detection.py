@@ -0,0 +1,145 @@
+# File: replay_detection.py
+# Purpose: Replay recorded or synthetic frames through owl detection at full speed
+#
+# Runs the detection pipeline against a camera's configured frame source (or one
+# given on the command line) without pacing, uploads or alerts, so detection
+# throughput can be measured and tuned offline.
+#
+# Examples:
+#   python replay_detection.py "Upper Patio Camera" --source video --path night.mp4
+#   python replay_detection.py "Bindy Patio Camera" --source synthetic --max-frames 500
+#   python replay_detection.py "Wyze Internal Camera" --source archive --reverse
+
+import argparse
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+# Import utilities
+from utilities.configs_loader import load_camera_config
+from utilities.logging_utils import get_logger
+from utilities.frame_sources import create_frame_source, is_grayscale_detection, FRAME_SOURCE_TYPES
+from utilities.owl_detection_utils import detect_owl_in_box
+from utilities.confidence_utils import reset_frame_history
+
+# Initialize logger
+logger = get_logger()
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Replay frames through owl detection")
+    parser.add_argument("camera", help="Camera name from config.json")
+    parser.add_argument("--source", choices=sorted(FRAME_SOURCE_TYPES),
+                        help="Frame source type (defaults to the camera's configured source)")
+    parser.add_argument("--path", help="Video file or image directory to replay")
+    parser.add_argument("--base-image", help="Base image to compare against (defaults to the first frame)")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--start", type=float, help="Archive replay: epoch time of the first frame")
+    parser.add_argument("--end", type=float, help="Archive replay: epoch time of the last frame")
+    parser.add_argument("--reverse", action="store_true", help="Archive replay: newest frames first")
+    return parser.parse_args()
+
+def replay_detection(camera_name, config, source_config=None, base_image_path=None, max_frames=None):
+    """
+    Run owl detection over every frame from a frame source.
+
+    Args:
+        camera_name (str): Name of the camera
+        config (dict): Camera configuration
+        source_config (dict, optional): Frame source override for the camera
+        base_image_path (str, optional): Base image path; the first frame is used if not given
+        max_frames (int, optional): Maximum number of frames to process
+
+    Returns:
+        dict: Replay summary with frame count, detections and throughput
+    """
+    if source_config:
+        config = {**config, "frame_source": source_config}
+
+    reset_frame_history()
+    grayscale = is_grayscale_detection()
+    frames_processed = 0
+    detections = 0
+    detection_time = 0.0
+
+    with create_frame_source(camera_name, config) as source:
+        if base_image_path:
+            with Image.open(base_image_path) as image:
+                base_image = np.asarray(image.convert("L" if grayscale else "RGB"))
+        else:
+            base_image = source.read(grayscale)
+            if base_image is None:
+                raise RuntimeError(f"Frame source for {camera_name} produced no frames")
+
+        start = time.perf_counter()
+        while max_frames is None or frames_processed < max_frames:
+            frame = source.read(grayscale)
+            if frame is None:
+                break
+            if frame.shape != base_image.shape:
+                raise ValueError(
+                    f"Frame size {frame.shape[1]}x{frame.shape[0]} does not match "
+                    f"base image {base_image.shape[1]}x{base_image.shape[0]}"
+                )
+
+            detect_start = time.perf_counter()
+            is_owl_present, detection_info = detect_owl_in_box(
+                frame,
+                base_image,
+                config,
+                camera_name=camera_name
+            )
+            detection_time += time.perf_counter() - detect_start
+
+            frames_processed += 1
+            if is_owl_present:
+                detections += 1
+                logger.info(
+                    f"Frame {frames_processed}: owl detected "
+                    f"({detection_info.get('owl_confidence', 0.0):.1f}% confidence)"
+                )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "camera": camera_name,
+        "frames_processed": frames_processed,
+        "detections": detections,
+        "elapsed_seconds": elapsed,
+        "frames_per_second": frames_processed / elapsed if elapsed > 0 else 0.0,
+        "detection_ms_per_frame": detection_time * 1000 / frames_processed if frames_processed else 0.0
+    }
+
+if __name__ == "__main__":
+    try:
+        args = parse_args()
+        camera_configs = load_camera_config()
+        if args.camera not in camera_configs:
+            logger.error(f"Unknown camera: {args.camera}")
+            sys.exit(1)
+
+        source_config = None
+        if args.source:
+            source_config = {"type": args.source}
+            if args.path:
+                source_config["path"] = args.path
+            if args.source == "archive":
+                source_config.update({"start": args.start, "end": args.end, "reverse": args.reverse})
+
+        summary = replay_detection(
+            args.camera,
+            camera_configs[args.camera],
+            source_config=source_config,
+            base_image_path=args.base_image,
+            max_frames=args.max_frames
+        )
+
+        logger.info(
+            f"Replayed {summary['frames_processed']} frames for {summary['camera']}: "
+            f"{summary['detections']} detections, {summary['frames_per_second']:.1f} fps, "
+            f"{summary['detection_ms_per_frame']:.2f} ms/frame in detection"
+        )
+
+    except Exception as e:
+        logger.error(f"Replay failed: {e}")
+        sys.exit(1)
@@ -13,6 +13,7 @@ import threading
 import pyautogui
 import cv2
 import numpy as np
+from PIL import Image
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -23,6 +24,8 @@ import psutil
 # Import utilities
 from utilities.logging_utils import get_logger
 from utilities.database_utils import get_subscribers
+from utilities.frame_sources import create_frame_source
+from utilities.frame_statistics import compute_frame_statistics
 
 # Load environment variables
 load_dotenv()
@@ -90,6 +93,9 @@ class OwlySystemMonitor:
             'alerts_sent': 0
         }
         
+        # Frame source for the Wyze camera feed, created on first check
+        self.wyze_frame_source = None
+        
         # Background monitoring thread
         self.monitoring_thread = None
         self.running = False
@@ -118,6 +124,24 @@ class OwlySystemMonitor:
                 if key not in self.config['obs_stream']:
                     self.config['obs_stream'][key] = value
     
+    def get_wyze_frame_source(self):
+        """
+        Get the frame source for the Wyze camera feed, creating it on first use.
+        
+        The ROI is configured as (x, y, width, height); an optional
+        'frame_source' entry selects a non-screen source for offline testing.
+        
+        Returns:
+            FrameSource: Frame source for the camera feed region
+        """
+        if self.wyze_frame_source is None:
+            x, y, width, height = self.config['wyze_camera']['roi']
+            self.wyze_frame_source = create_frame_source("Wyze Camera Feed", {
+                'roi': [x, y, x + width, y + height],
+                'frame_source': self.config['wyze_camera'].get('frame_source')
+            })
+        return self.wyze_frame_source
+    
     def check_wyze_camera_feed(self):
         """
         Check if the Wyze camera feed is functioning properly.
@@ -128,15 +152,14 @@ class OwlySystemMonitor:
         self.logger.info("Checking Wyze camera feed...")
         
         try:
-            # Take screenshot of the region containing the camera feed
-            roi = self.config['wyze_camera']['roi']
-            screenshot = pyautogui.screenshot(region=roi)
-            
-            # Convert to numpy array for analysis
-            img_array = np.array(screenshot)
+            # Capture the region containing the camera feed
+            img_array = self.get_wyze_frame_source().read()
+            if img_array is None:
+                return False, "Camera frame source exhausted", None
+            screenshot = Image.fromarray(img_array)
             
             # Check for black screen (camera disconnected)
-            avg_pixel_value = np.mean(img_array)
+            avg_pixel_value = compute_frame_statistics(img_array).mean_value
             black_threshold = self.config['wyze_camera']['error_patterns']['black_screen_threshold']
             
             if avg_pixel_value < black_threshold:
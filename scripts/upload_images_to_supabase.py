@@ -10,7 +10,6 @@
 import os
 import datetime
 import mimetypes
-import supabase
 import pytz
 from PIL import Image
 from dotenv import load_dotenv
@@ -22,6 +21,11 @@ from utilities.constants import (
     get_detection_folder, 
     ALERT_PRIORITIES
 )
+from utilities.content_store import get_content_store
+from utilities.frame_statistics import compute_frame_statistics
+from utilities.image_writer import get_image_writer
+from utilities.image_derivatives import DERIVATIVE_VARIANTS, get_derivative_path
+from utilities.supabase_client import get_supabase_client, get_supabase_url
 
 # Initialize logger
 logger = get_logger()
@@ -29,25 +33,16 @@ logger = get_logger()
 # Load environment variables
 load_dotenv()
 
-# Retrieve Supabase credentials
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Shared Supabase client (or the local stand-in, see utilities/supabase_client.py)
+supabase_client = get_supabase_client()
+
+# Retrieve Supabase settings
+SUPABASE_URL = get_supabase_url()
 SUPABASE_BUCKET_DETECTIONS = os.getenv("SUPABASE_BUCKET_DETECTIONS", "owl_detections")
 SUPABASE_BUCKET_IMAGES = os.getenv("SUPABASE_BUCKET_IMAGES", "base_images")
 
-# Validate credentials
-if not all([SUPABASE_URL, SUPABASE_KEY]):
-    error_msg = "Supabase credentials are missing. Check the .env file."
-    logger.error(error_msg)
-    raise ValueError(error_msg)
-
-# Initialize Supabase client
-try:
-    supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
-    logger.info("Supabase storage client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Supabase client: {e}")
-    raise
+# Folder of the detections bucket holding event clips
+EVENT_CLIPS_FOLDER = "event_clips"
 
 def get_average_luminance(image_path):
     """
@@ -62,13 +57,12 @@ def get_average_luminance(image_path):
     try:
         with Image.open(image_path) as img:
             # Convert to grayscale and calculate average
-            gray_img = img.convert('L')
-            return sum(gray_img.getdata()) / (gray_img.width * gray_img.height)
+            return compute_frame_statistics(img.convert('L')).mean_luminance
     except Exception as e:
         logger.error(f"Error calculating luminance: {e}")
         return 0.0
 
-def log_base_image_to_supabase(local_path, camera_name, lighting_condition, supabase_url):
+def log_base_image_to_supabase(local_path, camera_name, lighting_condition, supabase_url, light_level=None):
     """
     Log base image metadata to Supabase base_images_log table.
     
@@ -77,14 +71,17 @@ def log_base_image_to_supabase(local_path, camera_name, lighting_condition, supa
         camera_name (str): Name of the camera
         lighting_condition (str): Current lighting condition
         supabase_url (str): URL of the uploaded base image
+        light_level (float, optional): Mean luminance from capture time; read
+            from local_path if not given
     """
     try:
         # Get current time in Pacific timezone
         pacific = pytz.timezone('America/Los_Angeles')
         current_time = datetime.datetime.now(pacific)
         
-        # Calculate average luminance
-        light_level = get_average_luminance(local_path)
+        # Calculate average luminance unless it was computed at capture
+        if light_level is None:
+            light_level = get_average_luminance(local_path)
         
         # Prepare log entry
         log_entry = {
@@ -112,6 +109,8 @@ def log_base_image_to_supabase(local_path, camera_name, lighting_condition, supa
 def upload_comparison_image(local_image_path, camera_name, detection_type):
     """
     Upload a motion detection comparison image to Supabase Storage.
+    Its downscaled variants, if written, are uploaded alongside it under the
+    same storage name with the variant suffix (see get_derivative_path).
     
     Args:
         local_image_path (str): Path to the comparison image
@@ -122,6 +121,9 @@ def upload_comparison_image(local_image_path, camera_name, detection_type):
         str or None: Public URL of the uploaded image or None if failed
     """
     try:
+        # The comparison image may still be queued on the background writer
+        get_image_writer().wait_for_path(local_image_path, timeout=10)
+        
         if not os.path.exists(local_image_path):
             logger.error(f"Comparison image not found: {local_image_path}")
             return None
@@ -155,6 +157,10 @@ def upload_comparison_image(local_image_path, camera_name, detection_type):
                 file_options={"content-type": mime_type}
             )
 
+        # Upload the variants next to the original
+        for variant in DERIVATIVE_VARIANTS:
+            _upload_derivative(local_image_path, storage_path, variant)
+
         # Generate and return public URL
         public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET_DETECTIONS}/{storage_path}"
         logger.info(f"Image successfully uploaded to {detection_folder}: {public_url}")
@@ -165,7 +171,103 @@ def upload_comparison_image(local_image_path, camera_name, detection_type):
         logger.error(f"Error uploading image to Supabase: {e}")
         return None
 
-def upload_base_image(local_image_path, supabase_filename, camera_name, lighting_condition):
+def _upload_derivative(local_image_path, storage_path, variant):
+    """
+    Upload a variant of a local comparison image next to its original in the bucket.
+    
+    Args:
+        local_image_path (str): Path to the comparison image
+        storage_path (str): Storage path of the original within the detections bucket
+        variant (str): Variant name from DERIVATIVE_VARIANTS
+    
+    Returns:
+        bool: True if the variant was uploaded
+    """
+    variant_path = get_derivative_path(local_image_path, variant)
+    get_image_writer().wait_for_path(variant_path, timeout=10)
+    if not os.path.exists(variant_path):
+        logger.warning(f"No {variant} variant written for {local_image_path}")
+        return False
+    try:
+        with open(variant_path, "rb") as file:
+            supabase_client.storage.from_(SUPABASE_BUCKET_DETECTIONS).upload(
+                path=get_derivative_path(storage_path, variant),
+                file=file,
+                file_options={"content-type": "image/jpeg"}
+            )
+        return True
+    except Exception as e:
+        logger.error(f"Error uploading {variant} variant: {e}")
+        return False
+
+def upload_comparison_variant(local_image_path, image_url, variant):
+    """
+    Upload a variant of a comparison image next to the image's public URL
+    (as generated by push_to_supabase.generate_image_url).
+    
+    Args:
+        local_image_path (str): Path to the comparison image
+        image_url (str): Public URL of the comparison image in the detections bucket
+        variant (str): Variant name from DERIVATIVE_VARIANTS
+    
+    Returns:
+        str or None: Public URL of the uploaded variant or None if failed
+    """
+    prefix = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET_DETECTIONS}/"
+    if not image_url.startswith(prefix):
+        logger.warning(f"Not a detections bucket URL, skipping {variant} variant: {image_url}")
+        return None
+    
+    if not _upload_derivative(local_image_path, image_url[len(prefix):], variant):
+        return None
+    return get_derivative_path(image_url, variant)
+
+def get_event_clip_url(local_clip_path):
+    """
+    Get the public URL an event clip is uploaded to.
+    Clips keep their local filename, so the URL is known before the clip is written.
+    
+    Args:
+        local_clip_path (str): Path the clip is written to on this host
+    
+    Returns:
+        str: Public URL of the clip
+    """
+    storage_path = f"{EVENT_CLIPS_FOLDER}/{os.path.basename(local_clip_path)}"
+    return f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET_DETECTIONS}/{storage_path}"
+
+def upload_event_clip(local_clip_path):
+    """
+    Upload a written event clip to Supabase Storage, at get_event_clip_url's location.
+    Runs on the event recorder's thread once the clip has been written.
+    
+    Args:
+        local_clip_path (str): Path to the clip
+    
+    Returns:
+        str or None: Public URL of the uploaded clip or None if failed
+    """
+    try:
+        storage_path = f"{EVENT_CLIPS_FOLDER}/{os.path.basename(local_clip_path)}"
+        mime_type, _ = mimetypes.guess_type(local_clip_path)
+        
+        with open(local_clip_path, "rb") as file:
+            supabase_client.storage.from_(SUPABASE_BUCKET_DETECTIONS).upload(
+                path=storage_path,
+                file=file,
+                file_options={"content-type": mime_type or "video/mp4"}
+            )
+        
+        public_url = get_event_clip_url(local_clip_path)
+        logger.info(f"Event clip uploaded: {public_url}")
+        return public_url
+        
+    except Exception as e:
+        logger.error(f"Error uploading event clip to Supabase: {e}")
+        return None
+
+def upload_base_image(local_image_path, supabase_filename, camera_name, lighting_condition,
+                      content_hash=None, light_level=None):
     """
     Upload a base image to Supabase Storage and log its metadata.
     
@@ -174,6 +276,9 @@ def upload_base_image(local_image_path, supabase_filename, camera_name, lighting
         supabase_filename (str): Filename to use in Supabase
         camera_name (str): Name of the camera
         lighting_condition (str): Current lighting condition
+        content_hash (str, optional): Pixel hash from compute_content_hash; content
+            already uploaded to the bucket is logged with its existing URL instead
+        light_level (float, optional): Mean luminance computed at capture time
     
     Returns:
         str or None: Public URL of the uploaded image or None if failed
@@ -182,6 +287,16 @@ def upload_base_image(local_image_path, supabase_filename, camera_name, lighting
         if not os.path.exists(local_image_path):
             logger.error(f"Base image not found: {local_image_path}")
             return None
+        
+        # Skip the upload if this exact content is already in the bucket
+        if content_hash:
+            existing_url = get_content_store().get_uploaded_url(content_hash, SUPABASE_BUCKET_IMAGES)
+            if existing_url:
+                logger.info(f"Base image unchanged since a previous upload, reusing {existing_url}")
+                log_base_image_to_supabase(
+                    local_image_path, camera_name, lighting_condition, existing_url, light_level
+                )
+                return existing_url
 
         # Determine MIME type
         mime_type, _ = mimetypes.guess_type(local_image_path)
@@ -202,8 +317,11 @@ def upload_base_image(local_image_path, supabase_filename, camera_name, lighting
         # Generate public URL
         public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET_IMAGES}/{supabase_filename}"
         
+        if content_hash:
+            get_content_store().record_upload(content_hash, SUPABASE_BUCKET_IMAGES, public_url)
+        
         # Log base image metadata to Supabase
-        log_base_image_to_supabase(local_image_path, camera_name, lighting_condition, public_url)
+        log_base_image_to_supabase(local_image_path, camera_name, lighting_condition, public_url, light_level)
         
         logger.info(f"Base image successfully uploaded and logged: {public_url}")
         return public_url
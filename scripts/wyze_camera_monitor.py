@@ -25,6 +25,8 @@ from email.mime.image import MIMEImage
 from utilities.logging_utils import get_logger
 from utilities.database_utils import get_admin_subscribers
 from utilities.constants import CAMERA_MAPPINGS
+from utilities.frame_sources import create_frame_source
+from utilities.frame_statistics import compute_frame_statistics
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -76,6 +78,9 @@ class WyzeCameraMonitor:
         # Merge with provided config
         self.config = {**self.default_config, **(config or {})}
         
+        # Frame source for the camera feed area, created on first check
+        self.frame_source = None
+        
         # State tracking
         self.last_frame = None
         self.current_frame = None
@@ -99,19 +104,19 @@ class WyzeCameraMonitor:
                 - frame (PIL.Image): Current camera frame
         """
         try:
-            # Capture the camera feed area
-            x1, y1, x2, y2 = self.config['camera_roi']
-            width = abs(x2 - x1)
-            height = abs(y2 - y1)
-            
-            # Take a screenshot of the camera area
-            screenshot = pyautogui.screenshot(region=(x1, y1, width, height))
-            
-            # Convert to numpy array for analysis
-            frame_np = np.array(screenshot)
+            # Capture the camera feed area from its frame source
+            if self.frame_source is None:
+                self.frame_source = create_frame_source("Wyze Camera Feed", {
+                    'roi': self.config['camera_roi'],
+                    'frame_source': self.config.get('frame_source')
+                })
+            frame_np = self.frame_source.read()
+            if frame_np is None:
+                raise RuntimeError("Camera frame source exhausted")
+            screenshot = Image.fromarray(frame_np)
             
             # Check for black screen (disconnected camera)
-            avg_brightness = np.mean(frame_np)
+            avg_brightness = compute_frame_statistics(frame_np).mean_value
             if avg_brightness < self.config['black_screen_threshold']:
                 self.logger.warning(f"Black screen detected (brightness: {avg_brightness:.1f})")
                 return False, "black", screenshot
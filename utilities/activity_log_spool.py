@@ -0,0 +1,320 @@
+# File: utilities/activity_log_spool.py
+# Purpose: Durable local spool for owl_activity_log rows, uploaded in batches off the detection loop
+#
+# Activity log rows used to be inserted one at a time with a blocking Supabase call
+# inside the capture loop, so a slow or unreachable Supabase stalled detection and
+# a failed insert lost the row. Rows are now appended to a SQLite spool (WAL mode,
+# a local commit only) and a background flusher bulk-inserts pending rows. Failed
+# batches are retried with exponential backoff; rows survive restarts and are sent
+# on the next start. Each enqueue returns a Future that resolves to the inserted
+# row (with its Supabase id) so alerts can still be linked to the log entry.
+#
+# Settings:
+#   OWL_ACTIVITY_LOG_SPOOL            Spool rows instead of inserting directly (default True)
+#   OWL_ACTIVITY_LOG_BATCH_SIZE       Rows per insert (default 50)
+#   OWL_ACTIVITY_LOG_FLUSH_INTERVAL   Seconds to gather rows before a partial batch (default 1)
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import Future
+from utilities.logging_utils import get_logger
+from utilities.constants import ACTIVITY_LOG_SPOOL
+
+# Initialize logger
+logger = get_logger()
+
+# Retry backoff after a failed batch: 2, 4, 8 ... seconds, up to 5 minutes
+INITIAL_BACKOFF = 2.0
+MAX_BACKOFF = 300.0
+
+# Rows are kept but no longer retried after this many failed attempts
+MAX_ATTEMPTS = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+"""
+
+class ActivityLogSpool:
+    """
+    SQLite spool of rows with a background batch flusher.
+
+    Attributes:
+        sent (int): Rows inserted
+        failed_batches (int): Batches that raised an error
+    """
+
+    def __init__(self, spool_path, insert_batch, batch_size=50, flush_interval=1.0):
+        """
+        Open (or create) the spool. The flusher starts on the first enqueue, or
+        immediately if rows are left from a previous run.
+
+        Args:
+            spool_path (str): Path to the SQLite spool file
+            insert_batch (callable): Inserts a list of row dicts and returns the
+                inserted rows in the same order (raises on failure)
+            batch_size (int): Maximum rows per insert
+            flush_interval (float): Seconds to wait for a full batch
+        """
+        self.spool_path = spool_path
+        self.insert_batch = insert_batch
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval, 0.0)
+        self.condition = threading.Condition()
+        self.futures = {}
+        self.thread = None
+        self.backoff = 0.0
+        self.retry_at = 0.0
+        self.sent = 0
+        self.failed_batches = 0
+
+        directory = os.path.dirname(spool_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Enqueues come from camera threads and the flusher has its own thread
+        self.connection = sqlite3.connect(spool_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self.connection.commit()
+
+        pending = self.get_pending_count()
+        if pending:
+            logger.info(f"{pending} activity log rows waiting in spool from a previous run")
+            with self.condition:
+                self._start_flusher()
+
+    def _start_flusher(self):
+        """Start the flusher thread. Caller holds the lock."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="ActivityLogFlusher", daemon=True)
+            self.thread.start()
+
+    def enqueue(self, row):
+        """
+        Append a row to the spool. Only a local commit happens here.
+
+        Args:
+            row (dict): JSON-serializable row for owl_activity_log
+
+        Returns:
+            concurrent.futures.Future: Resolves to the inserted row, or raises
+                if the row is given up after MAX_ATTEMPTS
+        """
+        future = Future()
+        payload = json.dumps(row)
+
+        with self.condition:
+            cursor = self.connection.execute(
+                "INSERT INTO spool (payload, created) VALUES (?, ?)", (payload, time.time())
+            )
+            self.connection.commit()
+            self.futures[cursor.lastrowid] = future
+            self._start_flusher()
+            self.condition.notify_all()
+
+        return future
+
+    def get_pending_count(self):
+        """
+        Get the number of rows still to be sent.
+
+        Returns:
+            int: Rows waiting in the spool
+        """
+        with self.condition:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM spool WHERE attempts < ?", (MAX_ATTEMPTS,)
+            ).fetchone()[0]
+
+    def _next_batch(self):
+        """Get the oldest sendable rows. Caller holds the lock."""
+        return self.connection.execute(
+            "SELECT id, payload FROM spool WHERE attempts < ? ORDER BY id LIMIT ?",
+            (MAX_ATTEMPTS, self.batch_size)
+        ).fetchall()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                # Wait for a full batch, the flush interval, or the end of a backoff
+                while True:
+                    now = time.time()
+                    if now < self.retry_at:
+                        self.condition.wait(self.retry_at - now)
+                        continue
+                    batch = self._next_batch()
+                    if len(batch) >= self.batch_size:
+                        break
+                    if not batch:
+                        self.condition.wait()
+                        continue
+                    remaining = self.flush_interval - (now - self._oldest_created())
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+            self._send(batch)
+
+    def _oldest_created(self):
+        """Get the enqueue time of the oldest sendable row. Caller holds the lock."""
+        row = self.connection.execute(
+            "SELECT MIN(created) FROM spool WHERE attempts < ?", (MAX_ATTEMPTS,)
+        ).fetchone()
+        return row[0] or 0.0
+
+    def _send(self, batch):
+        """Insert a batch and settle its rows; runs without the lock held."""
+        ids = [row_id for row_id, _ in batch]
+        rows = [json.loads(payload) for _, payload in batch]
+
+        try:
+            inserted = self.insert_batch(rows)
+            if not inserted or len(inserted) != len(rows):
+                raise RuntimeError(f"expected {len(rows)} inserted rows, got {len(inserted or [])}")
+        except Exception as e:
+            self._record_failure(ids, e)
+            return
+
+        with self.condition:
+            self.connection.executemany("DELETE FROM spool WHERE id = ?", [(row_id,) for row_id in ids])
+            self.connection.commit()
+            futures = [self.futures.pop(row_id, None) for row_id in ids]
+            self.backoff = 0.0
+            self.sent += len(ids)
+
+        for future, inserted_row in zip(futures, inserted):
+            if future is not None:
+                future.set_result(inserted_row)
+
+        logger.debug(f"Uploaded {len(ids)} activity log rows")
+
+    def _record_failure(self, ids, error):
+        """Count a failed attempt on each row and back off before retrying."""
+        given_up = []
+        with self.condition:
+            self.connection.executemany(
+                "UPDATE spool SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(str(error), row_id) for row_id in ids]
+            )
+            self.connection.commit()
+            for (row_id,) in self.connection.execute(
+                f"SELECT id FROM spool WHERE attempts >= ? AND id IN ({','.join('?' * len(ids))})",
+                (MAX_ATTEMPTS, *ids)
+            ).fetchall():
+                given_up.append(self.futures.pop(row_id, None))
+
+            self.failed_batches += 1
+            self.backoff = min(self.backoff * 2 if self.backoff else INITIAL_BACKOFF, MAX_BACKOFF)
+            self.retry_at = time.time() + self.backoff
+
+        logger.error(
+            f"Error uploading {len(ids)} activity log rows, retrying in {self.backoff:.0f} seconds: {error}"
+        )
+        if given_up:
+            logger.error(f"Gave up on {len(given_up)} activity log rows after {MAX_ATTEMPTS} attempts; kept in spool")
+        for future in given_up:
+            if future is not None:
+                future.set_exception(RuntimeError(f"Activity log upload failed: {error}"))
+
+    def flush(self, timeout=None):
+        """
+        Send waiting rows now and wait until the spool is empty.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if every sendable row was sent
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            self.retry_at = 0.0
+            saved_interval, self.flush_interval = self.flush_interval, 0.0
+            self.condition.notify_all()
+        try:
+            while self.get_pending_count():
+                if deadline is not None and time.time() >= deadline:
+                    return False
+                time.sleep(0.05)
+            return True
+        finally:
+            with self.condition:
+                self.flush_interval = saved_interval
+
+def is_activity_log_spooled():
+    """
+    Check whether activity log rows go through the spool.
+
+    Returns:
+        bool: True if OWL_ACTIVITY_LOG_SPOOL is enabled (the default)
+    """
+    return os.getenv('OWL_ACTIVITY_LOG_SPOOL', 'True').lower() == 'true'
+
+# Shared spool, created on first use
+_activity_log_spool = None
+_activity_log_spool_lock = threading.Lock()
+
+def get_activity_log_spool(insert_batch):
+    """
+    Get the shared activity log spool configured from the environment.
+
+    Args:
+        insert_batch (callable): Batch insert function, used when the spool is created
+
+    Returns:
+        ActivityLogSpool: The shared spool
+    """
+    global _activity_log_spool
+    with _activity_log_spool_lock:
+        if _activity_log_spool is None:
+            try:
+                batch_size = int(os.getenv('OWL_ACTIVITY_LOG_BATCH_SIZE', '50'))
+                flush_interval = float(os.getenv('OWL_ACTIVITY_LOG_FLUSH_INTERVAL', '1'))
+            except ValueError:
+                logger.warning("Invalid activity log spool settings, using batches of 50 every 1 second")
+                batch_size, flush_interval = 50, 1.0
+            _activity_log_spool = ActivityLogSpool(ACTIVITY_LOG_SPOOL, insert_batch, batch_size, flush_interval)
+            logger.info(f"Spooling activity log rows to {ACTIVITY_LOG_SPOOL} (batches of {batch_size})")
+        return _activity_log_spool
+
+if __name__ == "__main__":
+    try:
+        import tempfile
+
+        logger.info("Testing activity log spool...")
+        attempts = {"count": 0}
+
+        def _flaky_insert(rows):
+            # Fail the first batch to exercise the backoff, then assign ids
+            attempts["count"] += 1
+            if attempts["count"] == 1:
+                raise ConnectionError("simulated outage")
+            time.sleep(0.05)
+            return [dict(row, id=attempts["count"] * 1000 + i) for i, row in enumerate(rows)]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            spool = ActivityLogSpool(os.path.join(temp_dir, "spool.sqlite3"), _flaky_insert, batch_size=20)
+
+            start = time.perf_counter()
+            futures = [spool.enqueue({"owl_in_box": 1, "owl_confidence_score": float(i)}) for i in range(100)]
+            enqueue_ms = (time.perf_counter() - start) * 1000 / len(futures)
+
+            sent_all = spool.flush(timeout=30)
+            logger.info(
+                f"Enqueue {enqueue_ms:.2f} ms/row; all sent: {sent_all}; "
+                f"{spool.sent} rows in {attempts['count']} inserts; first id {futures[0].result()['id']}"
+            )
+
+    except Exception as e:
+        logger.error(f"Activity log spool test failed: {e}")
+        raise
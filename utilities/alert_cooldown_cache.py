@@ -0,0 +1,182 @@
+# File: utilities/alert_cooldown_cache.py
+# Purpose: Keep the last alert time per alert type locally for cooldown checks
+#
+# Cooldown checks used to query Supabase (two column checks plus an ordered alerts
+# query) every time an alert was about to be sent, so each alert waited on the
+# network and nothing could be sent while Supabase was unreachable. The last alert
+# time per type is now kept in memory and written through to a small JSON file on
+# every alert, so restarts keep their cooldowns. The cache is warmed from Supabase
+# once, on the first cooldown check (not at import), keeping whichever time is
+# newer, in case alerts were sent from another machine while this one was down.
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+from utilities.logging_utils import get_logger
+from utilities.constants import ALERT_COOLDOWN_CACHE
+
+# Initialize logger
+logger = get_logger()
+
+def _parse_time(value):
+    """Parse an ISO timestamp into a timezone-aware datetime (UTC if none is given)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+class AlertCooldownCache:
+    """
+    Last alert time per alert type, in memory and persisted to a JSON file.
+
+    Attributes:
+        warmed (bool): Whether the cache has been warmed from the database
+    """
+
+    def __init__(self, cache_path):
+        """
+        Load the cache from disk, if it exists.
+
+        Args:
+            cache_path (str): Path to the JSON cache file
+        """
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.last_alert_times = {}
+        self.warmed = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r") as file:
+                stored = json.load(file)
+            self.last_alert_times = {
+                alert_type: _parse_time(sent_at) for alert_type, sent_at in stored.items()
+            }
+            logger.debug(f"Loaded alert cooldowns for {len(self.last_alert_times)} alert types")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error loading alert cooldown cache: {e}")
+
+    def _save(self):
+        """Write the cache to disk atomically. Caller holds the lock."""
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(
+                    {alert_type: sent_at.isoformat() for alert_type, sent_at in self.last_alert_times.items()},
+                    file,
+                    indent=2
+                )
+            os.replace(temp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Error saving alert cooldown cache: {e}")
+
+    def warm(self, fetch_last_alert_time, alert_types):
+        """
+        Merge the last alert times stored in the database, keeping the newer time.
+
+        Args:
+            fetch_last_alert_time (callable): Returns the database's last alert
+                time (datetime, ISO string or None) for an alert type
+            alert_types (iterable): Alert types to fetch
+        """
+        fetched = {}
+        for alert_type in alert_types:
+            try:
+                sent_at = fetch_last_alert_time(alert_type)
+                if sent_at:
+                    fetched[alert_type] = _parse_time(sent_at)
+            except Exception as e:
+                logger.error(f"Error warming alert cooldown for {alert_type}: {e}")
+
+        with self.lock:
+            for alert_type, sent_at in fetched.items():
+                cached = self.last_alert_times.get(alert_type)
+                if cached is None or sent_at > cached:
+                    self.last_alert_times[alert_type] = sent_at
+            self.warmed = True
+            self._save()
+
+        logger.info(f"Alert cooldown cache warmed with {len(fetched)} alert types from the database")
+
+    def get_last_alert_time(self, alert_type):
+        """
+        Get the last time an alert of a type was sent.
+
+        Args:
+            alert_type (str): Type of alert
+
+        Returns:
+            datetime or None: Timezone-aware last alert time, or None if none is known
+        """
+        with self.lock:
+            return self.last_alert_times.get(alert_type)
+
+    def record_alert(self, alert_type, sent_at=None):
+        """
+        Record that an alert was sent and persist it.
+
+        Args:
+            alert_type (str): Type of alert
+            sent_at (datetime, optional): When it was sent (defaults to now)
+        """
+        sent_at = _parse_time(sent_at) if sent_at else datetime.now(timezone.utc)
+        with self.lock:
+            cached = self.last_alert_times.get(alert_type)
+            if cached is None or sent_at > cached:
+                self.last_alert_times[alert_type] = sent_at
+                self._save()
+
+# Shared cache, created on first use
+_alert_cooldown_cache = None
+_alert_cooldown_cache_lock = threading.Lock()
+
+def get_alert_cooldown_cache():
+    """
+    Get the shared alert cooldown cache.
+
+    Returns:
+        AlertCooldownCache: The shared cache
+    """
+    global _alert_cooldown_cache
+    with _alert_cooldown_cache_lock:
+        if _alert_cooldown_cache is None:
+            _alert_cooldown_cache = AlertCooldownCache(ALERT_COOLDOWN_CACHE)
+        return _alert_cooldown_cache
+
+if __name__ == "__main__":
+    try:
+        import time
+        import tempfile
+        from datetime import timedelta
+
+        logger.info("Testing alert cooldown cache...")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "alert_cooldowns.json")
+            cache = AlertCooldownCache(cache_path)
+            remote_time = datetime.now(timezone.utc) - timedelta(minutes=5)
+            cache.warm(lambda alert_type: remote_time.isoformat() if alert_type == "Owl In Box" else None,
+                       ["Owl In Box", "Owl On Box"])
+            cache.record_alert("Owl On Box")
+
+            start = time.perf_counter()
+            for _ in range(10000):
+                cache.get_last_alert_time("Owl In Box")
+            lookup_us = (time.perf_counter() - start) * 100
+
+            reloaded = AlertCooldownCache(cache_path)
+            logger.info(
+                f"Lookup {lookup_us:.2f} us; reloaded {len(reloaded.last_alert_times)} alert types, "
+                f"Owl In Box at {reloaded.get_last_alert_time('Owl In Box')}"
+            )
+
+    except Exception as e:
+        logger.error(f"Alert cooldown cache test failed: {e}")
+        raise
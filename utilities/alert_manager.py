@@ -11,16 +11,20 @@ import pytz
 import time
 import threading
 import os
+from concurrent.futures import Future
 from utilities.logging_utils import get_logger
 from utilities.constants import ALERT_PRIORITIES, SUPABASE_STORAGE, get_detection_folder
 from alert_email import send_email_alert
+from utilities.image_derivatives import is_derivatives_enabled
+from upload_images_to_supabase import upload_comparison_variant
 
 # Import from push_to_supabase
 from push_to_supabase import (
     check_alert_eligibility,
     create_alert_entry,
     update_alert_status,
-    generate_alert_id
+    generate_alert_id,
+    link_alert_to_activity_log
 )
 
 # Import from database_utils
@@ -155,7 +159,7 @@ class AlertManager:
                     return True
         return False
 
-    def _send_email_alert_async(self, camera_name, alert_type, alert_entry, alert_id, comparison_image_url=None, confidence_info=None, is_test=False):
+    def _send_email_alert_async(self, camera_name, alert_type, alert_entry, alert_id, comparison_image_url=None, confidence_info=None, is_test=False, comparison_path=None):
         """
         Background thread function to send email alerts.
         Simplified in v1.3.0 to focus only on email alerts.
@@ -168,6 +172,7 @@ class AlertManager:
             comparison_image_url (str, optional): URL to the comparison image
             confidence_info (dict, optional): Confidence information
             is_test (bool, optional): Whether this is a test alert
+            comparison_path (str, optional): Local comparison image to upload the email variant from
         """
         try:
             # Refresh alert settings from environment variables (in case they've changed)
@@ -187,6 +192,12 @@ class AlertManager:
                     email_count = len(email_subscribers) if email_subscribers else 0
                     logger.info(f"Sending email alerts to {email_count} subscribers")
                     
+                    # Embed the email-sized variant and link the full comparison image;
+                    # the variant is uploaded first, so the email never links a missing object
+                    preview_url = None
+                    if comparison_image_url and comparison_path and is_derivatives_enabled():
+                        preview_url = upload_comparison_variant(comparison_path, comparison_image_url, "email")
+                    
                     # Send email alert with test prefix, image URL, and alert ID
                     send_email_alert(
                         camera_name, 
@@ -194,7 +205,8 @@ class AlertManager:
                         is_test=is_test, 
                         test_prefix=test_prefix,
                         image_url=comparison_image_url,
-                        alert_id=alert_id
+                        alert_id=alert_id,
+                        preview_url=preview_url
                     )
                 except Exception as e:
                     logger.error(f"Error sending email alerts: {e}")
@@ -252,7 +264,40 @@ class AlertManager:
         except Exception as e:
             logger.error(f"Error in background alert processing: {e}")
 
-    def _send_alert(self, camera_name, alert_type, activity_log_id=None, comparison_image_url=None, confidence_info=None, is_test=False, trigger_condition=None):
+    def _get_activity_log_id(self, activity_log_future):
+        """
+        Get the activity log ID from a spooled entry if it has already been uploaded.
+
+        Args:
+            activity_log_future (Future): Future from push_log_to_supabase
+
+        Returns:
+            int or None: Entry ID, or None if the upload hasn't finished or failed
+        """
+        if not activity_log_future.done() or activity_log_future.cancelled():
+            return None
+        if activity_log_future.exception() is not None:
+            return None
+        entry = activity_log_future.result()
+        return entry.get("id") if entry else None
+
+    def _link_activity_log(self, alert_id, activity_log_future):
+        """
+        Link an alert to its activity log entry once the entry has been uploaded.
+
+        Args:
+            alert_id (str): Unique identifier of the alert
+            activity_log_future (Future): Completed future from push_log_to_supabase
+        """
+        activity_log_id = self._get_activity_log_id(activity_log_future)
+        if activity_log_id is None:
+            logger.warning(f"Activity log entry for alert {alert_id} was not uploaded, alert left unlinked")
+            return
+        link_alert_to_activity_log(alert_id, activity_log_id)
+        if alert_id in self.alert_ids:
+            self.alert_ids[alert_id]['activity_log_id'] = activity_log_id
+
+    def _send_alert(self, camera_name, alert_type, activity_log_id=None, comparison_image_url=None, confidence_info=None, is_test=False, trigger_condition=None, comparison_path=None):
         """
         Send email alerts based on alert type and cooldown period.
         Simplified in v1.3.0 to focus only on email alerts.
@@ -260,11 +305,14 @@ class AlertManager:
         Args:
             camera_name (str): Name of the camera that triggered the alert
             alert_type (str): Type of alert ("Owl In Box", "Owl On Box", "Owl In Area", etc.)
-            activity_log_id (int, optional): ID of the corresponding activity log entry
+            activity_log_id (int or Future, optional): ID of the corresponding activity
+                log entry, or the Future from push_log_to_supabase resolving to the entry
             comparison_image_url (str, optional): URL to the comparison image
             confidence_info (dict, optional): Confidence information for this alert
             is_test (bool, optional): Whether this is a test alert
             trigger_condition (str, optional): What triggered this alert
+            comparison_path (str, optional): Local comparison image, whose email
+                variant is uploaded next to comparison_image_url
 
         Returns:
             bool: True if alert was sent, False otherwise
@@ -299,6 +347,12 @@ class AlertManager:
             is_eligible = True
             logger.info(f"Test alert for {alert_type} - bypassing cooldown check")
 
+        # The activity log entry may still be waiting in the upload spool; link it when it lands
+        activity_log_future = None
+        if isinstance(activity_log_id, Future):
+            activity_log_future = activity_log_id
+            activity_log_id = self._get_activity_log_id(activity_log_future)
+
         # Create a new alert entry in the database with the alert ID and trigger condition
         alert_entry = create_alert_entry(
             alert_type, 
@@ -317,11 +371,17 @@ class AlertManager:
                 'activity_log_id': activity_log_id
             }
             
+            if activity_log_id is None and activity_log_future is not None:
+                activity_log_future.add_done_callback(
+                    lambda done: self._link_activity_log(alert_id, done)
+                )
+            
             # Start a background thread to send emails
             # This prevents the UI from freezing during network operations
             thread = threading.Thread(
                 target=self._send_email_alert_async,
-                args=(camera_name, alert_type, alert_entry, alert_id, comparison_image_url, confidence_info, is_test)
+                args=(camera_name, alert_type, alert_entry, alert_id, comparison_image_url, confidence_info, is_test,
+                      comparison_path)
             )
             thread.daemon = True  # Make thread exit when main thread exits
             thread.start()
@@ -456,7 +516,8 @@ class AlertManager:
         Args:
             camera_name (str): Name of the camera that triggered the detection
             detection_result (dict): Dictionary containing detection results
-            activity_log_id (int, optional): ID of the corresponding owl_activity_log entry
+            activity_log_id (int or Future, optional): ID of the corresponding owl_activity_log
+                entry, or the Future from push_log_to_supabase resolving to the entry
             is_test (bool, optional): Whether this is a test alert that should bypass confidence checks
 
         Returns:
@@ -488,8 +549,9 @@ class AlertManager:
             logger.debug(f"No owl detected for {alert_type}, skipping alert")
             return False
             
-        # Get image URL if available
+        # Get image URL (and the local image its variants are uploaded from) if available
         comparison_image_url = detection_result.get("comparison_image_url")
+        comparison_path = detection_result.get("comparison_path")
             
         # Extract confidence information
         confidence_info = {
@@ -529,7 +591,8 @@ class AlertManager:
                 comparison_image_url, 
                 confidence_info, 
                 is_test=True,
-                trigger_condition=f"TEST: {trigger_condition}"
+                trigger_condition=f"TEST: {trigger_condition}",
+                comparison_path=comparison_path
             )
         elif alert_type in ["Eggs Or Babies", "Two Owls In Box"]:
             # Highest priority alerts - always send
@@ -539,7 +602,8 @@ class AlertManager:
                 activity_log_id, 
                 comparison_image_url, 
                 confidence_info,
-                trigger_condition=trigger_condition
+                trigger_condition=trigger_condition,
+                comparison_path=comparison_path
             )
         elif alert_type == "Two Owls":
             # Only suppressed by eggs/babies or owls in box
@@ -550,7 +614,8 @@ class AlertManager:
                     activity_log_id, 
                     comparison_image_url, 
                     confidence_info,
-                    trigger_condition=trigger_condition
+                    trigger_condition=trigger_condition,
+                    comparison_path=comparison_path
                 )
         elif alert_type == "Owl In Box":
             # Suppressed by any multiple owl alert or eggs/babies
@@ -563,7 +628,8 @@ class AlertManager:
                     activity_log_id, 
                     comparison_image_url, 
                     confidence_info,
-                    trigger_condition=trigger_condition
+                    trigger_condition=trigger_condition,
+                    comparison_path=comparison_path
                 )
         elif alert_type == "Owl On Box":
             # Suppressed by box, multiple owls, or eggs/babies 
@@ -577,7 +643,8 @@ class AlertManager:
                     activity_log_id, 
                     comparison_image_url, 
                     confidence_info,
-                    trigger_condition=trigger_condition
+                    trigger_condition=trigger_condition,
+                    comparison_path=comparison_path
                 )
         elif alert_type == "Owl In Area":
             # Lowest priority - suppressed by all others
@@ -592,7 +659,8 @@ class AlertManager:
                     activity_log_id, 
                     comparison_image_url, 
                     confidence_info,
-                    trigger_condition=trigger_condition
+                    trigger_condition=trigger_condition,
+                    comparison_path=comparison_path
                 )
 
         return False
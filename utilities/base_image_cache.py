@@ -0,0 +1,103 @@
+# File: utilities/base_image_cache.py
+# Purpose: Keep decoded base images in memory between detection cycles
+#
+# Base images change at most every few hours, but every cycle used to decode the
+# JPEG and convert it to RGB and grayscale again. Entries are keyed by camera and
+# lighting condition and revalidated against the file's mtime and size with one
+# os.stat per lookup; save_base_image also invalidates them explicitly.
+
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from utilities.logging_utils import get_logger
+
+# Initialize logger
+logger = get_logger()
+
+# Cached base images keyed by (camera_name, lighting_condition)
+_base_image_cache = {}
+_base_image_cache_lock = threading.Lock()
+
+def _load_base_image(image_path, stat_result):
+    """
+    Decode a base image into read-only RGB and grayscale arrays.
+
+    Args:
+        image_path (str): Path to the base image
+        stat_result (os.stat_result): Stat of the file taken before decoding
+
+    Returns:
+        dict: Cache entry
+    """
+    with Image.open(image_path) as image:
+        rgb = np.asarray(image.convert("RGB"))
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+    # Shared between cycles and threads, so guard against in-place edits
+    rgb.setflags(write=False)
+    gray.setflags(write=False)
+
+    return {
+        'path': image_path,
+        'mtime_ns': stat_result.st_mtime_ns,
+        'size': stat_result.st_size,
+        'ctime': stat_result.st_ctime,
+        'rgb': rgb,
+        'gray': gray
+    }
+
+def get_base_image(camera_name, lighting_condition, image_path):
+    """
+    Get the decoded base image for a camera, loading it only when it changed.
+
+    Args:
+        camera_name (str): Name of the camera
+        lighting_condition (str): Lighting condition the base image is used for
+        image_path (str): Path from get_latest_base_image
+
+    Returns:
+        dict: Cache entry with:
+            - path: Base image path
+            - ctime: File change time (for base image age)
+            - rgb: Read-only HxWx3 uint8 RGB array
+            - gray: Read-only HxW uint8 grayscale array
+    """
+    key = (camera_name, lighting_condition)
+    stat_result = os.stat(image_path)
+
+    with _base_image_cache_lock:
+        entry = _base_image_cache.get(key)
+        if (entry is not None and
+                entry['path'] == image_path and
+                entry['mtime_ns'] == stat_result.st_mtime_ns and
+                entry['size'] == stat_result.st_size):
+            return entry
+
+    entry = _load_base_image(image_path, stat_result)
+    logger.debug(f"Loaded base image for {camera_name} ({lighting_condition}): {image_path}")
+
+    with _base_image_cache_lock:
+        _base_image_cache[key] = entry
+    return entry
+
+def invalidate_base_images(image_path=None):
+    """
+    Drop cached base images.
+
+    Args:
+        image_path (str, optional): Only drop entries loaded from this path;
+            all entries are dropped when not given
+    """
+    with _base_image_cache_lock:
+        if image_path is None:
+            _base_image_cache.clear()
+            return
+
+        stale_keys = [key for key, entry in _base_image_cache.items() if entry['path'] == image_path]
+        for key in stale_keys:
+            del _base_image_cache[key]
+
+    if stale_keys:
+        logger.debug(f"Invalidated cached base image: {image_path}")
@@ -36,11 +36,20 @@ BASE_IMAGES_DIR = os.path.join(LOCAL_FILES_DIR, "base_images")
 IMAGE_COMPARISONS_DIR = os.path.join(LOCAL_FILES_DIR, "image_comparisons")
 LOGS_DIR = os.path.join(LOCAL_FILES_DIR, "logs")
 SAVED_IMAGES_DIR = os.path.join(LOGS_DIR, "saved_images")  # New folder for saved images when local saving is enabled
+SAVED_IMAGES_INDEX = os.path.join(LOGS_DIR, "saved_images_index.sqlite3")  # Index used to enforce saved image quotas
+CONTENT_STORE_DIR = os.path.join(LOGS_DIR, "content_store")  # Saved images stored once per distinct content
+FRAME_ARCHIVE_DIR = os.getenv("OWL_FRAME_ARCHIVE_DIR", os.path.join(LOCAL_FILES_DIR, "frame_archive"))  # Raw frames for replay
+EVENT_CLIPS_DIR = os.path.join(LOGS_DIR, "event_clips")  # Video clips recorded around detections
+ACTIVITY_LOG_SPOOL = os.path.join(LOGS_DIR, "activity_log_spool.sqlite3")  # Activity log rows waiting to be uploaded
+LOCAL_DATABASE_DIR = os.getenv("OWL_LOCAL_DATABASE_DIR", os.path.join(LOCAL_FILES_DIR, "local_database"))  # Offline stand-in for Supabase
+ALERT_COOLDOWN_CACHE = os.path.join(LOGS_DIR, "alert_cooldowns.json")  # Last alert time per alert type
+COMPARISON_PREVIEW_REQUEST = os.path.join(LOCAL_FILES_DIR, "comparison_preview_request.json")  # GUI request to render deferred comparisons
 
 # Input config files
 INPUT_CONFIG_FILES = {
     "config": os.path.join(CONFIGS_DIR, "config.json"),
-    "sunrise_sunset": os.path.join(CONFIGS_DIR, "LA_Sunrise_Sunset.txt")
+    "sunrise_sunset": os.path.join(CONFIGS_DIR, "LA_Sunrise_Sunset.txt"),
+    "image_encoding": os.path.join(CONFIGS_DIR, "image_encoding.json")  # Optional overrides
 }
 
 # Camera name to type mapping
@@ -195,6 +204,29 @@ def get_saved_image_path(camera_name, image_type, timestamp=None, alert_type=Non
     # Return the full path
     return os.path.join(SAVED_IMAGES_DIR, filename)
 
+def get_event_clip_path(camera_name, timestamp=None, extension=".mp4"):
+    """
+    Get the path for a video clip recorded around a detection.
+    
+    Args:
+        camera_name (str): Name of the camera
+        timestamp (datetime, optional): Time of the detection
+        extension (str): Clip file extension (".mp4" or ".avi")
+        
+    Returns:
+        str: Path for the event clip
+    """
+    if not timestamp:
+        timestamp = datetime.now(pytz.timezone('America/Los_Angeles'))
+    
+    camera_name_clean = camera_name.lower().replace(' ', '_')
+    ts_str = timestamp.strftime('%Y%m%d_%H%M%S')
+    
+    # Ensure directory exists
+    os.makedirs(EVENT_CLIPS_DIR, exist_ok=True)
+    
+    return os.path.join(EVENT_CLIPS_DIR, f"{camera_name_clean}_event_{ts_str}{extension}")
+
 def get_detection_folder(alert_type):
     """
     Get the folder name for a detection type within the owl_detections bucket.
@@ -241,7 +273,9 @@ def ensure_directories_exist():
         BASE_IMAGES_DIR,
         IMAGE_COMPARISONS_DIR,
         LOGS_DIR,
-        SAVED_IMAGES_DIR
+        SAVED_IMAGES_DIR,
+        CONTENT_STORE_DIR,
+        EVENT_CLIPS_DIR
     ]
 
     for directory in directories:
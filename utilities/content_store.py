@@ -0,0 +1,224 @@
+# File: utilities/content_store.py
+# Purpose: Store each distinct image once, addressed by a hash of its pixels
+#
+# Local saving used to write the same cached base image with every comparison set,
+# and base image captures uploaded full images even when the content hadn't
+# changed. Images stored here are named by the SHA-256 of their exact pixel data
+# (plus shape) and sharded by the first two hex digits:
+#   content_store/objects/3f/3fa4...e1.jpg
+# An object is only encoded and written the first time its content is seen. The
+# index also remembers which hashes were uploaded to which bucket, so uploads of
+# content already in the bucket can reuse its URL.
+#
+# Only identical pixels share an object. This deduplicates the cached base image,
+# which is saved unchanged with every image set until it is recaptured. Two live
+# captures of the same scene differ in sensor noise and almost never hash equal,
+# so a fresh base image capture is normally stored and uploaded again.
+#
+# Objects are written through the image writer and indexed by the local image
+# store like other saved images. If quota eviction removes an object still in use,
+# the next put writes it again.
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from utilities.logging_utils import get_logger
+from utilities.constants import CONTENT_STORE_DIR
+from utilities.image_encoding import get_output_path
+from utilities.image_writer import get_image_writer
+from utilities.local_image_store import track_saved_image, get_local_image_store
+
+# Initialize logger
+logger = get_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    digest TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    url TEXT NOT NULL,
+    uploaded_at REAL NOT NULL,
+    PRIMARY KEY (digest, bucket)
+);
+"""
+
+def compute_content_hash(image):
+    """
+    Hash an image's exact pixel data; any changed pixel gives a new hash.
+
+    Args:
+        image (PIL.Image or numpy.ndarray): Image to hash
+
+    Returns:
+        str: Hex SHA-256 of the shape and pixels
+    """
+    array = np.ascontiguousarray(np.asarray(image))
+    digest = hashlib.sha256(f"{array.shape}{array.dtype}".encode())
+    digest.update(array)
+    return digest.hexdigest()
+
+class ContentStore:
+    """
+    Content-addressed image objects plus a record of uploaded content.
+
+    Attributes:
+        stored (int): Objects written
+        reused (int): Puts that found their content already stored
+    """
+
+    def __init__(self, root_dir):
+        """
+        Open (or create) the store.
+
+        Args:
+            root_dir (str): Directory holding objects/ and the index
+        """
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.stored = 0
+        self.reused = 0
+
+        self.connection = sqlite3.connect(os.path.join(root_dir, "index.sqlite3"), check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+        self.connection.commit()
+
+    def get_object_path(self, digest, output_type="saved_image"):
+        """
+        Get the path of a content object.
+
+        Args:
+            digest (str): Content hash
+            output_type (str): Output type whose encoding (and extension) to use
+
+        Returns:
+            str: Sharded object path
+        """
+        return get_output_path(os.path.join(self.objects_dir, digest[:2], digest), output_type)
+
+    def put(self, image, camera_name, output_type="saved_image", is_detection=False):
+        """
+        Store an image unless identical content is already stored. Reusing an
+        object for a detection flags it as a detection image in the saved image index.
+
+        Args:
+            image (PIL.Image or numpy.ndarray): Image to store
+            camera_name (str): Name of the camera (for quota accounting)
+            output_type (str): Output type whose encoding to use
+            is_detection (bool): Whether the image belongs to an owl detection
+
+        Returns:
+            tuple: (digest, object_path)
+        """
+        digest = compute_content_hash(image)
+        path = self.get_object_path(digest, output_type)
+
+        with self.lock:
+            if path in self.pending:
+                # Flagged once the pending write has been indexed
+                self.pending[path] = self.pending[path] or is_detection
+                self.reused += 1
+                return digest, path
+            if os.path.exists(path):
+                self.reused += 1
+                reused = True
+            else:
+                self.pending[path] = is_detection
+                reused = False
+
+        if reused:
+            if is_detection:
+                get_local_image_store().mark_detection(path)
+            return digest, path
+
+        future = get_image_writer().submit(image, path, output_type=output_type)
+        track_saved_image(future, camera_name, is_detection)
+
+        def _on_written(done):
+            # Runs after track_saved_image's callback has indexed the object
+            with self.lock:
+                marked = self.pending.pop(path, False)
+            if not done.cancelled() and done.exception() is None and done.result():
+                self.stored += 1
+                if marked and not is_detection:
+                    get_local_image_store().mark_detection(path)
+
+        future.add_done_callback(_on_written)
+        return digest, path
+
+    def get_uploaded_url(self, digest, bucket):
+        """
+        Get the URL of content already uploaded to a bucket.
+
+        Args:
+            digest (str): Content hash
+            bucket (str): Storage bucket name
+
+        Returns:
+            str or None: Public URL, or None if not uploaded
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT url FROM uploads WHERE digest = ? AND bucket = ?", (digest, bucket)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_upload(self, digest, bucket, url):
+        """
+        Remember that content was uploaded to a bucket.
+
+        Args:
+            digest (str): Content hash
+            bucket (str): Storage bucket name
+            url (str): Public URL of the upload
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO uploads (digest, bucket, url, uploaded_at) VALUES (?, ?, ?, ?)",
+                (digest, bucket, url, time.time())
+            )
+            self.connection.commit()
+
+# Shared store, created on first use
+_content_store = None
+_content_store_lock = threading.Lock()
+
+def get_content_store():
+    """
+    Get the shared content store.
+
+    Returns:
+        ContentStore: The shared store
+    """
+    global _content_store
+    with _content_store_lock:
+        if _content_store is None:
+            _content_store = ContentStore(CONTENT_STORE_DIR)
+        return _content_store
+
+if __name__ == "__main__":
+    try:
+        logger.info("Testing content hashing...")
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (341, 644, 3), dtype=np.uint8)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            digest = compute_content_hash(frame)
+        hash_ms = (time.perf_counter() - start) * 10
+
+        changed = frame.copy()
+        changed[0, 0, 0] ^= 1
+        logger.info(
+            f"Hash {digest[:12]}... in {hash_ms:.2f} ms; "
+            f"one changed pixel gives a new hash: {compute_content_hash(changed) != digest}"
+        )
+
+    except Exception as e:
+        logger.error(f"Content store test failed: {e}")
+        raise
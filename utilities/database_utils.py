@@ -7,12 +7,13 @@
 # - Streamlined error handling and removed redundant checks
 
 import os
+import time
 from datetime import datetime, timedelta
 import pytz
 from dotenv import load_dotenv
-import supabase
 import json
 from utilities.logging_utils import get_logger
+from utilities.supabase_client import get_supabase_client, LocalSupabaseClient
 
 # Initialize logger
 logger = get_logger()
@@ -20,27 +21,46 @@ logger = get_logger()
 # Load environment variables from .env file
 load_dotenv()
 
-# Retrieve Supabase credentials
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Retrieve Supabase settings
 SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET")
 
-# Validate credentials
-if not all([SUPABASE_URL, SUPABASE_KEY]):
-    logger.error("Supabase credentials are missing. Check the .env file.")
-    raise ValueError("Supabase credentials are missing")
-
-# Initialize Supabase client
-try:
-    supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
-    logger.info("Supabase client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Supabase client: {e}")
-    raise
+# Shared Supabase client (or the local stand-in, see utilities/supabase_client.py)
+supabase_client = get_supabase_client()
 
 # Cache for column existence checks to avoid repeated queries
 _column_cache = {}
 
+# Seconds before a table whose columns couldn't be determined (schema unreadable
+# and no rows, or the database unreachable) is checked again. Until then column
+# checks answer False without a query, so the detection loop stays off the network
+COLUMN_RETRY_SECONDS = 300
+_column_retry_at = {}
+
+# Table definitions from the PostgREST schema, read once for all tables
+_schema_definitions = None
+
+def _get_schema_columns(table_name):
+    """
+    Get a table's columns from the PostgREST OpenAPI schema, which lists them
+    even for an empty table.
+    
+    Args:
+        table_name (str): Table name
+        
+    Returns:
+        list: Column names, or an empty list if the schema can't be read
+    """
+    global _schema_definitions
+    if _schema_definitions is None:
+        try:
+            response = supabase_client.postgrest.session.get("/")
+            response.raise_for_status()
+            _schema_definitions = response.json().get("definitions", {})
+        except Exception as e:
+            logger.debug(f"Could not read the database schema, probing {table_name} for a row instead: {e}")
+            return []
+    return list(_schema_definitions.get(table_name, {}).get("properties", {}))
+
 def get_table_columns(table_name):
     """
     Get the column names for a table to check if columns exist.
@@ -54,25 +74,36 @@ def get_table_columns(table_name):
     # Check cache first
     if table_name in _column_cache:
         return _column_cache[table_name]
+    if time.monotonic() < _column_retry_at.get(table_name, 0):
+        return []
         
     try:
-        # This selects a single row to examine its structure
-        response = supabase_client.table(table_name).select("*").limit(1).execute()
+        # The local database declares its schema, so it doesn't need a row to inspect
+        if isinstance(supabase_client, LocalSupabaseClient):
+            columns = supabase_client.get_table_columns(table_name)
+            if columns:
+                _column_cache[table_name] = columns
+            return columns
         
-        if hasattr(response, 'data') and len(response.data) > 0:
-            # Get column names from the first row
-            columns = list(response.data[0].keys())
+        columns = _get_schema_columns(table_name)
+        if not columns:
+            # This selects a single row to examine its structure
+            response = supabase_client.table(table_name).select("*").limit(1).execute()
+            if hasattr(response, 'data') and len(response.data) > 0:
+                # Get column names from the first row
+                columns = list(response.data[0].keys())
+        
+        if columns:
             _column_cache[table_name] = columns
             return columns
         
-        # If no data, return empty list but don't log error
-        # This is normal for new tables
-        _column_cache[table_name] = []
-        return []
+        # If no data, don't log error; this is normal for new tables. An empty
+        # table says nothing about its columns, so it is checked again later
     except Exception as e:
         logger.error(f"Error getting column info for {table_name}: {e}")
-        _column_cache[table_name] = []
-        return []
+    
+    _column_retry_at[table_name] = time.monotonic() + COLUMN_RETRY_SECONDS
+    return []
 
 def check_column_exists(table_name, column_name):
     """
@@ -96,8 +127,9 @@ def check_column_exists(table_name, column_name):
     # Check if the requested column exists
     exists = column_name in columns
     
-    # Cache the result
-    _column_cache[cache_key] = exists
+    # Cache the result, unless the columns couldn't be determined
+    if columns:
+        _column_cache[cache_key] = exists
     
     return exists
 
@@ -0,0 +1,164 @@
+# File: utilities/detection_frame.py
+# Purpose: Hold the per-frame computer vision results shared by detection and visualization
+#
+# The detector and the comparison image renderer both need the grayscale frames,
+# the blurred difference image, thresholded masks and their contours. A DetectionFrame
+# computes each of these once per camera per cycle; threshold-dependent results are
+# cached per threshold because detection and visualization use different thresholds.
+
+import cv2
+import numpy as np
+from utilities.logging_utils import get_logger
+from utilities.frame_statistics import compute_frame_statistics
+from utilities.diff_statistics import (
+    get_region_histograms,
+    compute_diff_statistics,
+    compute_change_metrics
+)
+
+# Initialize logger
+logger = get_logger()
+
+def to_grayscale(image):
+    """
+    Convert an RGB image or frame to a 2D uint8 grayscale array.
+
+    Args:
+        image (PIL.Image or numpy.ndarray): RGB image, or an already grayscale array
+
+    Returns:
+        numpy.ndarray: 2D uint8 grayscale array
+    """
+    array = np.asarray(image)
+    if array.ndim == 2:
+        return array
+    return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+
+class DetectionFrame:
+    """
+    Difference analysis of one new frame against its base image.
+
+    Attributes:
+        new_image (PIL.Image or numpy.ndarray): New image as given
+        base_gray (numpy.ndarray): Grayscale base image
+        new_gray (numpy.ndarray): Grayscale new image
+        diff (numpy.ndarray): Absolute difference of the grayscale images
+        blurred_diff (numpy.ndarray): Diff after a 5x5 Gaussian blur
+    """
+
+    def __init__(self, base_image, new_image):
+        """
+        Compute the threshold-independent difference images.
+
+        Args:
+            base_image (PIL.Image or numpy.ndarray): Base reference image
+            new_image (PIL.Image or numpy.ndarray): New image to check
+        """
+        self.new_image = new_image
+        self.base_gray = to_grayscale(base_image)
+        self.new_gray = to_grayscale(new_image)
+
+        # Calculate absolute difference
+        self.diff = cv2.absdiff(self.new_gray, self.base_gray)
+
+        # Apply Gaussian blur to reduce noise
+        self.blurred_diff = cv2.GaussianBlur(self.diff, (5, 5), 0)
+
+        self.height, self.width = self.diff.shape
+        self._region_histograms = None
+        self._new_statistics = None
+        self._binary_masks = {}
+        self._contours = {}
+        self._diff_statistics = {}
+        self._change_metrics = {}
+
+    @property
+    def region_histograms(self):
+        """Per-region histograms of the diff, shared by all thresholds."""
+        if self._region_histograms is None:
+            self._region_histograms = get_region_histograms(self.diff)
+        return self._region_histograms
+
+    @property
+    def new_statistics(self):
+        """Frame statistics of the new image, reusing its grayscale plane."""
+        if self._new_statistics is None:
+            self._new_statistics = compute_frame_statistics(self.new_image, gray=self.new_gray)
+        return self._new_statistics
+
+    def get_binary_mask(self, threshold):
+        """
+        Get the binary mask of blurred diff pixels above a threshold.
+
+        Args:
+            threshold (float): Luminance threshold
+
+        Returns:
+            numpy.ndarray: 2D uint8 mask with values 0 or 255
+        """
+        if threshold not in self._binary_masks:
+            _, binary_mask = cv2.threshold(
+                self.blurred_diff,
+                threshold,
+                255,
+                cv2.THRESH_BINARY
+            )
+            self._binary_masks[threshold] = binary_mask
+        return self._binary_masks[threshold]
+
+    def get_contours(self, threshold):
+        """
+        Get the external contours of the binary mask at a threshold.
+
+        Args:
+            threshold (float): Luminance threshold
+
+        Returns:
+            tuple: Contours as returned by cv2.findContours
+        """
+        if threshold not in self._contours:
+            contours, _ = cv2.findContours(
+                self.get_binary_mask(threshold),
+                cv2.RETR_EXTERNAL,
+                cv2.CHAIN_APPROX_SIMPLE
+            )
+            self._contours[threshold] = contours
+        return self._contours[threshold]
+
+    def get_diff_statistics(self, threshold):
+        """
+        Get the detection statistics (pixel change, luminance, region metrics).
+
+        Args:
+            threshold (float): Luminance threshold
+
+        Returns:
+            dict: See diff_statistics.compute_diff_statistics
+        """
+        if threshold not in self._diff_statistics:
+            self._diff_statistics[threshold] = compute_diff_statistics(
+                self.diff,
+                self.get_binary_mask(threshold),
+                threshold,
+                self.region_histograms
+            )
+        return self._diff_statistics[threshold]
+
+    def get_change_metrics(self, threshold):
+        """
+        Get the change metrics shown on comparison images.
+
+        Args:
+            threshold (float): Luminance threshold
+
+        Returns:
+            dict: See diff_statistics.compute_change_metrics
+        """
+        if threshold not in self._change_metrics:
+            self._change_metrics[threshold] = compute_change_metrics(
+                self.diff,
+                threshold,
+                self.region_histograms
+            )
+        return dict(self._change_metrics[threshold])
+
@@ -0,0 +1,239 @@
+# File: utilities/diff_statistics.py
+# Purpose: Compute luminance difference statistics from one histogram pass per region
+#
+# analyze_image_differences needs the overall mean/max of the diff image plus the
+# mean, max and changed-pixel percentage of three horizontal bands. Rather than
+# walking the diff once per statistic, each band is histogrammed once with
+# cv2.calcHist and every statistic (including the whole-image ones) is read from
+# the 256-bin histograms. Results are identical to the NumPy reductions. The same
+# histograms also give the (differently thresholded) comparison image metrics.
+
+import math
+import cv2
+import numpy as np
+from utilities.logging_utils import get_logger
+
+# Initialize logger
+logger = get_logger()
+
+# Luminance values 0-255, used to weight histogram bins
+_BIN_VALUES = np.arange(256, dtype=np.float64)
+
+def get_region_slices(height):
+    """
+    Get the row ranges of the top, middle and bottom thirds of an image.
+
+    Args:
+        height (int): Image height in rows
+
+    Returns:
+        dict: Region name to (start_row, end_row)
+    """
+    return {
+        'top': (0, height // 3),
+        'middle': (height // 3, 2 * height // 3),
+        'bottom': (2 * height // 3, height)
+    }
+
+def get_histogram(image):
+    """
+    Get the 256-bin luminance histogram of a single-channel uint8 image.
+
+    Args:
+        image (numpy.ndarray): 2D uint8 array (views are fine)
+
+    Returns:
+        numpy.ndarray: 256 float64 bin counts
+    """
+    return cv2.calcHist([image], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+
+def get_region_histograms(diff):
+    """
+    Histogram each horizontal band of a difference image once.
+
+    The histograms don't depend on any threshold, so they can be computed once
+    per frame and reused for every threshold the frame is analyzed at.
+
+    Args:
+        diff (numpy.ndarray): 2D uint8 absolute difference image
+
+    Returns:
+        dict: Region name to 256-bin histogram
+    """
+    return {
+        region_name: get_histogram(diff[start:end])
+        for region_name, (start, end) in get_region_slices(diff.shape[0]).items()
+    }
+
+def get_histogram_statistics(histogram, threshold):
+    """
+    Read mean, max and above-threshold count from a luminance histogram.
+
+    Args:
+        histogram (numpy.ndarray): 256 bin counts
+        threshold (float): Values strictly greater than this count as changed
+
+    Returns:
+        tuple: (mean, max, changed_count, total_count)
+    """
+    total = histogram.sum()
+    if total == 0:
+        raise ValueError("Cannot compute statistics of an empty region")
+
+    mean = (histogram * _BIN_VALUES).sum() / total
+    maximum = np.flatnonzero(histogram)[-1]
+
+    # Integer values greater than threshold start at floor(threshold) + 1
+    first_changed = min(max(math.floor(threshold) + 1, 0), 256)
+    changed = histogram[first_changed:].sum()
+
+    return mean, maximum, changed, total
+
+def compute_diff_statistics(diff, binary_mask, threshold, region_histograms=None):
+    """
+    Compute the difference statistics used by owl detection.
+
+    Args:
+        diff (numpy.ndarray): 2D uint8 absolute difference image
+        binary_mask (numpy.ndarray): 2D uint8 thresholded mask of the blurred diff
+        threshold (float): Luminance threshold for region change percentages
+        region_histograms (dict, optional): Precomputed get_region_histograms(diff)
+
+    Returns:
+        dict: Statistics including:
+            - pixel_change: Percentage of non-zero pixels in binary_mask
+            - luminance_change: Mean of diff
+            - max_luminance: Max of diff
+            - region_metrics: Per-band mean_luminance, max_luminance and pixel_change
+    """
+    height, width = diff.shape
+    total_pixels = height * width
+    if region_histograms is None:
+        region_histograms = get_region_histograms(diff)
+
+    region_metrics = {}
+    overall_histogram = np.zeros(256, dtype=np.float64)
+
+    for region_name, histogram in region_histograms.items():
+        overall_histogram += histogram
+
+        mean, maximum, changed, total = get_histogram_statistics(histogram, threshold)
+        region_metrics[region_name] = {
+            'mean_luminance': np.float64(mean),
+            'max_luminance': np.uint8(maximum),
+            'pixel_change': (int(changed) / int(total)) * 100
+        }
+
+    mean, maximum, _, _ = get_histogram_statistics(overall_histogram, threshold)
+    changed_pixels = cv2.countNonZero(binary_mask)
+
+    return {
+        'pixel_change': (changed_pixels / total_pixels) * 100,
+        'luminance_change': np.float64(mean),
+        'max_luminance': np.uint8(maximum),
+        'region_metrics': region_metrics
+    }
+
+def compute_change_metrics(diff, threshold, region_histograms=None):
+    """
+    Compute the change metrics shown on comparison images.
+
+    Args:
+        diff (numpy.ndarray): 2D uint8 absolute difference image
+        threshold (float): Luminance threshold for changed pixels
+        region_histograms (dict, optional): Precomputed get_region_histograms(diff)
+
+    Returns:
+        dict: pixel_change_ratio, mean/max/std luminance, per-region metrics
+            and the threshold used
+    """
+    if region_histograms is None:
+        region_histograms = get_region_histograms(diff)
+
+    region_metrics = {}
+    overall_histogram = np.zeros(256, dtype=np.float64)
+
+    for region_name, histogram in region_histograms.items():
+        overall_histogram += histogram
+
+        mean, _, changed, total = get_histogram_statistics(histogram, threshold)
+        region_metrics[region_name] = {
+            'mean_luminance': np.float64(mean),
+            'pixel_change_ratio': int(changed) / int(total)
+        }
+
+    mean, maximum, changed, total = get_histogram_statistics(overall_histogram, threshold)
+    variance = (overall_histogram * (_BIN_VALUES - mean) ** 2).sum() / total
+
+    return {
+        'pixel_change_ratio': int(changed) / int(total),
+        'mean_luminance': np.float64(mean),
+        'max_luminance': np.uint8(maximum),
+        'std_luminance': np.float64(math.sqrt(variance)),
+        'region_metrics': region_metrics,
+        'threshold_used': threshold
+    }
+
+if __name__ == "__main__":
+    try:
+        import time
+
+        def legacy_diff_statistics(diff, binary_mask, threshold):
+            """Original multi-pass NumPy implementation, kept for comparison."""
+            height, width = diff.shape
+            regions = {
+                'top': diff[:height//3, :],
+                'middle': diff[height//3:2*height//3, :],
+                'bottom': diff[2*height//3:, :]
+            }
+            region_metrics = {}
+            for region_name, region_data in regions.items():
+                region_metrics[region_name] = {
+                    'mean_luminance': np.mean(region_data),
+                    'max_luminance': np.max(region_data),
+                    'pixel_change': (np.sum(region_data > threshold) / region_data.size) * 100
+                }
+            return {
+                'pixel_change': (np.sum(binary_mask > 0) / (height * width)) * 100,
+                'luminance_change': np.mean(diff),
+                'max_luminance': np.max(diff),
+                'region_metrics': region_metrics
+            }
+
+        # ROI sizes (width x height) of the configured cameras
+        roi_sizes = {
+            "Upper Patio Camera": (505, 226),
+            "Bindy Patio Camera": (195, 176),
+            "Wyze Internal Camera": (644, 341)
+        }
+        threshold = 30
+        iterations = 500
+        rng = np.random.default_rng(0)
+
+        for camera_name, (width, height) in roi_sizes.items():
+            diff = rng.integers(0, 60, (height, width), dtype=np.uint8)
+            blurred = cv2.GaussianBlur(diff, (5, 5), 0)
+            _, binary_mask = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY)
+
+            legacy = legacy_diff_statistics(diff, binary_mask, threshold)
+            fused = compute_diff_statistics(diff, binary_mask, threshold)
+            assert legacy == fused, f"Statistics differ for {camera_name}"
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                legacy_diff_statistics(diff, binary_mask, threshold)
+            legacy_ms = (time.perf_counter() - start) * 1000 / iterations
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                compute_diff_statistics(diff, binary_mask, threshold)
+            fused_ms = (time.perf_counter() - start) * 1000 / iterations
+
+            logger.info(
+                f"{camera_name} ({width}x{height}): legacy {legacy_ms:.3f} ms, "
+                f"fused {fused_ms:.3f} ms ({legacy_ms / fused_ms:.1f}x)"
+            )
+
+    except Exception as e:
+        logger.error(f"Diff statistics benchmark failed: {e}")
+        raise
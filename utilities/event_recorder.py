@@ -0,0 +1,279 @@
+# File: utilities/event_recorder.py
+# Purpose: Record short video clips around owl detections from the frame ring buffers
+#
+# With continuous capture enabled, each camera's recent frames are already held in
+# memory. When a detection is recorded, the clip's path is returned immediately and
+# a background thread waits for the post-roll to be captured, then writes the
+# pre-roll and post-roll frames with cv2.VideoWriter. No extra screen captures are
+# taken. Detections on a camera whose clip is still pending share that clip.
+# Clips are written on this host; callers pass an on_written callback (e.g. the
+# Supabase upload in upload_images_to_supabase.py) to publish them once written.
+#
+# Settings:
+#   OWL_EVENT_CLIPS      Record clips for detections (default False)
+#   OWL_CLIP_PRE_ROLL    Seconds before the detection to include (default 10)
+#   OWL_CLIP_POST_ROLL   Seconds after the detection to include (default 10)
+#   OWL_CLIP_FORMAT      "mp4" (mp4v) or "avi" (MJPEG) (default mp4)
+
+import os
+import time
+import queue
+import threading
+from datetime import datetime
+import cv2
+import pytz
+from utilities.logging_utils import get_logger
+from utilities.constants import get_event_clip_path
+from utilities.frame_buffer import get_frame_buffer
+
+# Initialize logger
+logger = get_logger()
+
+# Container settings per clip format
+CLIP_FORMATS = {
+    "mp4": {"extension": ".mp4", "fourcc": "mp4v"},
+    "avi": {"extension": ".avi", "fourcc": "MJPG"}
+}
+
+# Playback rate when a clip's frame timestamps can't give one
+DEFAULT_CLIP_FPS = 4.0
+
+def is_event_recording():
+    """
+    Check whether event clips are enabled.
+
+    Returns:
+        bool: True if OWL_EVENT_CLIPS is enabled
+    """
+    return os.getenv('OWL_EVENT_CLIPS', 'False').lower() == 'true'
+
+class EventClipJob:
+    """A clip waiting for its post-roll to be captured."""
+
+    def __init__(self, camera_name, path, start_time, end_time):
+        self.camera_name = camera_name
+        self.path = path
+        self.start_time = start_time
+        self.end_time = end_time
+        self.callbacks = []
+
+class EventRecorder:
+    """
+    Background writer of detection clips.
+
+    Attributes:
+        written (int): Clips written
+        skipped (int): Clips with no buffered frames to write
+        failed (int): Clips that raised an error
+    """
+
+    def __init__(self, pre_roll=10.0, post_roll=10.0, clip_format="mp4"):
+        """
+        Initialize the recorder. The writer thread starts on the first event.
+
+        Args:
+            pre_roll (float): Seconds before the detection to include
+            post_roll (float): Seconds after the detection to include
+            clip_format (str): "mp4" or "avi"
+        """
+        if clip_format not in CLIP_FORMATS:
+            raise ValueError(f"Unsupported clip format: {clip_format}")
+
+        self.pre_roll = max(pre_roll, 0.0)
+        self.post_roll = max(post_roll, 0.0)
+        self.clip_format = clip_format
+        self.jobs = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def _start_thread(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="EventRecorder", daemon=True)
+            self.thread.start()
+
+    def record_event(self, camera_name, event_time=None, timestamp=None, on_written=None):
+        """
+        Queue a clip around a detection.
+
+        Args:
+            camera_name (str): Name of the camera
+            event_time (float, optional): Epoch time of the detection (defaults to now)
+            timestamp (datetime, optional): Detection time used in the clip filename
+            on_written (callable, optional): Called with the clip path on the
+                writer thread once the clip has been written
+
+        Returns:
+            str or None: Path the clip will be written to, or None if the camera
+                has no frame buffer (continuous capture is off)
+        """
+        buffer = get_frame_buffer(camera_name)
+        if buffer is None:
+            logger.debug(f"No frame buffer for {camera_name}, skipping event clip")
+            return None
+
+        if event_time is None:
+            event_time = time.time()
+
+        with self.lock:
+            # A detection during a pending clip is already covered by it
+            job = self.pending.get(camera_name)
+            if job is not None and event_time <= job.end_time:
+                # Callbacks that already ran (callbacks is None) have handled this clip
+                if on_written is not None and job.callbacks is not None and on_written not in job.callbacks:
+                    job.callbacks.append(on_written)
+                return job.path
+
+            if not timestamp:
+                timestamp = datetime.fromtimestamp(event_time, pytz.timezone('America/Los_Angeles'))
+            path = get_event_clip_path(
+                camera_name,
+                timestamp,
+                CLIP_FORMATS[self.clip_format]["extension"]
+            )
+            job = EventClipJob(camera_name, path, event_time - self.pre_roll, event_time + self.post_roll)
+            if on_written is not None:
+                job.callbacks.append(on_written)
+            self.pending[camera_name] = job
+            self._start_thread()
+
+        self.jobs.put(job)
+        logger.info(f"Recording event clip for {camera_name}: {path}")
+        return path
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                # Wait for the post-roll frames to reach the buffer
+                delay = job.end_time - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                if self._write_clip(job):
+                    with self.lock:
+                        callbacks, job.callbacks = job.callbacks, None
+                    for callback in callbacks:
+                        try:
+                            callback(job.path)
+                        except Exception as e:
+                            logger.error(f"Error handling written event clip {job.path}: {e}")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error writing event clip {job.path}: {e}")
+            finally:
+                with self.lock:
+                    if self.pending.get(job.camera_name) is job:
+                        del self.pending[job.camera_name]
+                self.jobs.task_done()
+
+    def _write_clip(self, job):
+        """Write the buffered frames of a job's window to its clip file; True if written."""
+        buffer = get_frame_buffer(job.camera_name)
+        window = buffer.get_window(job.start_time, job.end_time) if buffer is not None else []
+        if not window:
+            self.skipped += 1
+            logger.warning(f"No buffered frames for event clip {job.path}")
+            return False
+
+        # Play back at the rate the frames were captured
+        fps = DEFAULT_CLIP_FPS
+        if len(window) > 1:
+            duration = window[-1][0] - window[0][0]
+            if duration > 0:
+                fps = (len(window) - 1) / duration
+
+        height, width = window[0][1].shape[:2]
+        temp_path = f"{job.path}.{os.getpid()}.tmp{CLIP_FORMATS[self.clip_format]['extension']}"
+        writer = cv2.VideoWriter(
+            temp_path,
+            cv2.VideoWriter_fourcc(*CLIP_FORMATS[self.clip_format]["fourcc"]),
+            fps,
+            (width, height)
+        )
+        if not writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {job.path}")
+
+        try:
+            for _, frame in window:
+                # Buffers hold RGB or grayscale frames; video frames are BGR
+                code = cv2.COLOR_GRAY2BGR if frame.ndim == 2 else cv2.COLOR_RGB2BGR
+                writer.write(cv2.cvtColor(frame, code))
+        finally:
+            writer.release()
+
+        try:
+            os.replace(temp_path, job.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.written += 1
+        logger.info(f"Wrote event clip {job.path}: {len(window)} frames at {fps:.1f} fps")
+        return True
+
+    def flush(self):
+        """Wait until every queued clip has been written."""
+        self.jobs.join()
+
+# Shared recorder, created on first use
+_event_recorder = None
+_event_recorder_lock = threading.Lock()
+
+def get_event_recorder():
+    """
+    Get the shared event recorder configured from the environment.
+
+    Returns:
+        EventRecorder: The shared recorder
+    """
+    global _event_recorder
+    with _event_recorder_lock:
+        if _event_recorder is None:
+            try:
+                pre_roll = float(os.getenv('OWL_CLIP_PRE_ROLL', '10'))
+                post_roll = float(os.getenv('OWL_CLIP_POST_ROLL', '10'))
+            except ValueError:
+                logger.warning("Invalid clip pre/post roll settings, using 10 seconds each")
+                pre_roll, post_roll = 10.0, 10.0
+
+            clip_format = os.getenv('OWL_CLIP_FORMAT', 'mp4').lower()
+            if clip_format not in CLIP_FORMATS:
+                logger.warning(f"Unknown clip format {clip_format}, using mp4")
+                clip_format = "mp4"
+
+            _event_recorder = EventRecorder(pre_roll, post_roll, clip_format)
+            logger.info(
+                f"Event recorder ready: {pre_roll:.0f}s pre-roll, "
+                f"{post_roll:.0f}s post-roll, {clip_format} clips"
+            )
+        return _event_recorder
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from utilities.frame_buffer import create_frame_buffers
+
+        logger.info("Testing event recorder...")
+        buffers = create_frame_buffers({"Test Camera": (226, 505, 3)}, capacity=40)
+        buffer = buffers["Test Camera"]
+
+        recorder = EventRecorder(pre_roll=2.0, post_roll=1.0)
+        start = time.time()
+        for i in range(8):
+            buffer.push(np.full((226, 505, 3), i * 20, dtype=np.uint8), start - 2.0 + i * 0.25)
+
+        path = recorder.record_event("Test Camera", event_time=start)
+        for i in range(4):
+            buffer.push(np.full((226, 505, 3), 200, dtype=np.uint8), time.time())
+            time.sleep(0.25)
+
+        recorder.flush()
+        logger.info(f"Clip {path}: written {recorder.written}, skipped {recorder.skipped}, failed {recorder.failed}")
+
+    except Exception as e:
+        logger.error(f"Event recorder test failed: {e}")
+        raise
@@ -0,0 +1,456 @@
+# File: utilities/frame_archive.py
+# Purpose: Append-only raw frame archive per camera, readable with np.memmap for replay
+#
+# When OWL_FRAME_ARCHIVE is enabled, every captured ROI frame is appended uncompressed
+# to its camera's current segment file. A segment is a fixed 64-byte header followed
+# by back-to-back frames of one shape, and has a side .idx file of (timestamp, offset)
+# records. Readers map the segment with np.memmap, so any frame can be reached by
+# index or timestamp without decoding anything; replay runs at disk speed in either
+# direction.
+#
+# Frames are handed to a background thread through a bounded queue, so disk writes
+# never run on the capture loop; if the disk falls behind, frames are dropped from
+# the archive (never from detection). Raw frames are large (a 644x341 RGB frame is
+# ~660 KB, about 2.3 GB per hour at 1 Hz), so segments rotate by size and the
+# oldest are deleted once a camera's archive exceeds its byte budget. The expected
+# number of frames kept is logged when each camera's archive starts.
+#
+# Settings:
+#   OWL_FRAME_ARCHIVE              Archive captured frames (default False)
+#   OWL_FRAME_ARCHIVE_SEGMENT_MB   Segment size before rotating (default 256)
+#   OWL_FRAME_ARCHIVE_MAX_MB       Archive size kept per camera (default 2048)
+#   OWL_FRAME_ARCHIVE_QUEUE        Frames waiting to be written before dropping (default 64)
+#
+# Layout:
+#   <archive dir>/<camera_name>/<YYYYmmdd_HHMMSS_ffffff>.frames
+#   <archive dir>/<camera_name>/<YYYYmmdd_HHMMSS_ffffff>.idx
+
+import os
+import glob
+import queue
+import struct
+import threading
+from datetime import datetime
+import numpy as np
+from utilities.logging_utils import get_logger
+from utilities.constants import FRAME_ARCHIVE_DIR
+
+# Initialize logger
+logger = get_logger()
+
+# Segment header: magic, version, height, width, channels (0 for HxW frames), created time
+HEADER_MAGIC = b"OWLFRAME"
+HEADER_VERSION = 1
+HEADER_FORMAT = "<8sHHHHd"
+HEADER_SIZE = 64
+
+# One index record per frame
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("offset", "<u8")])
+
+def get_camera_archive_dir(camera_name, archive_dir=FRAME_ARCHIVE_DIR):
+    """
+    Get the directory holding a camera's archive segments.
+
+    Args:
+        camera_name (str): Name of the camera
+        archive_dir (str): Root archive directory
+
+    Returns:
+        str: Camera archive directory
+    """
+    return os.path.join(archive_dir, camera_name.lower().replace(' ', '_'))
+
+def list_archive_segments(camera_dir):
+    """
+    List a camera's segment files, oldest first.
+
+    Args:
+        camera_dir (str): Camera archive directory
+
+    Returns:
+        list: Segment paths (their names sort chronologically)
+    """
+    return sorted(glob.glob(os.path.join(camera_dir, "*.frames")))
+
+def get_index_path(segment_path):
+    """Get the index file path of a segment."""
+    return os.path.splitext(segment_path)[0] + ".idx"
+
+class FrameArchiveWriter:
+    """Appends one camera's frames to rotating segment files."""
+
+    def __init__(self, camera_name, archive_dir=FRAME_ARCHIVE_DIR, segment_bytes=256 * 1024 * 1024,
+                 max_bytes=2048 * 1024 * 1024):
+        """
+        Initialize the writer. The first segment is created on the first append.
+
+        Args:
+            camera_name (str): Name of the camera
+            archive_dir (str): Root archive directory
+            segment_bytes (int): Segment size before rotating (at least one frame)
+            max_bytes (int): Archive size to keep; the oldest segments are deleted (0 keeps all)
+        """
+        self.camera_name = camera_name
+        self.camera_dir = get_camera_archive_dir(camera_name, archive_dir)
+        self.segment_bytes = max(segment_bytes, 1)
+        self.max_bytes = max_bytes
+        self.estimate_logged = False
+        self.frame_shape = None
+        self.frame_file = None
+        self.index_file = None
+        self.segment_path = None
+        self.segment_count = 0
+        self.frames_written = 0
+
+    def _open_segment(self, frame_shape, timestamp):
+        self.close()
+        os.makedirs(self.camera_dir, exist_ok=True)
+
+        name = datetime.fromtimestamp(timestamp).strftime('%Y%m%d_%H%M%S_%f')
+        self.segment_path = os.path.join(self.camera_dir, f"{name}.frames")
+        self.frame_shape = tuple(frame_shape)
+
+        height, width = self.frame_shape[:2]
+        channels = self.frame_shape[2] if len(self.frame_shape) == 3 else 0
+        header = struct.pack(HEADER_FORMAT, HEADER_MAGIC, HEADER_VERSION, height, width, channels, timestamp)
+
+        self.frame_file = open(self.segment_path, "wb")
+        self.frame_file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self.index_file = open(get_index_path(self.segment_path), "wb")
+        self.segment_count = 0
+
+        if not self.estimate_logged:
+            self._log_estimate()
+        self._prune_segments()
+        logger.debug(f"Started frame archive segment for {self.camera_name}: {self.segment_path}")
+
+    def _log_estimate(self):
+        """Log how many frames a segment and the whole archive hold at the current shape."""
+        self.estimate_logged = True
+        frame_bytes = int(np.prod(self.frame_shape)) + INDEX_DTYPE.itemsize
+        kept = f"{self.max_bytes // frame_bytes} frames" if self.max_bytes else "every frame"
+        logger.info(
+            f"Frame archive for {self.camera_name}: {frame_bytes / 1024:.0f} KB per frame, "
+            f"{max(self.segment_bytes // frame_bytes, 1)} frames per segment, keeping {kept} "
+            f"({self.max_bytes / (1024 * 1024):.0f} MB)"
+        )
+
+    def _prune_segments(self):
+        """Delete the oldest segments until the archive fits max_bytes (the camera directory is small)."""
+        if not self.max_bytes:
+            return
+        segments = list_archive_segments(self.camera_dir)
+        sizes = {}
+        for segment_path in segments:
+            try:
+                sizes[segment_path] = (os.path.getsize(segment_path) +
+                                       os.path.getsize(get_index_path(segment_path)))
+            except FileNotFoundError:
+                sizes[segment_path] = 0
+        total = sum(sizes.values())
+
+        for segment_path in segments:
+            if total <= self.max_bytes or segment_path == self.segment_path:
+                break
+            try:
+                for path in (segment_path, get_index_path(segment_path)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            except OSError as e:
+                # A replay may still have the segment mapped (Windows); retry on the next rotation
+                logger.warning(f"Could not delete frame archive segment {segment_path}: {e}")
+                break
+            total -= sizes[segment_path]
+            logger.debug(f"Deleted old frame archive segment: {segment_path}")
+
+    def append(self, frame, timestamp):
+        """
+        Append a frame to the current segment.
+
+        Args:
+            frame (numpy.ndarray): HxWx3 or HxW uint8 frame
+            timestamp (float): Epoch capture time
+        """
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+
+        # A new shape (e.g. switching grayscale detection) starts a new segment
+        if (self.frame_file is None or
+                frame.shape != self.frame_shape or
+                (self.segment_count and self.frame_file.tell() + frame.nbytes > self.segment_bytes)):
+            self._open_segment(frame.shape, timestamp)
+
+        offset = self.frame_file.tell()
+        self.frame_file.write(memoryview(frame).cast("B"))
+        self.index_file.write(np.array([(timestamp, offset)], dtype=INDEX_DTYPE).tobytes())
+        self.segment_count += 1
+        self.frames_written += 1
+
+    def flush(self):
+        """Flush buffered frames and index records to disk."""
+        if self.frame_file is not None:
+            self.frame_file.flush()
+            self.index_file.flush()
+
+    def close(self):
+        """Close the current segment."""
+        if self.frame_file is not None:
+            self.frame_file.close()
+            self.index_file.close()
+            self.frame_file = None
+            self.index_file = None
+
+class FrameArchiveReader:
+    """
+    Zero-copy random access to one archive segment.
+
+    Attributes:
+        frames (numpy.memmap): N x frame_shape read-only frame array
+        timestamps (numpy.ndarray): N capture times, ascending
+    """
+
+    def __init__(self, segment_path):
+        """
+        Map a segment. Frames still being written (without a complete index
+        record and frame data) are left out.
+
+        Args:
+            segment_path (str): Path to a .frames file
+        """
+        self.segment_path = segment_path
+
+        with open(segment_path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        magic, version, height, width, channels, self.created = struct.unpack_from(HEADER_FORMAT, header)
+        if magic != HEADER_MAGIC:
+            raise ValueError(f"Not a frame archive segment: {segment_path}")
+        if version != HEADER_VERSION:
+            raise ValueError(f"Unsupported frame archive version {version}: {segment_path}")
+
+        self.frame_shape = (height, width, channels) if channels else (height, width)
+        frame_bytes = int(np.prod(self.frame_shape))
+
+        index_path = get_index_path(segment_path)
+        index_count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE, count=index_count)
+        data_count = (os.path.getsize(segment_path) - HEADER_SIZE) // frame_bytes
+        count = min(index_count, data_count)
+
+        self.timestamps = index["timestamp"][:count]
+        self.frames = None
+        if count:
+            self.frames = np.memmap(
+                segment_path,
+                dtype=np.uint8,
+                mode="r",
+                offset=HEADER_SIZE,
+                shape=(count,) + self.frame_shape
+            )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def get_frame(self, position):
+        """
+        Get a frame without copying it.
+
+        Args:
+            position (int): Frame number within the segment
+
+        Returns:
+            numpy.ndarray: Read-only view of the frame
+        """
+        return self.frames[position]
+
+    def find(self, timestamp):
+        """
+        Get the position of the first frame captured at or after a time.
+
+        Args:
+            timestamp (float): Epoch time
+
+        Returns:
+            int: Frame position (len(self) if every frame is older)
+        """
+        return int(np.searchsorted(self.timestamps, timestamp, side="left"))
+
+    def close(self):
+        """Release the memory map."""
+        if self.frames is not None:
+            mmap = getattr(self.frames, "_mmap", None)
+            self.frames = None
+            if mmap is not None:
+                mmap.close()
+
+class FrameArchiver:
+    """
+    Background writer of captured frames, with a segment writer per camera.
+
+    Attributes:
+        dropped (int): Frames left out because the write queue was full
+    """
+
+    def __init__(self, archive_dir=FRAME_ARCHIVE_DIR, segment_bytes=256 * 1024 * 1024,
+                 max_bytes=2048 * 1024 * 1024, max_queue=64):
+        """
+        Initialize the archiver. The writer thread starts on the first append.
+
+        Args:
+            archive_dir (str): Root archive directory
+            segment_bytes (int): Segment size before rotating
+            max_bytes (int): Archive size to keep per camera (0 keeps all)
+            max_queue (int): Frames waiting to be written before new ones are dropped
+        """
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.writers = {}
+        self.lock = threading.Lock()
+        self.frames = queue.Queue(maxsize=max(max_queue, 1))
+        self.thread = None
+        self.thread_lock = threading.Lock()
+        self.dropped = 0
+
+    def _start_thread(self):
+        with self.thread_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="FrameArchiver", daemon=True)
+                self.thread.start()
+
+    def append(self, camera_name, frame, timestamp):
+        """
+        Queue a captured frame for archiving without waiting for the disk.
+
+        Args:
+            camera_name (str): Name of the camera
+            frame (numpy.ndarray): Captured frame (copied, so the caller may reuse it)
+            timestamp (float): Epoch capture time
+        """
+        self._start_thread()
+        try:
+            self.frames.put_nowait((camera_name, np.array(frame, dtype=np.uint8), timestamp))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"Frame archive writes are falling behind; {self.dropped} frames not archived")
+
+    def _run(self):
+        while True:
+            camera_name, frame, timestamp = self.frames.get()
+            try:
+                with self.lock:
+                    writer = self.writers.get(camera_name)
+                    if writer is None:
+                        writer = FrameArchiveWriter(
+                            camera_name,
+                            self.archive_dir,
+                            self.segment_bytes,
+                            self.max_bytes
+                        )
+                        self.writers[camera_name] = writer
+                    writer.append(frame, timestamp)
+
+                    # Make frames visible to readers once the backlog is written
+                    if self.frames.empty():
+                        for each in self.writers.values():
+                            each.flush()
+            except Exception as e:
+                logger.error(f"Error archiving frame for {camera_name}: {e}")
+            finally:
+                self.frames.task_done()
+
+    def flush(self):
+        """Wait for queued frames to be written and flush every camera's current segment."""
+        if self.thread is not None:
+            self.frames.join()
+        with self.lock:
+            for writer in self.writers.values():
+                writer.flush()
+
+    def close(self):
+        """Write queued frames and close every camera's current segment."""
+        self.flush()
+        with self.lock:
+            for writer in self.writers.values():
+                writer.close()
+            self.writers.clear()
+
+def is_frame_archiving():
+    """
+    Check whether captured frames are archived.
+
+    Returns:
+        bool: True if OWL_FRAME_ARCHIVE is enabled
+    """
+    return os.getenv('OWL_FRAME_ARCHIVE', 'False').lower() == 'true'
+
+# Shared archiver, created on first use
+_frame_archiver = None
+_frame_archiver_lock = threading.Lock()
+
+def get_frame_archiver():
+    """
+    Get the shared frame archiver configured from the environment.
+
+    Returns:
+        FrameArchiver: The shared archiver
+    """
+    global _frame_archiver
+    with _frame_archiver_lock:
+        if _frame_archiver is None:
+            try:
+                segment_mb = float(os.getenv('OWL_FRAME_ARCHIVE_SEGMENT_MB', '256'))
+                max_mb = float(os.getenv('OWL_FRAME_ARCHIVE_MAX_MB', '2048'))
+                max_queue = int(os.getenv('OWL_FRAME_ARCHIVE_QUEUE', '64'))
+            except ValueError:
+                logger.warning("Invalid frame archive settings, using 256 MB segments, 2048 MB per camera")
+                segment_mb, max_mb, max_queue = 256.0, 2048.0, 64
+            _frame_archiver = FrameArchiver(
+                FRAME_ARCHIVE_DIR,
+                int(segment_mb * 1024 * 1024),
+                int(max_mb * 1024 * 1024),
+                max_queue
+            )
+            logger.info(
+                f"Archiving frames to {FRAME_ARCHIVE_DIR}: {segment_mb:.0f} MB segments, "
+                f"{max_mb:.0f} MB per camera, {max_queue} frame write queue"
+            )
+        return _frame_archiver
+
+if __name__ == "__main__":
+    try:
+        import tempfile
+        import time
+
+        logger.info("Testing frame archive...")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            frame_bytes = 341 * 644 * 3
+            writer = FrameArchiveWriter("Test Camera", temp_dir, segment_bytes=HEADER_SIZE + 100 * frame_bytes)
+            start_time = time.time()
+            start = time.perf_counter()
+            for i in range(300):
+                writer.append(np.full((341, 644, 3), i % 256, dtype=np.uint8), start_time + i * 0.25)
+            writer.close()
+            write_ms = (time.perf_counter() - start) * 1000 / 300
+
+            segments = list_archive_segments(writer.camera_dir)
+            reader = FrameArchiveReader(segments[1])
+            position = reader.find(start_time + 150 * 0.25)
+
+            start = time.perf_counter()
+            total = 0
+            for i in range(len(reader) - 1, -1, -1):
+                total += int(reader.get_frame(i)[0, 0, 0])
+            read_ms = (time.perf_counter() - start) * 1000 / len(reader)
+
+            logger.info(
+                f"{len(segments)} segments; frame at t+37.5s is position {position} with value "
+                f"{reader.get_frame(position)[0, 0, 0]}; {write_ms:.3f} ms/frame write, "
+                f"{read_ms:.3f} ms/frame reverse read"
+            )
+            reader.close()
+
+    except Exception as e:
+        logger.error(f"Frame archive test failed: {e}")
+        raise
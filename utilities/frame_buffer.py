@@ -0,0 +1,194 @@
+# File: utilities/frame_buffer.py
+# Purpose: Fixed-size, preallocated per-camera ring buffers of recent frames
+#
+# Continuous capture writes every sampled frame into its camera's buffer; detection
+# reads the newest frame and event clips read the preceding window. All frame memory
+# is allocated up front, so memory use is capacity x frame size per camera.
+
+import threading
+import numpy as np
+from utilities.logging_utils import get_logger
+
+# Initialize logger
+logger = get_logger()
+
+# Ring buffers keyed by camera name
+_frame_buffers = {}
+_frame_buffers_lock = threading.Lock()
+
+class FrameRingBuffer:
+    """
+    Thread-safe ring buffer holding the most recent frames for one camera.
+
+    Frames are copied into a preallocated uint8 array, so pushing never
+    allocates and the oldest frame is overwritten once the buffer is full.
+    """
+
+    def __init__(self, camera_name, capacity, frame_shape):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            camera_name (str): Name of the camera
+            capacity (int): Number of frames to keep
+            frame_shape (tuple): Shape of each frame, e.g. (height, width, 3)
+        """
+        if capacity < 1:
+            raise ValueError(f"Frame buffer capacity must be at least 1, got {capacity}")
+
+        self.camera_name = camera_name
+        self.capacity = capacity
+        self.frame_shape = tuple(frame_shape)
+        self.frames = np.zeros((capacity,) + self.frame_shape, dtype=np.uint8)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+
+        # Total frames pushed; the newest frame lives in slot (sequence - 1) % capacity
+        self.sequence = 0
+        self.dropped_frames = 0
+        self.condition = threading.Condition()
+
+    @property
+    def nbytes(self):
+        """Memory held by the buffer in bytes."""
+        return self.frames.nbytes + self.timestamps.nbytes
+
+    def __len__(self):
+        with self.condition:
+            return min(self.sequence, self.capacity)
+
+    def push(self, frame, timestamp):
+        """
+        Copy a frame into the buffer, overwriting the oldest frame when full.
+
+        Args:
+            frame (numpy.ndarray): Frame matching frame_shape
+            timestamp (float): Epoch time the frame was captured
+
+        Returns:
+            bool: True if the frame was stored
+        """
+        frame = np.asarray(frame)
+        if frame.shape != self.frame_shape:
+            self.dropped_frames += 1
+            logger.warning(
+                f"Dropping frame for {self.camera_name}: shape {frame.shape} "
+                f"does not match buffer shape {self.frame_shape}"
+            )
+            return False
+
+        with self.condition:
+            slot = self.sequence % self.capacity
+            np.copyto(self.frames[slot], frame)
+            self.timestamps[slot] = timestamp
+            self.sequence += 1
+            self.condition.notify_all()
+        return True
+
+    def latest(self):
+        """
+        Get a copy of the newest frame.
+
+        Returns:
+            tuple: (frame, timestamp, sequence) or (None, None, 0) if empty
+        """
+        with self.condition:
+            if self.sequence == 0:
+                return None, None, 0
+            slot = (self.sequence - 1) % self.capacity
+            return self.frames[slot].copy(), float(self.timestamps[slot]), self.sequence
+
+    def wait_for_frame(self, after_sequence, timeout=None):
+        """
+        Block until a frame newer than after_sequence has been pushed.
+
+        Args:
+            after_sequence (int): Sequence number already consumed
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if a newer frame is available
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.sequence > after_sequence, timeout)
+
+    def get_window(self, start_time=None, end_time=None):
+        """
+        Get copies of the buffered frames within a time window, oldest first.
+
+        Args:
+            start_time (float, optional): Earliest epoch timestamp to include
+            end_time (float, optional): Latest epoch timestamp to include
+
+        Returns:
+            list: (timestamp, frame) tuples in capture order
+        """
+        with self.condition:
+            count = min(self.sequence, self.capacity)
+            first = self.sequence - count
+            slots = [(first + i) % self.capacity for i in range(count)]
+
+            window = []
+            for slot in slots:
+                timestamp = float(self.timestamps[slot])
+                if start_time is not None and timestamp < start_time:
+                    continue
+                if end_time is not None and timestamp > end_time:
+                    continue
+                window.append((timestamp, self.frames[slot].copy()))
+            return window
+
+def create_frame_buffers(camera_frame_shapes, capacity):
+    """
+    Create (or replace) the ring buffers for a set of cameras.
+
+    Args:
+        camera_frame_shapes (dict): Camera name to frame shape
+        capacity (int): Number of frames to keep per camera
+
+    Returns:
+        dict: Camera name to FrameRingBuffer
+    """
+    with _frame_buffers_lock:
+        _frame_buffers.clear()
+        for camera_name, frame_shape in camera_frame_shapes.items():
+            _frame_buffers[camera_name] = FrameRingBuffer(camera_name, capacity, frame_shape)
+
+        total_mb = sum(buffer.nbytes for buffer in _frame_buffers.values()) / (1024 * 1024)
+        logger.info(
+            f"Allocated frame buffers for {len(_frame_buffers)} cameras: "
+            f"{capacity} frames each, {total_mb:.1f} MB total"
+        )
+        return dict(_frame_buffers)
+
+def get_frame_buffer(camera_name):
+    """
+    Get the ring buffer for a camera.
+
+    Args:
+        camera_name (str): Name of the camera
+
+    Returns:
+        FrameRingBuffer or None: The camera's buffer, if continuous capture created one
+    """
+    with _frame_buffers_lock:
+        return _frame_buffers.get(camera_name)
+
+if __name__ == "__main__":
+    try:
+        import time
+
+        logger.info("Testing frame ring buffer...")
+        buffer = FrameRingBuffer("Test Camera", capacity=8, frame_shape=(226, 505, 3))
+        for i in range(20):
+            buffer.push(np.full((226, 505, 3), i, dtype=np.uint8), time.time())
+
+        frame, timestamp, sequence = buffer.latest()
+        window = buffer.get_window()
+        logger.info(
+            f"Pushed {sequence} frames, kept {len(window)}; newest value {frame[0, 0, 0]}, "
+            f"oldest value {window[0][1][0, 0, 0]}, {buffer.nbytes / 1024:.0f} KB"
+        )
+
+    except Exception as e:
+        logger.error(f"Frame buffer test failed: {e}")
+        raise
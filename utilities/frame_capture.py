@@ -0,0 +1,332 @@
+# File: utilities/frame_capture.py
+# Purpose: Capture every camera ROI from a single desktop grab per detection cycle
+
+import time
+import threading
+from utilities.logging_utils import get_logger
+from utilities.frame_buffer import create_frame_buffers, get_frame_buffer
+from utilities.frame_archive import is_frame_archiving, get_frame_archiver
+from utilities.frame_sources import (
+    get_roi_bounds,
+    grab_screen_region,
+    create_frame_source,
+    get_frame_source_type,
+    is_grayscale_detection,
+    ScreenFrameSource,
+    ArchiveFrameSource
+)
+
+# Initialize logger
+logger = get_logger()
+
+# Frame sources for cameras that don't capture from the live screen, keyed by camera name
+_frame_sources = {}
+
+def get_union_bounding_box(camera_configs):
+    """
+    Calculate the smallest screen rectangle containing every camera ROI.
+
+    Args:
+        camera_configs (dict): Camera configurations keyed by camera name
+
+    Returns:
+        tuple: (left, top, right, bottom) or None if no camera has an ROI
+    """
+    bounds = [
+        get_roi_bounds(config["roi"])
+        for config in camera_configs.values()
+        if config.get("roi")
+    ]
+    if not bounds:
+        return None
+
+    return (
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds)
+    )
+
+def slice_camera_frames(desktop_frame, origin, camera_configs):
+    """
+    Slice per-camera views out of a single desktop frame.
+
+    The returned arrays are NumPy views into desktop_frame, so no pixel data
+    is copied and every camera sees the same instant.
+
+    Args:
+        desktop_frame (numpy.ndarray): Desktop grab covering all ROIs
+        origin (tuple): (left, top) screen coordinates of desktop_frame[0, 0]
+        camera_configs (dict): Camera configurations keyed by camera name
+
+    Returns:
+        dict: Camera name to HxWx3 (or HxW) view of its ROI
+    """
+    origin_x, origin_y = origin
+    frames = {}
+    for camera_name, config in camera_configs.items():
+        if not config.get("roi"):
+            continue
+        left, top, right, bottom = get_roi_bounds(config["roi"])
+        frames[camera_name] = desktop_frame[
+            top - origin_y:bottom - origin_y,
+            left - origin_x:right - origin_x
+        ]
+    return frames
+
+def get_frame_source(camera_name, config):
+    """
+    Get the cached frame source for a camera, creating it on first use.
+
+    Args:
+        camera_name (str): Name of the camera
+        config (dict): Camera configuration
+
+    Returns:
+        FrameSource: Frame source for this camera
+    """
+    source = _frame_sources.get(camera_name)
+    if source is None:
+        source = create_frame_source(camera_name, config)
+        _frame_sources[camera_name] = source
+    return source
+
+def close_frame_sources():
+    """Close and forget all cached frame sources."""
+    for source in _frame_sources.values():
+        try:
+            source.close()
+        except Exception as e:
+            logger.warning(f"Error closing frame source {source}: {e}")
+    _frame_sources.clear()
+
+def read_camera_frame(camera_name, config, grayscale=None):
+    """
+    Read a single frame for one camera from its configured source.
+
+    Args:
+        camera_name (str): Name of the camera
+        config (dict): Camera configuration
+        grayscale (bool, optional): Read a luminance plane instead of RGB;
+            defaults to the OWL_GRAYSCALE_DETECTION setting
+
+    Returns:
+        numpy.ndarray: HxWx3 uint8 RGB frame, or HxW if grayscale
+
+    Raises:
+        RuntimeError: If the source has no more frames
+    """
+    if grayscale is None:
+        grayscale = is_grayscale_detection()
+
+    if get_frame_source_type(config) == ScreenFrameSource.source_type:
+        frame = grab_screen_region(get_roi_bounds(config["roi"]), grayscale)
+    else:
+        frame = get_frame_source(camera_name, config).read(grayscale)
+        if frame is None:
+            raise RuntimeError(f"Frame source for {camera_name} is exhausted")
+
+    return frame
+
+def capture_camera_frames(camera_configs, grayscale=None, capture_times=None):
+    """
+    Capture one frame for every camera.
+
+    Cameras reading from the live screen are captured with one screenshot of
+    their union bounding box; other cameras read from their configured source.
+    Cameras whose source is exhausted are left out of the result.
+
+    Args:
+        camera_configs (dict): Camera configurations keyed by camera name
+        grayscale (bool, optional): Capture luminance planes instead of RGB;
+            defaults to the OWL_GRAYSCALE_DETECTION setting
+        capture_times (dict, optional): Filled with camera name to the epoch
+            time its frame was captured
+
+    Returns:
+        dict: Camera name to HxWx3 uint8 RGB frame (HxW if grayscale)
+    """
+    try:
+        if grayscale is None:
+            grayscale = is_grayscale_detection()
+        
+        screen_configs = {}
+        frames = {}
+
+        for camera_name, config in camera_configs.items():
+            if not config.get("roi"):
+                continue
+            if get_frame_source_type(config) == ScreenFrameSource.source_type:
+                screen_configs[camera_name] = config
+                continue
+
+            frame = get_frame_source(camera_name, config).read(grayscale)
+            if frame is None:
+                logger.warning(f"Frame source for {camera_name} is exhausted")
+                continue
+            frames[camera_name] = frame
+
+        bounds = get_union_bounding_box(screen_configs)
+        if bounds is not None:
+            desktop_frame = grab_screen_region(bounds, grayscale)
+            frames.update(slice_camera_frames(desktop_frame, bounds[:2], screen_configs))
+            logger.debug(
+                f"Captured {len(screen_configs)} screen cameras from one "
+                f"{desktop_frame.shape[1]}x{desktop_frame.shape[0]} desktop grab"
+            )
+
+        timestamp = time.time()
+        if capture_times is not None:
+            capture_times.update((camera_name, timestamp) for camera_name in frames)
+
+        # Keep the raw frames for offline replay when archiving is on; written
+        # in the background. Frames replayed from the archive are already in it.
+        if is_frame_archiving():
+            archiver = get_frame_archiver()
+            for camera_name, frame in frames.items():
+                if get_frame_source_type(camera_configs[camera_name]) == ArchiveFrameSource.source_type:
+                    continue
+                archiver.append(camera_name, frame, timestamp)
+
+        return frames
+
+    except Exception as e:
+        logger.error(f"Error capturing camera frames: {e}")
+        raise
+
+def get_camera_frame_shape(config, grayscale=False):
+    """
+    Get the shape of the frames captured for a camera's ROI.
+
+    Args:
+        config (dict): Camera configuration
+        grayscale (bool): Whether frames are single luminance planes
+
+    Returns:
+        tuple: (height, width) if grayscale, otherwise (height, width, 3)
+    """
+    left, top, right, bottom = get_roi_bounds(config["roi"])
+    if grayscale:
+        return (bottom - top, right - left)
+    return (bottom - top, right - left, 3)
+
+class ContinuousCaptureThread(threading.Thread):
+    """
+    Background thread sampling every camera at a fixed rate into ring buffers.
+
+    Each cycle captures all cameras at once and pushes the frames into the
+    camera's FrameRingBuffer, which holds the last buffer_seconds of frames.
+    """
+
+    def __init__(self, camera_configs, capture_hz=4.0, buffer_seconds=30):
+        """
+        Initialize the capture thread and allocate the ring buffers.
+
+        Args:
+            camera_configs (dict): Camera configurations keyed by camera name
+            capture_hz (float): Capture cycles per second
+            buffer_seconds (float): Seconds of history to keep per camera
+        """
+        super().__init__(name="ContinuousCapture", daemon=True)
+        if capture_hz <= 0:
+            raise ValueError(f"Capture rate must be positive, got {capture_hz}")
+
+        self.camera_configs = {
+            camera_name: config
+            for camera_name, config in camera_configs.items()
+            if config.get("roi")
+        }
+        self.capture_interval = 1.0 / capture_hz
+        self.capacity = max(1, int(round(capture_hz * buffer_seconds)))
+        self.grayscale = is_grayscale_detection()
+        self.buffers = create_frame_buffers(
+            {
+                name: get_camera_frame_shape(config, self.grayscale)
+                for name, config in self.camera_configs.items()
+            },
+            self.capacity
+        )
+        self.stop_event = threading.Event()
+        self.cycles = 0
+        self.overruns = 0
+
+    def run(self):
+        logger.info(
+            f"Continuous capture started at {1.0 / self.capture_interval:.1f} Hz "
+            f"for {len(self.camera_configs)} cameras"
+        )
+        next_capture = time.monotonic()
+
+        while not self.stop_event.is_set():
+            try:
+                frames = capture_camera_frames(self.camera_configs, self.grayscale)
+                timestamp = time.time()
+                for camera_name, frame in frames.items():
+                    self.buffers[camera_name].push(frame, timestamp)
+                self.cycles += 1
+            except Exception as e:
+                logger.error(f"Error in continuous capture cycle: {e}")
+
+            # Keep a fixed cadence; if a capture overran its slot, start the
+            # next one immediately instead of trying to catch up
+            next_capture += self.capture_interval
+            delay = next_capture - time.monotonic()
+            if delay < 0:
+                self.overruns += 1
+                next_capture = time.monotonic()
+                delay = 0
+            self.stop_event.wait(delay)
+
+        logger.info(f"Continuous capture stopped after {self.cycles} cycles ({self.overruns} overruns)")
+
+    def stop(self, timeout=5):
+        """Stop capturing and wait for the thread to exit."""
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+def get_latest_frames(camera_names, after_sequences=None, capture_times=None):
+    """
+    Get the newest buffered frame for each camera.
+
+    Args:
+        camera_names (iterable): Cameras to read
+        after_sequences (dict, optional): Camera name to last consumed sequence;
+            cameras without a newer frame are left out and the dict is updated
+        capture_times (dict, optional): Filled with camera name to the epoch
+            time each returned frame was captured
+
+    Returns:
+        dict: Camera name to newest RGB frame
+    """
+    frames = {}
+    for camera_name in camera_names:
+        buffer = get_frame_buffer(camera_name)
+        if buffer is None:
+            continue
+
+        frame, timestamp, sequence = buffer.latest()
+        if frame is None:
+            continue
+        if after_sequences is not None:
+            if sequence <= after_sequences.get(camera_name, 0):
+                continue
+            after_sequences[camera_name] = sequence
+        frames[camera_name] = frame
+        if capture_times is not None:
+            capture_times[camera_name] = timestamp
+    return frames
+
+if __name__ == "__main__":
+    try:
+        from utilities.configs_loader import load_camera_config
+
+        configs = load_camera_config()
+        logger.info(f"Union bounding box: {get_union_bounding_box(configs)}")
+
+        for camera, frame in capture_camera_frames(configs).items():
+            logger.info(f"{camera}: {frame.shape[1]}x{frame.shape[0]} (view: {frame.base is not None})")
+
+    except Exception as e:
+        logger.error(f"Frame capture test failed: {e}")
+        raise
@@ -0,0 +1,140 @@
+# File: utilities/frame_statistics.py
+# Purpose: Compute frame statistics from the frame in memory, only where they are used
+#
+# Base image logging used to reopen the saved JPEG and average its pixels in a
+# Python loop, and the camera monitors averaged their own screenshots. A
+# FrameStatistics record (luminance mean and std, per-channel means, capture time)
+# is now computed with OpenCV reductions from the frame it describes, by the code
+# that reads that frame, so the statistics always belong to the image being used.
+# Nothing is computed on the detection loop's capture path. The histogram is only
+# computed when asked for, and callers that already have the luminance plane (e.g.
+# DetectionFrame.new_gray) pass it in instead of converting again.
+
+import time
+import cv2
+import numpy as np
+from utilities.logging_utils import get_logger
+
+# Initialize logger
+logger = get_logger()
+
+class FrameStatistics:
+    """
+    Summary statistics of one frame.
+
+    Attributes:
+        mean_luminance (float): Mean of the luminance plane (0-255)
+        std_luminance (float): Standard deviation of the luminance plane
+        histogram (numpy.ndarray): 256-bin luminance histogram (computed on first use)
+        channel_means (tuple): (R, G, B) means, or (luminance,) for grayscale frames
+        timestamp (float): Epoch time the frame was acquired
+        width (int): Frame width
+        height (int): Frame height
+    """
+
+    def __init__(self, mean_luminance, std_luminance, gray, channel_means, timestamp, width, height):
+        self.mean_luminance = mean_luminance
+        self.std_luminance = std_luminance
+        self.channel_means = channel_means
+        self.timestamp = timestamp
+        self.width = width
+        self.height = height
+        self._gray = gray
+        self._histogram = None
+
+    @property
+    def histogram(self):
+        """256-bin luminance histogram."""
+        if self._histogram is None:
+            self._histogram = cv2.calcHist([self._gray], [0], None, [256], [0, 256]).ravel()
+            self._gray = None
+        return self._histogram
+
+    @property
+    def mean_value(self):
+        """Mean over all channels, i.e. np.mean of the frame array."""
+        return sum(self.channel_means) / len(self.channel_means)
+
+    def to_dict(self):
+        """
+        Get the statistics as JSON-serializable values.
+
+        Returns:
+            dict: Statistics without the histogram
+        """
+        return {
+            "mean_luminance": self.mean_luminance,
+            "std_luminance": self.std_luminance,
+            "channel_means": list(self.channel_means),
+            "timestamp": self.timestamp,
+            "width": self.width,
+            "height": self.height
+        }
+
+def compute_frame_statistics(frame, timestamp=None, gray=None):
+    """
+    Compute the statistics of a frame.
+
+    Args:
+        frame (PIL.Image or numpy.ndarray): HxWx3 RGB or HxW grayscale frame
+        timestamp (float, optional): Epoch acquisition time (defaults to now)
+        gray (numpy.ndarray, optional): The frame's luminance plane, if already computed
+
+    Returns:
+        FrameStatistics: Statistics of the frame
+    """
+    array = np.asarray(frame)
+    if array.ndim == 3 and array.shape[2] == 4:
+        array = array[:, :, :3]
+
+    if array.ndim == 2:
+        gray = array
+        channel_means = None
+    else:
+        if gray is None:
+            gray = cv2.cvtColor(np.ascontiguousarray(array), cv2.COLOR_RGB2GRAY)
+        channel_means = tuple(float(value) for value in cv2.mean(array)[:3])
+
+    mean, std = cv2.meanStdDev(gray)
+    mean_luminance = float(mean[0][0])
+    if channel_means is None:
+        channel_means = (mean_luminance,)
+
+    return FrameStatistics(
+        mean_luminance=mean_luminance,
+        std_luminance=float(std[0][0]),
+        gray=gray,
+        channel_means=channel_means,
+        timestamp=timestamp if timestamp is not None else time.time(),
+        width=gray.shape[1],
+        height=gray.shape[0]
+    )
+
+if __name__ == "__main__":
+    try:
+        from PIL import Image
+
+        logger.info("Benchmarking frame statistics...")
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (341, 644, 3), dtype=np.uint8)
+        iterations = 50
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            statistics = compute_frame_statistics(frame)
+        vectorized_ms = (time.perf_counter() - start) * 1000 / iterations
+
+        # The previous approach: sum a grayscale image's pixels in Python
+        start = time.perf_counter()
+        gray_img = Image.fromarray(frame).convert('L')
+        python_mean = sum(gray_img.getdata()) / (gray_img.width * gray_img.height)
+        python_ms = (time.perf_counter() - start) * 1000
+
+        logger.info(
+            f"Vectorized statistics: {vectorized_ms:.2f} ms (mean {statistics.mean_luminance:.2f}); "
+            f"Python loop mean only: {python_ms:.2f} ms (mean {python_mean:.2f})"
+        )
+
+    except Exception as e:
+        logger.error(f"Frame statistics benchmark failed: {e}")
+        raise
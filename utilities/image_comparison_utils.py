@@ -2,25 +2,70 @@
 # Purpose: Generate and handle three-panel comparison images with enhanced metrics and confidence display
 
 import os
+import json
+import time
+import threading
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import logging
 from datetime import datetime
 import pytz
 from utilities.logging_utils import get_logger
+from utilities.detection_frame import DetectionFrame
+from utilities.diff_statistics import compute_change_metrics
+from utilities.image_writer import get_image_writer
+from utilities.image_encoding import get_output_path
+from utilities.status_overlay import get_overlay_renderer
+from utilities.local_image_store import track_saved_image
+from utilities.content_store import get_content_store
+from utilities.image_derivatives import is_derivatives_enabled, create_derivatives
 from utilities.constants import (
     BASE_IMAGES_DIR, 
     IMAGE_COMPARISONS_DIR, 
     CAMERA_MAPPINGS, 
     get_comparison_image_path, 
     get_saved_image_path,
-    COMPARISON_IMAGE_FILENAMES
+    COMPARISON_IMAGE_FILENAMES,
+    COMPARISON_PREVIEW_REQUEST
 )
 
 # Initialize logger
 logger = get_logger()
 
+# Most recent unrendered comparison per camera, for on-demand previews
+_latest_render_handles = {}
+_latest_render_handles_lock = threading.Lock()
+
+def is_deferred_rendering():
+    """
+    Check whether comparison images are only rendered when they will be used.
+    
+    Off by default: when on, the comparison image the GUI shows is only updated
+    on owl detections or when a preview is requested, not every cycle.
+    
+    Returns:
+        bool: True if OWL_DEFERRED_RENDERING is enabled
+    """
+    return os.getenv('OWL_DEFERRED_RENDERING', 'False').lower() == 'true'
+
+def ensure_pil_image(image):
+    """
+    Return a PIL image for rendering, wrapping NumPy frames when needed.
+    
+    Luminance-only frames (grayscale detection) become 'L' images; they are
+    only expanded to colour when pasted into the RGB comparison canvas.
+    
+    Args:
+        image (PIL.Image or numpy.ndarray): Image or captured frame
+        
+    Returns:
+        PIL.Image: Image suitable for pasting into a comparison panel
+    """
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(np.ascontiguousarray(image))
+    return image
+
 def validate_comparison_images(base_image, new_image, expected_size=None):
     """Validate images for comparison."""
     try:
@@ -50,55 +95,23 @@ def analyze_change_metrics(diff_image, threshold, config):
     """Analyze pixel and luminance changes in difference image."""
     try:
         # Convert to numpy array for calculations
-        diff_array = np.array(diff_image.convert('L'))
-        total_pixels = diff_array.size
-        
-        # Calculate pixel change metrics
-        changed_pixels = np.sum(diff_array > threshold)
-        pixel_change_ratio = changed_pixels / total_pixels
-        
-        # Calculate luminance metrics
-        mean_luminance = np.mean(diff_array)
-        max_luminance = np.max(diff_array)
-        std_luminance = np.std(diff_array)
-        
-        # Calculate region-specific metrics
-        height, width = diff_array.shape
-        regions = {
-            'top': diff_array[:height//3, :],
-            'middle': diff_array[height//3:2*height//3, :],
-            'bottom': diff_array[2*height//3:, :]
-        }
-        
-        region_metrics = {}
-        for region_name, region_data in regions.items():
-            region_metrics[region_name] = {
-                'mean_luminance': np.mean(region_data),
-                'pixel_change_ratio': np.sum(region_data > threshold) / region_data.size
-            }
-        
-        return {
-            'pixel_change_ratio': pixel_change_ratio,
-            'mean_luminance': mean_luminance,
-            'max_luminance': max_luminance,
-            'std_luminance': std_luminance,
-            'region_metrics': region_metrics,
-            'threshold_used': threshold
-        }
+        diff_array = np.asarray(diff_image.convert('L'))
+        return compute_change_metrics(diff_array, threshold)
         
     except Exception as e:
         logger.error(f"Error analyzing change metrics: {e}")
         raise
 
-def analyze_motion_characteristics(binary_mask, config):
-    """Analyze motion characteristics in binary mask."""
+def analyze_motion_characteristics(binary_mask, config, contours=None):
+    """Analyze motion characteristics in binary mask, reusing contours if already found."""
     try:
         # Find contours
-        contours, _ = cv2.findContours(
-            binary_mask,
-            cv2.RETR_EXTERNAL,
-            cv2.CHAIN_APPROX_SIMPLE
-        )
+        if contours is None:
+            contours, _ = cv2.findContours(
+                binary_mask,
+                cv2.RETR_EXTERNAL,
+                cv2.CHAIN_APPROX_SIMPLE
+            )
         
         total_area = binary_mask.shape[0] * binary_mask.shape[1]
         motion_data = []
@@ -138,37 +151,26 @@ def analyze_motion_characteristics(binary_mask, config):
         logger.error(f"Error analyzing motion characteristics: {e}")
         raise
 
-def create_difference_visualization(base_image, new_image, threshold, config):
-    """Create enhanced difference visualization with focus on owl shapes."""
+def create_difference_visualization(base_image, new_image, threshold, config, detection_frame=None):
+    """
+    Create enhanced difference visualization with focus on owl shapes.
+    
+    The diff, binary mask and contours come from detection_frame when the
+    detector already computed them for these images.
+    """
     try:
-        # Convert to OpenCV format
-        base_cv = cv2.cvtColor(np.array(base_image), cv2.COLOR_RGB2GRAY)
-        new_cv = cv2.cvtColor(np.array(new_image), cv2.COLOR_RGB2GRAY)
-        
-        # Calculate absolute difference
-        diff = cv2.absdiff(new_cv, base_cv)
+        if detection_frame is None:
+            detection_frame = DetectionFrame(base_image, new_image)
         
-        # Apply Gaussian blur to reduce noise
-        blurred_diff = cv2.GaussianBlur(diff, (5, 5), 0)
-        
-        # Create binary mask
-        _, binary_mask = cv2.threshold(
-            blurred_diff,
-            threshold,
-            255,
-            cv2.THRESH_BINARY
-        )
+        diff = detection_frame.diff
+        binary_mask = detection_frame.get_binary_mask(threshold)
         
         # Create visualization
         diff_color = cv2.cvtColor(diff, cv2.COLOR_GRAY2BGR)
         height, width = diff.shape
         
         # Draw detection regions
-        contours, _ = cv2.findContours(
-            binary_mask,
-            cv2.RETR_EXTERNAL,
-            cv2.CHAIN_APPROX_SIMPLE
-        )
+        contours = detection_frame.get_contours(threshold)
         
         # Sort contours by area
         contours = sorted(contours, key=cv2.contourArea, reverse=True)
@@ -250,87 +252,19 @@ def add_status_overlay(image, metrics, threshold, detection_info=None, is_test=F
         PIL.Image: Image with overlay added
     """
     try:
-        # Create copy to avoid modifying original
-        img_with_text = image.copy()
-        draw = ImageDraw.Draw(img_with_text)
-        
-        # Get confidence from detection info
-        owl_confidence = 0.0
-        consecutive_frames = 0
-        confidence_factors = {}
-        
-        if detection_info:
-            owl_confidence = detection_info.get("owl_confidence", 0.0)
-            consecutive_frames = detection_info.get("consecutive_owl_frames", 0)
-            confidence_factors = detection_info.get("confidence_factors", {})
-            is_owl_detected = detection_info.get("is_owl_present", False)
-        else:
-            is_owl_detected = False
-        
-        # Determine detection status with confidence
-        if is_owl_detected:
-            status_text = f"OWL DETECTED ({owl_confidence:.1f}%)"
-            status_color = "red"
-        else:
-            status_text = f"NO OWL DETECTED ({owl_confidence:.1f}%)"
-            status_color = "green"
-            
-        if is_test:
-            status_text = f"TEST MODE - {status_text}"
-        
-        # Position text
-        x, y = 10, 10
-        line_height = 20
-        
-        # Draw status with appropriate color
-        draw.text((x, y), status_text, fill=status_color)
-        y += line_height * 2
-        
-        # Draw detailed metrics
-        metrics_text = [
-            f"Pixel Change: {metrics['pixel_change_ratio']*100:.1f}%",
-            f"Mean Luminance: {metrics['mean_luminance']:.1f}",
-            f"Max Luminance: {metrics['max_luminance']:.1f}",
-            f"Threshold: {metrics['threshold_used']}"
-        ]
-        
-        for text in metrics_text:
-            draw.text((x, y), text, fill="yellow")
-            y += line_height
-        
-        # Add empty line
-        y += line_height
-        
-        # Draw region analysis
-        draw.text((x, y), "Region Analysis:", fill="yellow")
-        y += line_height
-        
-        for region, values in metrics['region_metrics'].items():
-            draw.text((x, y), f"{region.capitalize()}: {values['mean_luminance']:.1f}", fill="yellow")
-            y += line_height
-            
-        # Add confidence breakdown if available
-        if confidence_factors:
-            # Add empty line
-            y += line_height
-            
-            draw.text((x, y), "Confidence Breakdown:", fill="yellow")
-            y += line_height
-            
-            for factor, value in confidence_factors.items():
-                draw.text((x, y), f"{factor.replace('_', ' ').capitalize()}: {value:.1f}%", fill="yellow")
-                y += line_height
-                
-            # Add consecutive frames info
-            draw.text((x, y), f"Consecutive Frames: {consecutive_frames}", fill="yellow")
-            
-        return img_with_text
+        # Labels come from a cached layer; only the status line and values are drawn per frame
+        return get_overlay_renderer().render(
+            image,
+            metrics,
+            detection_info=detection_info,
+            is_test=is_test
+        )
         
     except Exception as e:
         logger.error(f"Error adding status overlay: {e}")
         return image  # Return original if overlay fails
 
-def save_local_image_set(base_image, new_image, comparison_image, camera_name, timestamp):
+def save_local_image_set(base_image, new_image, comparison_image, camera_name, timestamp, is_detection=False):
     """
     Save a complete set of images (base, new, comparison) locally with matching timestamps.
     
@@ -340,6 +274,8 @@ def save_local_image_set(base_image, new_image, comparison_image, camera_name, t
         comparison_image (PIL.Image): The 3-panel comparison image
         camera_name (str): Name of the camera
         timestamp (datetime): Timestamp to use for all three images
+        is_detection (bool): Whether the set belongs to an owl detection
+            (kept longest when the saved images quota is reached)
     """
     try:
         from utilities.constants import SAVED_IMAGES_DIR
@@ -351,25 +287,30 @@ def save_local_image_set(base_image, new_image, comparison_image, camera_name, t
         camera_name_clean = camera_name.lower().replace(' ', '_')
         ts_str = timestamp.strftime('%Y%m%d_%H%M%S')
         
-        # Create filenames for all three images with matching timestamps
-        base_filename = f"{camera_name_clean}_base_{ts_str}.jpg"
+        # Create filenames for the new and comparison images with matching timestamps
         new_filename = f"{camera_name_clean}_new_{ts_str}.jpg"
         comparison_filename = f"{camera_name_clean}_comparison_{ts_str}.jpg"
         
-        # Create full paths
-        base_path = os.path.join(SAVED_IMAGES_DIR, base_filename)
-        new_path = os.path.join(SAVED_IMAGES_DIR, new_filename)
-        comparison_path = os.path.join(SAVED_IMAGES_DIR, comparison_filename)
+        # Create full paths (extension follows the configured saved_image format)
+        new_path = get_output_path(os.path.join(SAVED_IMAGES_DIR, new_filename), "saved_image")
+        comparison_path = get_output_path(os.path.join(SAVED_IMAGES_DIR, comparison_filename), "saved_image")
+        
+        # The base image rarely changes, so it is stored once per distinct content;
+        # the saved image index links the set's other images to it (see get_base_path)
+        base_hash, base_path = get_content_store().put(base_image, camera_name, is_detection=is_detection)
         
-        # Save all three images
-        base_image.save(base_path, quality=95)
-        new_image.save(new_path, quality=95)
-        comparison_image.save(comparison_path, quality=95)
+        # Queue the other two images; these saves may be dropped under back-pressure
+        writer = get_image_writer()
+        for image, path in ((new_image, new_path), (comparison_image, comparison_path)):
+            # Written images are indexed so the folder stays within its quotas
+            future = writer.submit(image, path, output_type="saved_image")
+            track_saved_image(future, camera_name, is_detection, base_path=base_path)
         
-        logger.info(f"Saved complete image set for {camera_name} with timestamp {ts_str}")
+        logger.info(f"Queued image set for {camera_name} with timestamp {ts_str} (base {base_hash[:12]})")
         
         return {
             "base_path": base_path,
+            "base_hash": base_hash,
             "new_path": new_path,
             "comparison_path": comparison_path
         }
@@ -383,8 +324,8 @@ def create_comparison_image(base_image, new_image, camera_name, threshold, confi
     Create enhanced three-panel comparison image with owl-specific detection and confidence display.
     
     Args:
-        base_image (PIL.Image): Base reference image
-        new_image (PIL.Image): New image to check
+        base_image (PIL.Image or numpy.ndarray): Base reference image
+        new_image (PIL.Image or numpy.ndarray): New image to check
         camera_name (str): Name of the camera
         threshold (int): Threshold value
         config (dict): Camera configuration
@@ -393,9 +334,14 @@ def create_comparison_image(base_image, new_image, camera_name, threshold, confi
         timestamp (datetime): Timestamp for image
         
     Returns:
-        str: Path to saved comparison image
+        str: Path the comparison image is queued to. The file may still be
+            being written; readers wait with get_image_writer().wait_for_path
     """
     try:
+        # Captured frames arrive as NumPy views; rendering needs PIL images
+        base_image = ensure_pil_image(base_image)
+        new_image = ensure_pil_image(new_image)
+        
         # Validate images
         is_valid, message = validate_comparison_images(base_image, new_image)
         if not is_valid:
@@ -404,17 +350,27 @@ def create_comparison_image(base_image, new_image, camera_name, threshold, confi
         # Get image dimensions
         width, height = base_image.size
         
+        # Reuse the detector's difference analysis when it matches these images
+        detection_frame = detection_info.get("detection_frame") if detection_info else None
+        if detection_frame is None or (detection_frame.width, detection_frame.height) != (width, height):
+            detection_frame = DetectionFrame(base_image, new_image)
+        
         # Create visualization
         diff_image, binary_mask, contains_owl_shapes = create_difference_visualization(
             base_image,
             new_image,
             threshold,
-            config
+            config,
+            detection_frame=detection_frame
         )
         
-        # Analyze metrics
-        change_metrics = analyze_change_metrics(diff_image, threshold, config)
-        motion_chars = analyze_motion_characteristics(binary_mask, config)
+        # Analyze metrics on the raw diff (before annotations are drawn)
+        change_metrics = detection_frame.get_change_metrics(threshold)
+        motion_chars = analyze_motion_characteristics(
+            binary_mask,
+            config,
+            contours=detection_frame.get_contours(threshold)
+        )
         
         # Add metrics to change_metrics
         change_metrics.update({
@@ -443,13 +399,15 @@ def create_comparison_image(base_image, new_image, camera_name, threshold, confi
             timestamp = datetime.now(pytz.timezone('America/Los_Angeles'))
             
         # Get the fixed path for this type of comparison
-        comparison_path = get_comparison_image_path(camera_name)
+        comparison_path = get_output_path(get_comparison_image_path(camera_name), "comparison")
         
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(comparison_path), exist_ok=True)
+        # Save the comparison image to the fixed location in the background;
+        # it is written atomically and never dropped (the writer creates the directory)
+        get_image_writer().submit(comparison, comparison_path, critical=True, output_type="comparison")
         
-        # Save the comparison image to the fixed location
-        comparison.save(comparison_path, quality=95)
+        # Email preview and thumbnail variants, resized while the image is in memory
+        if is_derivatives_enabled():
+            create_derivatives(comparison, comparison_path)
         
         # Check if local saving is enabled
         local_saving = os.getenv('OWL_LOCAL_SAVING', 'False').lower() == 'true'
@@ -462,14 +420,15 @@ def create_comparison_image(base_image, new_image, camera_name, threshold, confi
                 new_image, 
                 comparison,
                 camera_name,
-                timestamp
+                timestamp,
+                is_detection=bool(detection_info and detection_info.get("is_owl_present", False))
             )
             
         is_owl_detected = detection_info.get("is_owl_present", False) if detection_info else contains_owl_shapes
         confidence = detection_info.get("owl_confidence", 0.0) if detection_info else 0.0
         
         logger.info(
-            f"Created comparison image for {camera_name}. "
+            f"Queued comparison image for {camera_name}. "
             f"Owl detected: {is_owl_detected}, "
             f"Confidence: {confidence:.1f}% "
             f"{'(Test Mode)' if is_test else ''}"
@@ -482,6 +441,149 @@ def create_comparison_image(base_image, new_image, camera_name, threshold, confi
         logger.error(f"Error creating comparison image: {e}")
         raise
 
+class ComparisonRenderHandle:
+    """
+    Deferred comparison image for one detection.
+    
+    Holds the inputs of create_comparison_image so the image can be rendered
+    later, and only if something actually needs it. Rendering happens at
+    most once; later calls return the same path.
+    """
+    
+    def __init__(self, base_image, new_image, camera_name, threshold, config,
+                 detection_info=None, is_test=False, timestamp=None):
+        self.base_image = base_image
+        self.new_image = new_image
+        self.camera_name = camera_name
+        self.threshold = threshold
+        self.config = config
+        self.detection_info = detection_info
+        self.is_test = is_test
+        self.timestamp = timestamp
+        self.comparison_path = None
+        self.lock = threading.Lock()
+        
+    @property
+    def rendered(self):
+        """Whether the comparison image has been rendered."""
+        return self.comparison_path is not None
+        
+    def render(self):
+        """
+        Render and save the comparison image if not done already.
+        
+        Returns:
+            str: Path to the saved comparison image
+        """
+        with self.lock:
+            if self.comparison_path is None:
+                self.comparison_path = create_comparison_image(
+                    self.base_image,
+                    self.new_image,
+                    self.camera_name,
+                    threshold=self.threshold,
+                    config=self.config,
+                    detection_info=self.detection_info,
+                    is_test=self.is_test,
+                    timestamp=self.timestamp
+                )
+                
+                # Inputs are no longer needed once the JPEG exists
+                self.base_image = None
+                self.new_image = None
+                self.detection_info = None
+                
+                with _latest_render_handles_lock:
+                    if _latest_render_handles.get(self.camera_name) is self:
+                        del _latest_render_handles[self.camera_name]
+            return self.comparison_path
+    
+    def defer(self):
+        """Keep this handle as the camera's latest preview candidate."""
+        with _latest_render_handles_lock:
+            _latest_render_handles[self.camera_name] = self
+
+def render_latest_comparison(camera_name):
+    """
+    Render the most recent deferred comparison image for a camera, e.g. for a preview.
+    
+    Args:
+        camera_name (str): Name of the camera
+        
+    Returns:
+        str or None: Path to the comparison image, or None if nothing is pending
+    """
+    with _latest_render_handles_lock:
+        handle = _latest_render_handles.get(camera_name)
+    if handle is None:
+        return None
+    return handle.render()
+
+def request_comparison_preview(camera_names=None):
+    """
+    Ask the running motion detection process to render its latest deferred
+    comparison images. The GUI runs in a separate process, so the request is
+    a small file that the detection loop polls (see service_comparison_preview_request).
+    
+    Args:
+        camera_names (list, optional): Cameras to render (all cameras if None)
+    """
+    try:
+        os.makedirs(os.path.dirname(COMPARISON_PREVIEW_REQUEST), exist_ok=True)
+        temp_path = f"{COMPARISON_PREVIEW_REQUEST}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"cameras": camera_names, "requested_at": time.time()}, file)
+        os.replace(temp_path, COMPARISON_PREVIEW_REQUEST)
+        logger.info("Requested comparison image previews")
+    except Exception as e:
+        logger.error(f"Error requesting comparison previews: {e}")
+
+def service_comparison_preview_request():
+    """
+    Render the deferred comparison images asked for by request_comparison_preview.
+    Called once per detection cycle; costs one stat when there is no request.
+    
+    Returns:
+        dict: Camera name to rendered comparison path (empty if no request)
+    """
+    if not os.path.exists(COMPARISON_PREVIEW_REQUEST):
+        return {}
+    
+    try:
+        with open(COMPARISON_PREVIEW_REQUEST, "r") as file:
+            request = json.load(file)
+    except Exception as e:
+        logger.error(f"Error reading comparison preview request: {e}")
+        request = {}
+    finally:
+        try:
+            os.remove(COMPARISON_PREVIEW_REQUEST)
+        except FileNotFoundError:
+            pass
+    
+    with _latest_render_handles_lock:
+        camera_names = request.get("cameras") or list(_latest_render_handles)
+    
+    rendered = {}
+    for camera_name in camera_names:
+        try:
+            comparison_path = render_latest_comparison(camera_name)
+            if comparison_path:
+                rendered[camera_name] = comparison_path
+                # Report once the file is on disk, without holding up the detection loop
+                get_image_writer().when_written(
+                    comparison_path,
+                    lambda path, camera_name=camera_name: logger.info(
+                        f"Rendered comparison preview for {camera_name}: {path}"
+                    ) if path else logger.warning(f"Comparison preview for {camera_name} was not written")
+                )
+        except Exception as e:
+            logger.error(f"Error rendering comparison preview for {camera_name}: {e}")
+    
+    if not rendered:
+        logger.info("Comparison preview requested, but no deferred comparisons were pending")
+    return rendered
+
 if __name__ == "__main__":
     # Test the comparison functionality
     try:
@@ -526,6 +628,7 @@ if __name__ == "__main__":
             detection_info=test_detection_info,
             is_test=True
         )
+        get_image_writer().wait_for_path(comparison_path, timeout=10)
         
         print(f"Test comparison created: {comparison_path}")
         
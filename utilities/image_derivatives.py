@@ -0,0 +1,111 @@
+# File: utilities/image_derivatives.py
+# Purpose: Produce downscaled variants of comparison images while they are rendered
+#
+# Email alerts and thumbnail views only need a small image, but used to get the
+# full three-panel comparison (up to ~1900 px wide). Variants are resized from the
+# comparison while it is still in memory, so nothing is decoded again later. Each
+# variant is written next to the original, named <original>_<variant>.jpg, so a
+# variant's path or URL can be derived from the original's with get_derivative_path.
+# Alert emails upload the email variant next to the comparison image's URL before
+# linking it (see upload_comparison_variant in upload_images_to_supabase.py).
+#
+# OWL_IMAGE_DERIVATIVES turns variant generation on or off (default True).
+
+import os
+from PIL import Image
+from utilities.logging_utils import get_logger
+from utilities.image_encoding import get_output_path
+from utilities.image_writer import get_image_writer
+
+# Initialize logger
+logger = get_logger()
+
+# Maximum width of each variant, largest first
+DERIVATIVE_VARIANTS = {
+    "email": 960,      # Inline image in alert emails
+    "thumbnail": 320   # Lists and thumbnails in viewers
+}
+
+def is_derivatives_enabled():
+    """
+    Check whether comparison image variants are produced.
+
+    Returns:
+        bool: True if OWL_IMAGE_DERIVATIVES is enabled (the default)
+    """
+    return os.getenv('OWL_IMAGE_DERIVATIVES', 'True').lower() == 'true'
+
+def get_derivative_path(path, variant):
+    """
+    Get the path (or URL) of a variant from the original's.
+
+    Args:
+        path (str): Path or URL of the original image
+        variant (str): Variant name from DERIVATIVE_VARIANTS
+
+    Returns:
+        str: Variant path or URL
+    """
+    stem = os.path.splitext(path)[0]
+    return get_output_path(f"{stem}_{variant}", "preview")
+
+def create_derivatives(image, path, critical=True):
+    """
+    Resize an in-memory image into each variant and queue them for writing.
+
+    Each variant is resized from the next larger one, which is cheaper than
+    resizing every variant from the full image.
+
+    Args:
+        image (PIL.Image): Rendered original image
+        path (str): Path the original is written to
+        critical (bool): Never drop the variant saves (see ImageWriter.submit)
+
+    Returns:
+        dict: Variant name to the path it is written to
+    """
+    writer = get_image_writer()
+    source = image
+    paths = {}
+
+    for variant, max_width in sorted(DERIVATIVE_VARIANTS.items(), key=lambda item: -item[1]):
+        if source.width > max_width:
+            height = max(1, round(source.height * max_width / source.width))
+            resized = source.resize((max_width, height), Image.LANCZOS, reducing_gap=3.0)
+        else:
+            resized = source.copy()
+
+        variant_path = get_derivative_path(path, variant)
+        writer.submit(resized, variant_path, critical=critical, copy=False, output_type="preview")
+        paths[variant] = variant_path
+        source = resized
+
+    logger.debug(f"Queued {len(paths)} variants of {os.path.basename(path)}")
+    return paths
+
+if __name__ == "__main__":
+    try:
+        import time
+        import tempfile
+        import numpy as np
+
+        logger.info("Benchmarking comparison image variants...")
+        rng = np.random.default_rng(0)
+        comparison = Image.fromarray(rng.integers(0, 256, (341, 1932, 3), dtype=np.uint8))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "comparison.jpg")
+            start = time.perf_counter()
+            paths = create_derivatives(comparison, path)
+            get_image_writer().flush(timeout=10)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            sizes = ", ".join(
+                f"{variant} {Image.open(variant_path).size} {os.path.getsize(variant_path) / 1024:.0f} KB"
+                for variant, variant_path in paths.items()
+            )
+            logger.info(f"Variants in {elapsed_ms:.1f} ms: {sizes}")
+
+    except Exception as e:
+        logger.error(f"Image derivative test failed: {e}")
+        raise
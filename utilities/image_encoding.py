@@ -0,0 +1,325 @@
+# File: utilities/image_encoding.py
+# Purpose: Configurable image encoding (backend, format and options) per output type
+#
+# Each kind of image the system writes has an encoding profile. Defaults are below
+# and can be overridden per output type in configs/image_encoding.json, e.g.
+#   {"saved_image": {"backend": "opencv", "format": "webp", "quality": 80}}
+#
+# Comparison and base images live at fixed .jpg paths that other code and the
+# uploaded URLs refer to directly, so their format cannot be overridden (quality,
+# backend and the other options can).
+#
+# Profile keys:
+#   backend      "pil" or "opencv"
+#   format       "jpeg", "webp" or "png"
+#   quality      JPEG/WebP quality (1-100)
+#   subsampling  JPEG chroma subsampling: "4:4:4", "4:2:2" or "4:2:0"
+#   optimize     JPEG optimized Huffman tables / PNG optimization
+#   progressive  Progressive JPEG
+#   compression  PNG compression level (0-9)
+
+import os
+import io
+import json
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from utilities.logging_utils import get_logger
+from utilities.constants import INPUT_CONFIG_FILES
+
+# Initialize logger
+logger = get_logger()
+
+# Default encoding per output type
+DEFAULT_ENCODING_PROFILES = {
+    # Three-panel comparison images (fixed path, uploads and email)
+    "comparison": {
+        "backend": "pil",
+        "format": "jpeg",
+        "quality": 85,
+        "subsampling": "4:4:4",  # Keep the coloured overlay text sharp
+        "optimize": True,
+        "progressive": False
+    },
+    # Base/new/comparison copies written to saved_images when local saving is on
+    "saved_image": {
+        "backend": "pil",
+        "format": "jpeg",
+        "quality": 85,
+        "subsampling": "4:2:0",
+        "optimize": True,
+        "progressive": False
+    },
+    # Base images are compared against live frames, so keep their previous encoding
+    "base_image": {
+        "backend": "pil",
+        "format": "jpeg",
+        "quality": 75,
+        "subsampling": "4:2:0",
+        "optimize": False,
+        "progressive": False
+    },
+    # Downscaled email previews and thumbnails of comparison images
+    "preview": {
+        "backend": "pil",
+        "format": "jpeg",
+        "quality": 80,
+        "subsampling": "4:2:0",
+        "optimize": True,
+        "progressive": False
+    },
+    # Binary masks compress best losslessly
+    "mask": {
+        "backend": "opencv",
+        "format": "png",
+        "compression": 3
+    }
+}
+
+# Output types written to fixed .jpg paths; their format override is rejected
+FIXED_FORMAT_TYPES = ("comparison", "base_image")
+
+# File extension per format
+FORMAT_EXTENSIONS = {
+    "jpeg": ".jpg",
+    "webp": ".webp",
+    "png": ".png"
+}
+
+# PIL format names and subsampling codes
+_PIL_FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "png": "PNG"}
+_PIL_SUBSAMPLING = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+
+# Loaded profiles, cached after the first lookup
+_encoding_profiles = None
+_encoding_profiles_lock = threading.Lock()
+
+def load_encoding_profiles():
+    """
+    Load encoding profiles, applying overrides from configs/image_encoding.json.
+
+    Returns:
+        dict: Output type to encoding profile
+    """
+    profiles = {name: dict(profile) for name, profile in DEFAULT_ENCODING_PROFILES.items()}
+
+    config_path = INPUT_CONFIG_FILES.get("image_encoding")
+    if config_path and os.path.exists(config_path):
+        try:
+            with open(config_path, "r") as file:
+                overrides = json.load(file)
+            for output_type, override in overrides.items():
+                override = dict(override)
+                if output_type in FIXED_FORMAT_TYPES and override.get("format", "jpeg") != "jpeg":
+                    logger.error(
+                        f"Ignoring format override '{override['format']}' for {output_type}: "
+                        f"its images are read from fixed .jpg paths"
+                    )
+                    override.pop("format")
+                profiles.setdefault(output_type, {}).update(override)
+            logger.info(f"Loaded image encoding overrides for: {', '.join(overrides)}")
+        except Exception as e:
+            logger.error(f"Error loading image encoding config, using defaults: {e}")
+
+    for output_type, profile in profiles.items():
+        if profile.get("format", "jpeg") not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported image format for {output_type}: {profile.get('format')}")
+        if profile.get("backend", "pil") not in ("pil", "opencv"):
+            raise ValueError(f"Unsupported encoding backend for {output_type}: {profile.get('backend')}")
+
+    return profiles
+
+def get_encoding_profile(output_type):
+    """
+    Get the encoding profile for an output type.
+
+    Args:
+        output_type (str): "comparison", "saved_image", "base_image", "preview" or "mask"
+
+    Returns:
+        dict: Encoding profile
+    """
+    global _encoding_profiles
+    with _encoding_profiles_lock:
+        if _encoding_profiles is None:
+            _encoding_profiles = load_encoding_profiles()
+        if output_type not in _encoding_profiles:
+            raise ValueError(f"Unknown image output type: {output_type}")
+        return _encoding_profiles[output_type]
+
+def get_output_path(path, output_type):
+    """
+    Give a path the file extension of its output type's format.
+
+    Args:
+        path (str): Path with any (or no) extension
+        output_type (str): Output type
+
+    Returns:
+        str: Path ending in .jpg, .webp or .png
+    """
+    extension = FORMAT_EXTENSIONS[get_encoding_profile(output_type).get("format", "jpeg")]
+    return os.path.splitext(path)[0] + extension
+
+def _encode_pil(image, profile):
+    image_format = profile.get("format", "jpeg")
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(np.ascontiguousarray(image))
+
+    options = {}
+    if image_format == "jpeg":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options["quality"] = profile.get("quality", 95)
+        options["optimize"] = profile.get("optimize", False)
+        options["progressive"] = profile.get("progressive", False)
+        if "subsampling" in profile and image.mode == "RGB":
+            options["subsampling"] = _PIL_SUBSAMPLING[profile["subsampling"]]
+    elif image_format == "webp":
+        options["quality"] = profile.get("quality", 80)
+        options["method"] = profile.get("method", 4)
+    elif image_format == "png":
+        options["optimize"] = profile.get("optimize", False)
+        options["compress_level"] = profile.get("compression", 6)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=_PIL_FORMATS[image_format], **options)
+    return buffer.getvalue()
+
+def _encode_opencv(image, profile):
+    image_format = profile.get("format", "jpeg")
+    array = np.asarray(image)
+    if array.ndim == 3:
+        # OpenCV expects BGR channel order
+        code = cv2.COLOR_RGBA2BGR if array.shape[2] == 4 else cv2.COLOR_RGB2BGR
+        array = cv2.cvtColor(array, code)
+
+    params = []
+    if image_format == "jpeg":
+        params += [cv2.IMWRITE_JPEG_QUALITY, int(profile.get("quality", 95))]
+        params += [cv2.IMWRITE_JPEG_OPTIMIZE, int(profile.get("optimize", False))]
+        params += [cv2.IMWRITE_JPEG_PROGRESSIVE, int(profile.get("progressive", False))]
+        # Sampling factor control needs OpenCV 4.5.5+
+        sampling_flag = getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR", None)
+        if sampling_flag is not None and "subsampling" in profile:
+            sampling = {
+                "4:4:4": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+                "4:2:2": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+                "4:2:0": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420
+            }[profile["subsampling"]]
+            params += [sampling_flag, sampling]
+    elif image_format == "webp":
+        params += [cv2.IMWRITE_WEBP_QUALITY, int(profile.get("quality", 80))]
+    elif image_format == "png":
+        params += [cv2.IMWRITE_PNG_COMPRESSION, int(profile.get("compression", 3))]
+
+    ok, encoded = cv2.imencode(FORMAT_EXTENSIONS[image_format], array, params)
+    if not ok:
+        raise ValueError(f"OpenCV failed to encode {image_format} image")
+    return encoded.tobytes()
+
+def encode_image(image, output_type=None, profile=None):
+    """
+    Encode an image with the profile of its output type.
+
+    Args:
+        image (PIL.Image or numpy.ndarray): RGB, RGBA or grayscale image
+        output_type (str, optional): Output type whose profile to use
+        profile (dict, optional): Explicit profile, overriding output_type
+
+    Returns:
+        bytes: Encoded image
+    """
+    if profile is None:
+        profile = get_encoding_profile(output_type)
+
+    if profile.get("backend", "pil") == "opencv":
+        return _encode_opencv(image, profile)
+    return _encode_pil(image, profile)
+
+def write_encoded_image(image, path, output_type):
+    """
+    Encode an image and write it atomically (temporary file, then rename).
+
+    Args:
+        image (PIL.Image or numpy.ndarray): Image to write
+        path (str): Destination path (used as given)
+        output_type (str): Output type whose profile to use
+
+    Returns:
+        int: Number of bytes written
+    """
+    data = encode_image(image, output_type)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(data)
+
+if __name__ == "__main__":
+    try:
+        import time
+
+        # Encoding choices to compare
+        candidates = {
+            "pil jpeg q95 (previous)": {"backend": "pil", "format": "jpeg", "quality": 95},
+            "pil jpeg q85 4:4:4 optimized": {"backend": "pil", "format": "jpeg", "quality": 85,
+                                              "subsampling": "4:4:4", "optimize": True},
+            "pil jpeg q85 4:2:0 optimized": {"backend": "pil", "format": "jpeg", "quality": 85,
+                                              "subsampling": "4:2:0", "optimize": True},
+            "pil jpeg q85 progressive": {"backend": "pil", "format": "jpeg", "quality": 85,
+                                          "optimize": True, "progressive": True},
+            "opencv jpeg q85 4:4:4": {"backend": "opencv", "format": "jpeg", "quality": 85,
+                                       "subsampling": "4:4:4"},
+            "opencv jpeg q85 4:2:0": {"backend": "opencv", "format": "jpeg", "quality": 85,
+                                       "subsampling": "4:2:0"},
+            "pil webp q80": {"backend": "pil", "format": "webp", "quality": 80},
+            "opencv webp q80": {"backend": "opencv", "format": "webp", "quality": 80},
+            "opencv png": {"backend": "opencv", "format": "png", "compression": 3}
+        }
+
+        # Single ROI and three-panel comparison sizes (width x height) of our cameras
+        roi_sizes = {
+            "Upper Patio Camera": (505, 226),
+            "Bindy Patio Camera": (195, 176),
+            "Wyze Internal Camera": (644, 341)
+        }
+        image_sizes = {}
+        for camera_name, (width, height) in roi_sizes.items():
+            image_sizes[f"{camera_name} ROI"] = (width, height)
+            image_sizes[f"{camera_name} comparison"] = (width * 3, height)
+
+        # Smooth gradient scene with sensor noise and an overlay-like text block
+        rng = np.random.default_rng(0)
+        iterations = 20
+
+        for label, (width, height) in image_sizes.items():
+            gradient = np.linspace(30, 160, width, dtype=np.float32)
+            scene = np.dstack([np.tile(gradient, (height, 1))] * 3)
+            scene += rng.normal(0, 6, scene.shape)
+            image = np.clip(scene, 0, 255).astype(np.uint8)
+            cv2.putText(image, "OWL DETECTED (75.0%)", (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.6, (255, 255, 0), 1)
+
+            logger.info(f"{label} ({width}x{height}):")
+            for name, profile in candidates.items():
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    data = encode_image(image, profile=profile)
+                encode_ms = (time.perf_counter() - start) * 1000 / iterations
+                logger.info(f"  {name:32s} {encode_ms:7.2f} ms {len(data) / 1024:8.1f} KB")
+
+    except Exception as e:
+        logger.error(f"Image encoding benchmark failed: {e}")
+        raise
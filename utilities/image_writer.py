@@ -0,0 +1,329 @@
+# File: utilities/image_writer.py
+# Purpose: Encode and write images on background threads, off the detection cycle
+#
+# Saved images land in a Google Drive-synced directory where writes can stall, so
+# detection only queues them here. Each file is written to a temporary name and
+# renamed into place, so readers never see a partial JPEG. A newer save of a path
+# replaces one still queued (its future then follows the newer save). When the
+# queue is full, the oldest non-critical save (e.g. local image sets) is dropped.
+# Critical saves (comparison images that get logged) are never dropped and never
+# block the caller; they go to fixed per-camera paths, so coalescing keeps them bounded.
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import numpy as np
+from PIL import Image
+from utilities.logging_utils import get_logger
+from utilities.image_encoding import write_encoded_image
+
+# Initialize logger
+logger = get_logger()
+
+class ImageWriteJob:
+    """A queued image save."""
+
+    def __init__(self, image, path, critical, output_type, save_kwargs):
+        self.image = image
+        self.path = path
+        self.critical = critical
+        self.output_type = output_type
+        self.save_kwargs = save_kwargs
+        self.future = Future()
+
+class ImageWriter:
+    """
+    Bounded background queue of image saves.
+
+    Attributes:
+        written (int): Images written successfully
+        dropped (int): Non-critical saves dropped under back-pressure
+        failed (int): Saves that raised an error
+    """
+
+    def __init__(self, workers=1, max_queue=32):
+        """
+        Initialize the writer. Worker threads start on the first submit.
+
+        Args:
+            workers (int): Number of encoder threads
+            max_queue (int): Maximum number of queued saves
+        """
+        self.workers = max(workers, 1)
+        self.max_queue = max(max_queue, 1)
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.threads = []
+        self.in_flight = 0
+        self.pending_paths = {}
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _start_workers(self):
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(
+                target=self._run,
+                name=f"ImageWriter-{len(self.threads) + 1}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _drop_oldest_non_critical(self):
+        """Drop the oldest queued non-critical save. Caller holds the lock."""
+        for job in self.queue:
+            if not job.critical:
+                self.queue.remove(job)
+                self._forget_path(job)
+                self.dropped += 1
+                job.future.set_result(None)
+                logger.warning(f"Image writer queue full, dropped save of {job.path}")
+                return True
+        return False
+
+    def _forget_path(self, job):
+        if self.pending_paths.get(job.path) is job:
+            del self.pending_paths[job.path]
+
+    def submit(self, image, path, critical=False, copy=True, output_type=None, **save_kwargs):
+        """
+        Queue an image to be saved.
+
+        Args:
+            image (PIL.Image or numpy.ndarray): Image to save
+            path (str): Destination path; the format comes from its extension
+            critical (bool): Never drop this save, even when the queue is full
+            copy (bool): Copy the image first, so the caller may keep modifying
+                or close it (pass False for images nothing else references)
+            output_type (str, optional): Encode with this output type's profile
+                from utilities/image_encoding.py instead of PIL.Image.save
+            **save_kwargs: Options passed to PIL.Image.save (e.g. quality=95)
+
+        Returns:
+            concurrent.futures.Future: Resolves to the written path, or None if dropped
+        """
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(np.ascontiguousarray(image))
+        elif copy:
+            image = image.copy()
+
+        job = ImageWriteJob(image, path, critical, output_type, save_kwargs)
+
+        with self.condition:
+            self._start_workers()
+
+            # A newer image for the same path supersedes one still waiting;
+            # the superseded save resolves when the newer one is written
+            queued = self.pending_paths.get(path)
+            if queued is not None and queued in self.queue:
+                self.queue.remove(queued)
+                self._follow(queued.future, job.future)
+
+            while len(self.queue) >= self.max_queue and self._drop_oldest_non_critical():
+                pass
+
+            if len(self.queue) >= self.max_queue:
+                if not critical:
+                    self.dropped += 1
+                    logger.warning(f"Image writer queue full of critical saves, dropped save of {path}")
+                    job.future.set_result(None)
+                    return job.future
+                # Never block the detection loop; critical saves coalesce on fixed paths
+                logger.warning(f"Image writer queue over its limit of {self.max_queue} with critical saves")
+
+            self.queue.append(job)
+            self.pending_paths[path] = job
+            self.condition.notify_all()
+
+        return job.future
+
+    @staticmethod
+    def _follow(superseded, newer):
+        """Resolve a superseded save's future with the outcome of the newer save."""
+        def _copy(done):
+            if done.exception() is not None:
+                superseded.set_exception(done.exception())
+            else:
+                superseded.set_result(done.result())
+        newer.add_done_callback(_copy)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                job = self.queue.popleft()
+                self.in_flight += 1
+                self.condition.notify_all()
+
+            error = None
+            try:
+                self._write(job)
+                self.written += 1
+            except Exception as e:
+                error = e
+                self.failed += 1
+                logger.error(f"Error writing image {job.path}: {e}")
+
+            # Forget the path before resolving, so waiters only see newer saves as pending
+            with self.condition:
+                self.in_flight -= 1
+                self._forget_path(job)
+                self.condition.notify_all()
+
+            if error is None:
+                job.future.set_result(job.path)
+            else:
+                job.future.set_exception(error)
+
+    def _write(self, job):
+        """Encode to a temporary file next to the destination, then rename it into place."""
+        if job.output_type:
+            try:
+                write_encoded_image(job.image, job.path, job.output_type)
+            finally:
+                job.image.close()
+            return
+        
+        directory = os.path.dirname(job.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        extension = os.path.splitext(job.path)[1].lower()
+        image_format = Image.registered_extensions().get(extension, "JPEG")
+
+        temp_path = f"{job.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            job.image.save(temp_path, format=image_format, **job.save_kwargs)
+            os.replace(temp_path, job.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            job.image.close()
+
+    def wait_for_path(self, path, timeout=None):
+        """
+        Wait until no save of a path is queued or in progress, including saves
+        submitted for the path while waiting.
+
+        Args:
+            path (str): Destination path
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if no save of the path is pending anymore
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.condition:
+                job = self.pending_paths.get(path)
+            if job is None:
+                return True
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                job.future.result(remaining)
+            except FutureTimeoutError:
+                return False
+            except Exception:
+                # A failed write is no longer pending; check for a newer save
+                pass
+
+    def when_written(self, path, callback):
+        """
+        Call a function once the pending save of a path has finished, without waiting.
+
+        Args:
+            path (str): Destination path
+            callback (callable): Called with the written path, or None if the
+                save was dropped or failed (immediately if nothing is pending)
+        """
+        with self.condition:
+            job = self.pending_paths.get(path)
+        if job is None:
+            callback(path if os.path.exists(path) else None)
+            return
+
+        def _on_done(done):
+            written = None
+            if not done.cancelled() and done.exception() is None:
+                written = done.result()
+            callback(written)
+
+        job.future.add_done_callback(_on_done)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued save has been written or dropped.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if the queue drained
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.queue and self.in_flight == 0,
+                timeout
+            )
+
+# Shared writer, created on first use
+_image_writer = None
+_image_writer_lock = threading.Lock()
+
+def get_image_writer():
+    """
+    Get the shared image writer configured from the environment.
+
+    OWL_IMAGE_WRITER_THREADS sets the number of encoder threads (default 1) and
+    OWL_IMAGE_WRITER_QUEUE_SIZE the maximum number of queued saves (default 32).
+
+    Returns:
+        ImageWriter: The shared writer
+    """
+    global _image_writer
+    with _image_writer_lock:
+        if _image_writer is None:
+            try:
+                workers = int(os.getenv('OWL_IMAGE_WRITER_THREADS', '1'))
+                max_queue = int(os.getenv('OWL_IMAGE_WRITER_QUEUE_SIZE', '32'))
+            except ValueError:
+                logger.warning("Invalid image writer settings, using 1 thread and a 32 image queue")
+                workers, max_queue = 1, 32
+            _image_writer = ImageWriter(workers, max_queue)
+            logger.info(f"Image writer started with {workers} threads and a {max_queue} image queue")
+        return _image_writer
+
+if __name__ == "__main__":
+    try:
+        import tempfile
+
+        logger.info("Testing image writer...")
+        writer = ImageWriter(workers=2, max_queue=4)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            start = time.perf_counter()
+            futures = [
+                writer.submit(
+                    np.full((341, 644, 3), i, dtype=np.uint8),
+                    os.path.join(temp_dir, f"test_{i}.jpg"),
+                    quality=95
+                )
+                for i in range(20)
+            ]
+            submit_ms = (time.perf_counter() - start) * 1000
+            writer.flush()
+
+            written = [f.result() for f in futures if f.result()]
+            logger.info(
+                f"Queued 20 images in {submit_ms:.1f} ms; wrote {len(written)}, "
+                f"dropped {writer.dropped}, failed {writer.failed}"
+            )
+
+    except Exception as e:
+        logger.error(f"Image writer test failed: {e}")
+        raise
@@ -0,0 +1,349 @@
+# File: utilities/local_image_store.py
+# Purpose: Keep the local saved_images folder within size quotas and a retention period
+#
+# With local saving on, every cycle writes a base, new and comparison image per
+# camera. Each saved file is recorded in a small SQLite index (camera, time, size,
+# detection flag) with running size totals per camera kept in the same database,
+# so enforcing the quotas only looks up the oldest indexed files and never lists
+# the directory. Non-detection images are evicted before detection images. The
+# totals live in the index rather than in memory because the front end clears the
+# folder from a different process. Images of a local image set also record the
+# content store object holding the set's base image (base_path), since the base
+# image is no longer written next to them.
+#
+# Settings (0 disables a limit):
+#   OWL_SAVED_IMAGES_MAX_MB           Total size of saved images (default 2048)
+#   OWL_SAVED_IMAGES_CAMERA_MAX_MB    Size of saved images per camera (default 1024)
+#   OWL_SAVED_IMAGES_RETENTION_DAYS   Delete saved images older than this (default 14)
+
+import os
+import time
+import sqlite3
+import threading
+from utilities.logging_utils import get_logger
+from utilities.constants import SAVED_IMAGES_INDEX
+
+# Initialize logger
+logger = get_logger()
+
+# Seconds between retention sweeps
+RETENTION_CHECK_INTERVAL = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    camera TEXT NOT NULL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL,
+    is_detection INTEGER NOT NULL DEFAULT 0,
+    base_path TEXT
+);
+CREATE INDEX IF NOT EXISTS saved_images_eviction ON saved_images (is_detection, id);
+CREATE INDEX IF NOT EXISTS saved_images_camera_eviction ON saved_images (camera, is_detection, id);
+CREATE INDEX IF NOT EXISTS saved_images_created ON saved_images (created);
+CREATE TABLE IF NOT EXISTS saved_image_usage (
+    camera TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL
+);
+"""
+
+class LocalImageStore:
+    """
+    SQLite index of saved images with quota and retention enforcement.
+
+    Attributes:
+        evicted (int): Images deleted by quotas or retention
+    """
+
+    def __init__(self, index_path, max_total_bytes=0, max_camera_bytes=0, retention_days=0):
+        """
+        Open (or create) the index.
+
+        Args:
+            index_path (str): Path to the SQLite index file
+            max_total_bytes (int): Total size limit, 0 for none
+            max_camera_bytes (int): Per-camera size limit, 0 for none
+            retention_days (float): Maximum image age in days, 0 for none
+        """
+        self.index_path = index_path
+        self.max_total_bytes = max_total_bytes
+        self.max_camera_bytes = max_camera_bytes
+        self.retention_seconds = retention_days * 86400
+        self.lock = threading.Lock()
+        self.evicted = 0
+        self.last_retention_check = 0.0
+
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Writes come from the image writer threads, so share one locked connection
+        self.connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(saved_images)")]
+        if "base_path" not in columns:
+            # Indexes created before base images moved to the content store
+            self.connection.execute("ALTER TABLE saved_images ADD COLUMN base_path TEXT")
+        self.connection.commit()
+
+    def _add_usage(self, camera_name, size):
+        """Adjust a camera's size total. Caller holds the lock."""
+        self.connection.execute(
+            "INSERT INTO saved_image_usage (camera, bytes) VALUES (?, ?) "
+            "ON CONFLICT(camera) DO UPDATE SET bytes = bytes + excluded.bytes",
+            (camera_name, size)
+        )
+
+    def _camera_bytes(self, camera_name):
+        row = self.connection.execute(
+            "SELECT bytes FROM saved_image_usage WHERE camera = ?", (camera_name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _total_bytes(self):
+        # One row per camera, so this stays cheap however many images are indexed
+        return self.connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM saved_image_usage").fetchone()[0]
+
+    def add(self, path, camera_name, is_detection=False, created=None, size=None, base_path=None):
+        """
+        Index a saved image, then evict images as needed to stay within limits.
+
+        Args:
+            path (str): Path of the written image
+            camera_name (str): Name of the camera
+            is_detection (bool): Whether the image belongs to an owl detection
+            created (float, optional): Epoch time the image was saved (defaults to now)
+            size (int, optional): File size in bytes (read from the file if not given)
+            base_path (str, optional): Content store object of the image set's base image
+        """
+        if size is None:
+            size = os.path.getsize(path)
+        if created is None:
+            created = time.time()
+
+        with self.lock:
+            # Re-saving a path replaces its entry
+            self._forget(self.connection.execute(
+                "SELECT id, path, camera, size FROM saved_images WHERE path = ?", (path,)
+            ).fetchone())
+            self.connection.execute(
+                "INSERT INTO saved_images (path, camera, created, size, is_detection, base_path) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, camera_name, created, size, 1 if is_detection else 0, base_path)
+            )
+            self._add_usage(camera_name, size)
+
+            self._enforce_limits(camera_name)
+            self.connection.commit()
+
+    def mark_detection(self, path):
+        """
+        Flag an indexed image as belonging to an owl detection, so it is evicted last.
+
+        Args:
+            path (str): Path of the indexed image
+        """
+        with self.lock:
+            self.connection.execute("UPDATE saved_images SET is_detection = 1 WHERE path = ?", (path,))
+            self.connection.commit()
+
+    def get_base_path(self, path):
+        """
+        Get the base image of the image set a saved image belongs to.
+
+        Args:
+            path (str): Path of a saved new or comparison image
+
+        Returns:
+            str or None: Content store object path, or None if not recorded
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT base_path FROM saved_images WHERE path = ?", (path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _forget(self, row):
+        """Drop an index row and its size from the totals. Caller holds the lock."""
+        if row is None:
+            return
+        image_id, _, camera, size = row
+        self.connection.execute("DELETE FROM saved_images WHERE id = ?", (image_id,))
+        self._add_usage(camera, -size)
+
+    def _evict(self, row):
+        """Delete an indexed image file and its row. Caller holds the lock."""
+        try:
+            os.remove(row[1])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting saved image {row[1]}: {e}")
+        self._forget(row)
+        self.evicted += 1
+
+    def _oldest(self, camera_name=None):
+        """Get the next image to evict: oldest non-detection first, then oldest overall."""
+        if camera_name is None:
+            return self.connection.execute(
+                "SELECT id, path, camera, size FROM saved_images ORDER BY is_detection, id LIMIT 1"
+            ).fetchone()
+        return self.connection.execute(
+            "SELECT id, path, camera, size FROM saved_images WHERE camera = ? "
+            "ORDER BY is_detection, id LIMIT 1",
+            (camera_name,)
+        ).fetchone()
+
+    def _enforce_limits(self, camera_name):
+        """Apply retention and the quotas after an add. Caller holds the lock."""
+        evicted_before = self.evicted
+        now = time.time()
+
+        if self.retention_seconds and now - self.last_retention_check >= RETENTION_CHECK_INTERVAL:
+            self.last_retention_check = now
+            expired = self.connection.execute(
+                "SELECT id, path, camera, size FROM saved_images WHERE created < ?",
+                (now - self.retention_seconds,)
+            ).fetchall()
+            for row in expired:
+                self._evict(row)
+
+        if self.max_camera_bytes:
+            while self._camera_bytes(camera_name) > self.max_camera_bytes:
+                row = self._oldest(camera_name)
+                if row is None:
+                    break
+                self._evict(row)
+
+        if self.max_total_bytes:
+            while self._total_bytes() > self.max_total_bytes:
+                row = self._oldest()
+                if row is None:
+                    break
+                self._evict(row)
+
+        if self.evicted > evicted_before:
+            logger.info(
+                f"Evicted {self.evicted - evicted_before} saved images; "
+                f"{self._total_bytes() / (1024 * 1024):.1f} MB remain"
+            )
+
+    def clear(self):
+        """
+        Delete every indexed image and empty the index.
+
+        Returns:
+            int: Number of images deleted
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT id, path, camera, size FROM saved_images").fetchall()
+            for row in rows:
+                try:
+                    os.remove(row[1])
+                except FileNotFoundError:
+                    pass
+            self.connection.execute("DELETE FROM saved_images")
+            self.connection.execute("DELETE FROM saved_image_usage")
+            self.connection.commit()
+            return len(rows)
+
+    def get_usage(self):
+        """
+        Get the indexed size per camera and in total.
+
+        Returns:
+            dict: total_bytes, camera_bytes and image count
+        """
+        with self.lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM saved_images").fetchone()[0]
+            camera_bytes = dict(self.connection.execute(
+                "SELECT camera, bytes FROM saved_image_usage"
+            ).fetchall())
+            return {
+                "total_bytes": sum(camera_bytes.values()),
+                "camera_bytes": camera_bytes,
+                "image_count": count
+            }
+
+# Shared store, created on first use
+_local_image_store = None
+_local_image_store_lock = threading.Lock()
+
+def get_local_image_store():
+    """
+    Get the shared saved image store configured from the environment.
+
+    Returns:
+        LocalImageStore: The shared store
+    """
+    global _local_image_store
+    with _local_image_store_lock:
+        if _local_image_store is None:
+            try:
+                max_total_mb = float(os.getenv('OWL_SAVED_IMAGES_MAX_MB', '2048'))
+                max_camera_mb = float(os.getenv('OWL_SAVED_IMAGES_CAMERA_MAX_MB', '1024'))
+                retention_days = float(os.getenv('OWL_SAVED_IMAGES_RETENTION_DAYS', '14'))
+            except ValueError:
+                logger.warning("Invalid saved image limits, using 2048 MB total, 1024 MB per camera, 14 days")
+                max_total_mb, max_camera_mb, retention_days = 2048.0, 1024.0, 14.0
+
+            _local_image_store = LocalImageStore(
+                SAVED_IMAGES_INDEX,
+                max_total_bytes=int(max_total_mb * 1024 * 1024),
+                max_camera_bytes=int(max_camera_mb * 1024 * 1024),
+                retention_days=retention_days
+            )
+            logger.info(
+                f"Saved image store: {max_total_mb:.0f} MB total, {max_camera_mb:.0f} MB per camera, "
+                f"{retention_days:.0f} day retention"
+            )
+        return _local_image_store
+
+def track_saved_image(future, camera_name, is_detection=False, base_path=None):
+    """
+    Index a queued image save once the image writer has written it.
+
+    Args:
+        future (concurrent.futures.Future): Future from ImageWriter.submit
+        camera_name (str): Name of the camera
+        is_detection (bool): Whether the image belongs to an owl detection
+        base_path (str, optional): Content store object of the image set's base image
+    """
+    def _on_written(done):
+        try:
+            path = done.result()
+            if path:
+                get_local_image_store().add(path, camera_name, is_detection, base_path=base_path)
+        except Exception as e:
+            logger.error(f"Error indexing saved image for {camera_name}: {e}")
+
+    future.add_done_callback(_on_written)
+
+if __name__ == "__main__":
+    try:
+        import tempfile
+
+        logger.info("Testing local image store...")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = LocalImageStore(
+                os.path.join(temp_dir, "index.sqlite3"),
+                max_total_bytes=50 * 1024,
+                max_camera_bytes=30 * 1024
+            )
+            for i in range(20):
+                camera_name = "Upper Patio Camera" if i % 2 else "Bindy Patio Camera"
+                path = os.path.join(temp_dir, f"image_{i}.jpg")
+                with open(path, "wb") as file:
+                    file.write(os.urandom(4 * 1024))
+                store.add(path, camera_name, is_detection=(i % 5 == 0))
+
+            usage = store.get_usage()
+            logger.info(
+                f"Kept {usage['image_count']} images, {usage['total_bytes'] / 1024:.0f} KB; "
+                f"evicted {store.evicted}"
+            )
+
+    except Exception as e:
+        logger.error(f"Local image store test failed: {e}")
+        raise
@@ -6,25 +6,112 @@ import numpy as np
 from PIL import Image
 import os
 import logging
+import threading
 from datetime import datetime
 import pytz
 
 # Import utilities
 from utilities.logging_utils import get_logger
-from utilities.confidence_utils import calculate_owl_confidence, is_owl_detected
+from utilities.confidence_utils import calculate_owl_confidence, is_owl_detected, update_frame_history
+from utilities.detection_frame import DetectionFrame
 
 # Initialize logger
 logger = get_logger()
 
-def analyze_image_differences(base_image, new_image, threshold, config):
+# Coarse gate counters per camera, used to log how many frames skip full analysis
+# (updated from the camera worker threads)
+_coarse_gate_stats = {}
+_coarse_gate_stats_lock = threading.Lock()
+
+# Log the coarse gate skip rate every this many checked frames per camera
+COARSE_GATE_LOG_INTERVAL = 100
+
+def check_coarse_gate(base_image, new_image, gate_config):
+    """
+    Cheaply check a downsampled diff for any change worth a full analysis.
+    
+    Both images are area-downsampled by the gate scale, so sensor noise is
+    averaged away while an owl-sized change still shows up in many coarse pixels.
+    
+    Args:
+        base_image (PIL.Image or numpy.ndarray): Base reference image
+        new_image (PIL.Image or numpy.ndarray): New image to check
+        gate_config (dict): Camera "coarse_gate" settings
+        
+    Returns:
+        tuple: (has_change, changed_ratio, mean_change)
+    """
+    scale = max(int(gate_config.get("scale", 4)), 1)
+    gate_threshold = gate_config.get("luminance_threshold", 10)
+    min_changed_ratio = gate_config.get("min_changed_ratio", 0.001)
+    
+    coarse = []
+    for image in (base_image, new_image):
+        array = np.asarray(image)
+        height, width = array.shape[:2]
+        size = (max(width // scale, 1), max(height // scale, 1))
+        
+        # Downsample before the colour conversion so it runs on 1/scale^2 pixels
+        small = cv2.resize(array, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        coarse.append(small)
+    
+    coarse_diff = cv2.absdiff(coarse[1], coarse[0])
+    _, coarse_mask = cv2.threshold(coarse_diff, gate_threshold, 255, cv2.THRESH_BINARY)
+    changed_ratio = cv2.countNonZero(coarse_mask) / coarse_mask.size
+    
+    return changed_ratio >= min_changed_ratio, changed_ratio, float(cv2.mean(coarse_diff)[0])
+
+def record_coarse_gate_result(camera_name, skipped):
+    """
+    Count a coarse gate decision and periodically log the skip rate.
+    
+    Args:
+        camera_name (str): Name of the camera
+        skipped (bool): Whether full analysis was skipped
+    """
+    with _coarse_gate_stats_lock:
+        stats = _coarse_gate_stats.setdefault(camera_name, {"checked": 0, "skipped": 0})
+        stats["checked"] += 1
+        if skipped:
+            stats["skipped"] += 1
+        checked, skipped_count = stats["checked"], stats["skipped"]
+    
+    if checked % COARSE_GATE_LOG_INTERVAL == 0:
+        skip_rate = skipped_count / checked * 100
+        logger.info(
+            f"Coarse gate for {camera_name}: skipped {skipped_count} of "
+            f"{checked} frames ({skip_rate:.1f}%)"
+        )
+
+def get_coarse_gate_stats():
+    """
+    Get coarse gate counters for all cameras.
+    
+    Returns:
+        dict: Camera name to {"checked", "skipped", "skip_rate"}
+    """
+    with _coarse_gate_stats_lock:
+        return {
+            camera_name: {
+                **stats,
+                "skip_rate": stats["skipped"] / stats["checked"] * 100 if stats["checked"] else 0.0
+            }
+            for camera_name, stats in _coarse_gate_stats.items()
+        }
+
+def analyze_image_differences(base_image, new_image, threshold, config, detection_frame=None):
     """
     Analyze the differences between base and new images.
     
     Args:
-        base_image (PIL.Image): Base reference image
-        new_image (PIL.Image): New image to check
+        base_image (PIL.Image or numpy.ndarray): Base reference image
+        new_image (PIL.Image or numpy.ndarray): New image to check
         threshold (int): Luminance threshold for change detection
         config (dict): Camera configuration
+        detection_frame (DetectionFrame, optional): Precomputed difference analysis
+            of these images; created when not provided
         
     Returns:
         dict: Analysis results including:
@@ -33,61 +120,26 @@ def analyze_image_differences(base_image, new_image, threshold, config):
             - diff_metrics: Additional difference metrics
     """
     try:
-        # Convert to numpy arrays for OpenCV processing
-        base_cv = cv2.cvtColor(np.array(base_image), cv2.COLOR_RGB2GRAY)
-        new_cv = cv2.cvtColor(np.array(new_image), cv2.COLOR_RGB2GRAY)
-        
-        # Calculate absolute difference
-        diff = cv2.absdiff(new_cv, base_cv)
-        
-        # Apply Gaussian blur to reduce noise
-        blurred_diff = cv2.GaussianBlur(diff, (5, 5), 0)
+        # Grayscale conversion, absdiff and blur happen once per frame in
+        # DetectionFrame and are shared with the comparison image renderer
+        if detection_frame is None:
+            detection_frame = DetectionFrame(base_image, new_image)
         
         # Create binary mask of changed pixels
-        _, binary_mask = cv2.threshold(
-            blurred_diff,
-            threshold,
-            255,
-            cv2.THRESH_BINARY
-        )
-        
-        # Calculate pixel change percentage
-        height, width = diff.shape
-        total_pixels = height * width
-        changed_pixels = np.sum(binary_mask > 0)
-        pixel_change_percentage = (changed_pixels / total_pixels) * 100
-        
-        # Calculate average luminance change
-        mean_luminance_change = np.mean(diff)
-        max_luminance_change = np.max(diff)
-        
-        # Calculate region-specific metrics
-        # Divide the image into regions (top, middle, bottom)
-        regions = {
-            'top': diff[:height//3, :],
-            'middle': diff[height//3:2*height//3, :],
-            'bottom': diff[2*height//3:, :]
-        }
+        binary_mask = detection_frame.get_binary_mask(threshold)
         
-        region_metrics = {}
-        for region_name, region_data in regions.items():
-            region_changed = np.sum(region_data > threshold)
-            region_total = region_data.size
-            
-            region_metrics[region_name] = {
-                'mean_luminance': np.mean(region_data),
-                'max_luminance': np.max(region_data),
-                'pixel_change': (region_changed / region_total) * 100
-            }
+        # Pixel change, luminance and per-region metrics from one
+        # histogram pass per region (see utilities/diff_statistics.py)
+        stats = detection_frame.get_diff_statistics(threshold)
         
         # Return comprehensive results
         results = {
-            'pixel_change': pixel_change_percentage,
-            'luminance_change': mean_luminance_change,
-            'max_luminance': max_luminance_change,
+            'pixel_change': stats['pixel_change'],
+            'luminance_change': stats['luminance_change'],
+            'max_luminance': stats['max_luminance'],
             'diff_metrics': {
                 'binary_mask': binary_mask,
-                'region_metrics': region_metrics
+                'region_metrics': stats['region_metrics']
             }
         }
         
@@ -97,24 +149,26 @@ def analyze_image_differences(base_image, new_image, threshold, config):
         logger.error(f"Error analyzing image differences: {e}")
         raise
 
-def find_owl_candidates(binary_mask, config):
+def find_owl_candidates(binary_mask, config, contours=None):
     """
     Find regions in the binary mask that could potentially be owls.
     
     Args:
         binary_mask (numpy.ndarray): Binary mask of changed pixels
         config (dict): Camera configuration with motion detection parameters
+        contours (list, optional): External contours of binary_mask, if already found
         
     Returns:
         list: List of owl candidate regions with shape characteristics
     """
     try:
         # Find contours in the binary mask
-        contours, _ = cv2.findContours(
-            binary_mask,
-            cv2.RETR_EXTERNAL,
-            cv2.CHAIN_APPROX_SIMPLE
-        )
+        if contours is None:
+            contours, _ = cv2.findContours(
+                binary_mask,
+                cv2.RETR_EXTERNAL,
+                cv2.CHAIN_APPROX_SIMPLE
+            )
         
         # Get configuration parameters for shape filtering
         motion_config = config["motion_detection"]
@@ -154,10 +208,15 @@ def find_owl_candidates(binary_mask, config):
                 min_aspect_ratio <= aspect_ratio <= max_aspect_ratio and
                 area_ratio >= min_area_ratio):
                 
-                # Calculate average brightness within contour
-                mask = np.zeros(binary_mask.shape, dtype=np.uint8)
-                cv2.drawContours(mask, [contour], 0, 255, -1)
-                brightness = np.mean(cv2.bitwise_and(binary_mask, mask))
+                # Calculate average brightness within contour, normalized by the
+                # full frame area. The filled contour lies inside its bounding
+                # box, so only that box needs a mask; the pixels outside it
+                # would contribute zero to the sum.
+                local_mask = np.zeros((h, w), dtype=np.uint8)
+                cv2.drawContours(local_mask, [contour], 0, 255, -1, offset=(-x, -y))
+                local_binary = binary_mask[y:y + h, x:x + w]
+                masked_sum = cv2.sumElems(cv2.bitwise_and(local_binary, local_mask))[0]
+                brightness = masked_sum / total_area
                 
                 # Only add if brightness meets threshold
                 if brightness >= brightness_threshold:
@@ -186,8 +245,9 @@ def detect_owl_in_box(new_image, base_image, config, is_test=False, camera_name=
     Detect if an owl is present by comparing base and new images with confidence metrics.
     
     Args:
-        new_image (PIL.Image): New image to check
-        base_image (PIL.Image): Base reference image
+        new_image (PIL.Image or numpy.ndarray): New image to check
+        base_image (PIL.Image or numpy.ndarray): Base reference image; 2D arrays
+            are treated as already grayscale (e.g. from the base image cache)
         config (dict): Camera configuration dictionary
         is_test (bool, optional): Whether this is a test detection
         camera_name (str, optional): Name of the camera for tracking
@@ -198,26 +258,75 @@ def detect_owl_in_box(new_image, base_image, config, is_test=False, camera_name=
             - detection_info (dict): Detailed detection information with confidence metrics
     """
     try:
-        # Ensure images are in RGB mode
-        if new_image.mode != 'RGB':
+        # Ensure PIL images are in RGB mode (arrays are already RGB frames)
+        if isinstance(new_image, Image.Image) and new_image.mode != 'RGB':
             new_image = new_image.convert('RGB')
             
-        if base_image.mode != 'RGB':
+        if isinstance(base_image, Image.Image) and base_image.mode != 'RGB':
             base_image = base_image.convert('RGB')
             
         # Get threshold from config
         threshold = config.get("luminance_threshold", 30)
         
+        # Skip the full-resolution analysis when a downsampled diff shows no
+        # meaningful change (live detection only; tests always run the full path).
+        # The gate is opt-in per camera: its config.json thresholds are starting
+        # points and should be checked against the camera's detections first
+        gate_config = config.get("coarse_gate") or {}
+        if camera_name and not is_test and gate_config.get("enabled", False):
+            has_change, changed_ratio, mean_change = check_coarse_gate(base_image, new_image, gate_config)
+            record_coarse_gate_result(camera_name, skipped=not has_change)
+            
+            if not has_change:
+                # An empty frame still breaks any run of consecutive owl frames
+                update_frame_history(camera_name, 0.0, 0.0)
+                logger.debug(
+                    f"Coarse gate: no change in {camera_name} "
+                    f"({changed_ratio * 100:.2f}% coarse pixels changed), skipping full analysis"
+                )
+                return False, {
+                    "is_owl_present": False,
+                    "owl_confidence": 0.0,
+                    "consecutive_owl_frames": 0,
+                    "confidence_factors": {
+                        "shape_confidence": 0.0,
+                        "motion_confidence": 0.0,
+                        "temporal_confidence": 0.0,
+                        "camera_confidence": 0.0
+                    },
+                    # Full-resolution metrics weren't computed; the downsampled
+                    # ones are kept under their own names
+                    "pixel_change": 0.0,
+                    "luminance_change": 0.0,
+                    "coarse_pixel_change": changed_ratio * 100,
+                    "coarse_luminance_change": mean_change,
+                    "owl_candidates": [],
+                    "diff_metrics": {
+                        "binary_mask": None,
+                        "region_metrics": {}
+                    },
+                    "detection_frame": None,
+                    "coarse_gate_skipped": True
+                }
+        
+        # Compute the difference images once; the comparison image reuses them
+        detection_frame = DetectionFrame(base_image, new_image)
+        
         # Analyze image differences
         diff_results, binary_mask = analyze_image_differences(
             base_image,
             new_image,
             threshold,
-            config
+            config,
+            detection_frame=detection_frame
         )
         
         # Find potential owl candidates
-        owl_candidates = find_owl_candidates(binary_mask, config)
+        owl_candidates = find_owl_candidates(
+            binary_mask,
+            config,
+            contours=detection_frame.get_contours(threshold)
+        )
         
         # Compile detection data for confidence calculation
         detection_data = {
@@ -258,7 +367,8 @@ def detect_owl_in_box(new_image, base_image, config, is_test=False, camera_name=
                 "pixel_change": diff_results["pixel_change"],
                 "luminance_change": diff_results["luminance_change"],
                 "owl_candidates": owl_candidates,
-                "diff_metrics": diff_results["diff_metrics"]
+                "diff_metrics": diff_results["diff_metrics"],
+                "detection_frame": detection_frame
             }
             
             # Log detection result with confidence
@@ -286,7 +396,8 @@ def detect_owl_in_box(new_image, base_image, config, is_test=False, camera_name=
                 "pixel_change": diff_results["pixel_change"],
                 "luminance_change": diff_results["luminance_change"],
                 "owl_candidates": owl_candidates,
-                "diff_metrics": diff_results["diff_metrics"]
+                "diff_metrics": diff_results["diff_metrics"],
+                "detection_frame": detection_frame
             }
             
             logger.debug(
@@ -0,0 +1,344 @@
+# File: utilities/status_overlay.py
+# Purpose: Draw the status and metrics overlay on the difference panel of comparison images
+#
+# The overlay is 15-20 lines of text whose labels and layout only change with the
+# image size, the regions and the confidence factors present; only the numbers
+# change between frames. OverlayRenderer draws the labels once into a cached layer
+# per (image size, layout) and per frame only composites that layer and draws the
+# status line and value fields.
+#
+# OWL_OVERLAY_BACKEND selects how text is drawn:
+#   pil     PIL's default font and the previous overlay's layout (default)
+#   opencv  cv2.putText on the NumPy array, avoiding the PIL round trip
+
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageColor
+from utilities.logging_utils import get_logger
+
+# Initialize logger
+logger = get_logger()
+
+# Layout, matching the original overlay
+TEXT_X = 10
+TEXT_Y = 10
+LINE_HEIGHT = 20
+LABEL_COLOR = "yellow"
+OVERLAY_BACKENDS = ("pil", "opencv")
+
+# cv2.putText settings for the opencv backend
+_CV2_FONT = cv2.FONT_HERSHEY_SIMPLEX
+_CV2_FONT_SCALE = 0.4
+_CV2_THICKNESS = 1
+_CV2_BASELINE_OFFSET = 10  # putText positions text by its baseline, PIL by its top
+
+def get_overlay_layout(metrics, confidence_factors):
+    """
+    Get the cache key describing which overlay lines are present.
+
+    Args:
+        metrics (dict): Change metrics with region_metrics
+        confidence_factors (dict): Confidence factors from detection info
+
+    Returns:
+        tuple: Region names and confidence factor names, in display order
+    """
+    return (
+        tuple(metrics['region_metrics'].keys()),
+        tuple(confidence_factors.keys())
+    )
+
+def build_overlay_lines(layout):
+    """
+    Lay out the static overlay lines below the status line.
+
+    Args:
+        layout (tuple): Layout from get_overlay_layout
+
+    Returns:
+        list: (y, label, has_value) tuples; has_value marks lines followed by a number
+    """
+    region_names, factor_names = layout
+    lines = []
+    y = TEXT_Y + LINE_HEIGHT * 2
+
+    # Detailed metrics
+    for label in ("Pixel Change: ", "Mean Luminance: ", "Max Luminance: ", "Threshold: "):
+        lines.append((y, label, True))
+        y += LINE_HEIGHT
+
+    # Region analysis, after an empty line
+    y += LINE_HEIGHT
+    lines.append((y, "Region Analysis:", False))
+    y += LINE_HEIGHT
+    for region in region_names:
+        lines.append((y, f"{region.capitalize()}: ", True))
+        y += LINE_HEIGHT
+
+    # Confidence breakdown, after an empty line
+    if factor_names:
+        y += LINE_HEIGHT
+        lines.append((y, "Confidence Breakdown:", False))
+        y += LINE_HEIGHT
+        for factor in factor_names:
+            lines.append((y, f"{factor.replace('_', ' ').capitalize()}: ", True))
+            y += LINE_HEIGHT
+        lines.append((y, "Consecutive Frames: ", True))
+
+    return lines
+
+def format_overlay_values(metrics, confidence_factors, consecutive_frames):
+    """
+    Format the per-frame value fields, in the order of build_overlay_lines.
+
+    Args:
+        metrics (dict): Change metrics
+        confidence_factors (dict): Confidence factors from detection info
+        consecutive_frames (int): Consecutive owl frames
+
+    Returns:
+        list: Value strings
+    """
+    values = [
+        f"{metrics['pixel_change_ratio']*100:.1f}%",
+        f"{metrics['mean_luminance']:.1f}",
+        f"{metrics['max_luminance']:.1f}",
+        f"{metrics['threshold_used']}"
+    ]
+    values.extend(f"{region['mean_luminance']:.1f}" for region in metrics['region_metrics'].values())
+    if confidence_factors:
+        values.extend(f"{value:.1f}%" for value in confidence_factors.values())
+        values.append(f"{consecutive_frames}")
+    return values
+
+class OverlayLayer:
+    """
+    Pre-rendered labels for one image size and layout.
+
+    Attributes:
+        pixels (numpy.ndarray): HxWx3 uint8 label colors
+        mask (numpy.ndarray): HxW bool, True where a label pixel was drawn
+        value_positions (list): (x, y) of each value field
+    """
+
+    def __init__(self, pixels, mask, value_positions):
+        self.pixels = pixels
+        self.mask = mask
+        self.value_positions = value_positions
+
+class OverlayRenderer:
+    """Status overlay renderer with cached label layers."""
+
+    def __init__(self, backend="pil"):
+        """
+        Initialize the renderer.
+
+        Args:
+            backend (str): "pil" or "opencv"
+        """
+        if backend not in OVERLAY_BACKENDS:
+            raise ValueError(f"Unsupported overlay backend: {backend}")
+        self.backend = backend
+        self.layers = {}
+        self.lock = threading.Lock()
+
+    def _text_width(self, draw, text):
+        if self.backend == "opencv":
+            (width, _), _ = cv2.getTextSize(text, _CV2_FONT, _CV2_FONT_SCALE, _CV2_THICKNESS)
+            return width
+        return draw.textlength(text)
+
+    def _draw_text(self, target, position, text, color):
+        """Draw text at a top-left position on a PIL ImageDraw (pil) or RGB array (opencv)."""
+        x, y = position
+        if self.backend == "opencv":
+            cv2.putText(
+                target,
+                text,
+                (int(x), int(y) + _CV2_BASELINE_OFFSET),
+                _CV2_FONT,
+                _CV2_FONT_SCALE,
+                ImageColor.getrgb(color),
+                _CV2_THICKNESS,
+                cv2.LINE_AA
+            )
+        else:
+            target.text((x, y), text, fill=color)
+
+    def _build_layer(self, size, layout):
+        """Draw the static labels of a layout onto a black canvas."""
+        canvas = Image.new("RGB", size)
+        draw = ImageDraw.Draw(canvas)
+        pixels = np.asarray(canvas).copy() if self.backend == "opencv" else None
+
+        value_positions = []
+        for y, label, has_value in build_overlay_lines(layout):
+            self._draw_text(pixels if pixels is not None else draw, (TEXT_X, y), label, LABEL_COLOR)
+            if has_value:
+                value_positions.append((TEXT_X + self._text_width(draw, label), y))
+
+        if pixels is None:
+            pixels = np.asarray(canvas)
+        mask = pixels.any(axis=2)
+        return OverlayLayer(pixels, mask, value_positions)
+
+    def get_layer(self, size, layout):
+        """
+        Get the cached label layer for an image size and layout, building it on first use.
+
+        Args:
+            size (tuple): (width, height)
+            layout (tuple): Layout from get_overlay_layout
+
+        Returns:
+            OverlayLayer: Label layer
+        """
+        key = (size, layout)
+        with self.lock:
+            layer = self.layers.get(key)
+        if layer is None:
+            layer = self._build_layer(size, layout)
+            with self.lock:
+                self.layers[key] = layer
+            logger.debug(f"Built status overlay layer for {size[0]}x{size[1]} image")
+        return layer
+
+    def render(self, image, metrics, detection_info=None, is_test=False):
+        """
+        Draw the status overlay onto a copy of an image.
+
+        Args:
+            image (PIL.Image or numpy.ndarray): RGB image to add the overlay to
+            metrics (dict): Metrics dictionary
+            detection_info (dict): Detection info including owl confidence
+            is_test (bool): Whether this is a test image
+
+        Returns:
+            PIL.Image: Image with overlay added
+        """
+        # Get confidence from detection info
+        owl_confidence = 0.0
+        consecutive_frames = 0
+        confidence_factors = {}
+        is_owl_detected = False
+
+        if detection_info:
+            owl_confidence = detection_info.get("owl_confidence", 0.0)
+            consecutive_frames = detection_info.get("consecutive_owl_frames", 0)
+            confidence_factors = detection_info.get("confidence_factors", {})
+            is_owl_detected = detection_info.get("is_owl_present", False)
+
+        # Determine detection status with confidence
+        if is_owl_detected:
+            status_text = f"OWL DETECTED ({owl_confidence:.1f}%)"
+            status_color = "red"
+        else:
+            status_text = f"NO OWL DETECTED ({owl_confidence:.1f}%)"
+            status_color = "green"
+
+        if is_test:
+            status_text = f"TEST MODE - {status_text}"
+
+        # Copy the image and stamp the cached labels onto it
+        pixels = np.array(image, dtype=np.uint8)
+        height, width = pixels.shape[:2]
+        layer = self.get_layer((width, height), get_overlay_layout(metrics, confidence_factors))
+        np.copyto(pixels, layer.pixels, where=layer.mask[:, :, np.newaxis])
+
+        values = format_overlay_values(metrics, confidence_factors, consecutive_frames)
+
+        if self.backend == "opencv":
+            self._draw_text(pixels, (TEXT_X, TEXT_Y), status_text, status_color)
+            for position, value in zip(layer.value_positions, values):
+                self._draw_text(pixels, position, value, LABEL_COLOR)
+            return Image.fromarray(pixels)
+
+        img_with_text = Image.fromarray(pixels)
+        draw = ImageDraw.Draw(img_with_text)
+        self._draw_text(draw, (TEXT_X, TEXT_Y), status_text, status_color)
+        for position, value in zip(layer.value_positions, values):
+            self._draw_text(draw, position, value, LABEL_COLOR)
+        return img_with_text
+
+# Shared renderer, created on first use
+_overlay_renderer = None
+_overlay_renderer_lock = threading.Lock()
+
+def get_overlay_renderer():
+    """
+    Get the shared overlay renderer for the backend set in OWL_OVERLAY_BACKEND.
+
+    Returns:
+        OverlayRenderer: The shared renderer
+    """
+    global _overlay_renderer
+    with _overlay_renderer_lock:
+        if _overlay_renderer is None:
+            backend = os.getenv('OWL_OVERLAY_BACKEND', 'pil').lower()
+            if backend not in OVERLAY_BACKENDS:
+                logger.warning(f"Unknown overlay backend {backend}, using pil")
+                backend = "pil"
+            _overlay_renderer = OverlayRenderer(backend)
+        return _overlay_renderer
+
+if __name__ == "__main__":
+    try:
+        import time
+
+        logger.info("Benchmarking status overlay rendering...")
+
+        metrics = {
+            'pixel_change_ratio': 0.123,
+            'mean_luminance': 14.2,
+            'max_luminance': 212.0,
+            'threshold_used': 40,
+            'region_metrics': {
+                'top': {'mean_luminance': 8.1},
+                'middle': {'mean_luminance': 22.7},
+                'bottom': {'mean_luminance': 11.9}
+            }
+        }
+        detection_info = {
+            'is_owl_present': True,
+            'owl_confidence': 72.4,
+            'consecutive_owl_frames': 3,
+            'confidence_factors': {
+                'shape_confidence': 30.0,
+                'motion_confidence': 22.5,
+                'temporal_confidence': 12.0,
+                'camera_confidence': 7.9
+            }
+        }
+
+        rng = np.random.default_rng(0)
+        image = Image.fromarray(rng.integers(0, 64, (341, 644, 3), dtype=np.uint8))
+        iterations = 200
+
+        for backend in OVERLAY_BACKENDS:
+            renderer = OverlayRenderer(backend)
+            renderer.render(image, metrics, detection_info)  # Build the layer
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                renderer.render(image, metrics, detection_info)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / iterations
+            logger.info(f"{backend:7s} cached overlay: {elapsed_ms:.3f} ms/frame")
+
+        # The original approach: copy and draw every line with ImageDraw.text
+        start = time.perf_counter()
+        for _ in range(iterations):
+            copy = image.copy()
+            draw = ImageDraw.Draw(copy)
+            draw.text((TEXT_X, TEXT_Y), "OWL DETECTED (72.4%)", fill="red")
+            lines = build_overlay_lines(get_overlay_layout(metrics, detection_info['confidence_factors']))
+            values = iter(format_overlay_values(metrics, detection_info['confidence_factors'], 3))
+            for y, label, has_value in lines:
+                draw.text((TEXT_X, y), label + (next(values) if has_value else ""), fill=LABEL_COLOR)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / iterations
+        logger.info(f"full redraw:            {elapsed_ms:.3f} ms/frame")
+
+    except Exception as e:
+        logger.error(f"Status overlay benchmark failed: {e}")
+        raise
@@ -0,0 +1,659 @@
+# File: utilities/supabase_client.py
+# Purpose: Create the database and storage client, either Supabase or a local stand-in
+#
+# database_utils, push_to_supabase and upload_images_to_supabase each used to create
+# their own Supabase client at import and raise without credentials, so nothing
+# could run on a disconnected machine. They now share the client from
+# get_supabase_client(). With OWL_DATABASE_BACKEND=local it is a LocalSupabaseClient:
+# the same table()/storage/rpc() call chains the code already uses, backed by SQLite
+# and plain files under OWL_LOCAL_DATABASE_DIR, so the whole loop can run offline and
+# write throughput can be measured (see the benchmark at the bottom of this file).
+#
+# Local rows are stored as JSON per table (owl_activity_log, alerts, subscribers,
+# base_images_log, reports, camera_settings, or any other name on first use), with
+# Supabase-style generated id and created_at. Because rows are schemaless, each
+# table's columns are declared in LOCAL_TABLE_COLUMNS and reported by
+# get_table_columns(), so optional-column checks work before any row exists. Buckets are directories laid out like
+# Supabase public URLs, so get_supabase_url() + "/storage/v1/object/public/<bucket>/<path>"
+# is a file:// URL of the uploaded file.
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+from utilities.logging_utils import get_logger
+from utilities.constants import LOCAL_DATABASE_DIR, ALERT_PRIORITIES
+
+# Initialize logger
+logger = get_logger()
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Alert type column prefixes of owl_activity_log (e.g. "owl_in_box")
+_ALERT_FIELDS = [alert_type.lower().replace(" ", "_") for alert_type in ALERT_PRIORITIES]
+
+# Columns of the tables created up front, matching the Supabase schema the code
+# writes and checks (see check_column_exists); other tables are created on first use
+LOCAL_TABLE_COLUMNS = {
+    "owl_activity_log": [
+        "id", "created_at", "lighting_condition", "base_image_age_seconds",
+        *_ALERT_FIELDS,
+        *[f"pixel_change_{field}" for field in _ALERT_FIELDS],
+        *[f"luminance_change_{field}" for field in _ALERT_FIELDS],
+        *[f"{field}_image_comparison_url" for field in _ALERT_FIELDS],
+        "multiple_owls", "owl_count", "owl_confidence_score", "consecutive_owl_frames",
+        "alert_priority", "confidence_threshold_used", "confidence_factors",
+        "event_clip_url", "event_key"
+    ],
+    "alerts": [
+        "id", "created_at", "alert_id", "alert_type", "alert_priority", "alert_sent",
+        "alert_sent_at", "base_cooldown_minutes", "cooldown_ends_at", "suppressed",
+        "trigger_condition", "owl_activity_log_id", "email_recipients_count",
+        "sms_recipients_count", "previous_alert_id", "priority_override",
+        "owl_confidence_score", "consecutive_owl_frames", "confidence_breakdown",
+        "threshold_used", "comparison_image_url"
+    ],
+    "subscribers": [
+        "id", "created_at", "name", "email", "notification_type",
+        "owl_locations", "is_admin"
+    ],
+    "base_images_log": [
+        "id", "created_at", "camera_name", "lighting_condition", "base_image_url",
+        "light_level", "capture_time", "capture_date", "notes"
+    ],
+    "reports": [
+        "id", "created_at", "report_id", "report_type", "is_manual", "recipient_count",
+        "summary_data", "start_timestamp", "end_timestamp"
+    ],
+    "camera_settings": [
+        "id", "created_at", "camera_name", "owl_confidence_threshold", "last_updated"
+    ]
+}
+
+# Tables created up front
+LOCAL_TABLES = list(LOCAL_TABLE_COLUMNS)
+
+# Expression indexes for lookups the pipeline repeats (upserts, cooldown checks)
+LOCAL_INDEXES = {
+    "owl_activity_log": ["event_key", "created_at"],
+    "alerts": ["alert_id", "alert_type"]
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+class LocalResponse:
+    """Query result with the attributes callers read from Supabase responses."""
+
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data)
+
+def _column_sql(column):
+    """Get the SQL expression of a row column (names are validated, so it can be inlined)."""
+    if not _IDENTIFIER.match(column):
+        raise ValueError(f"Invalid column name: {column}")
+    return f"json_extract(data, '$.{column}')"
+
+def _filter_value(value):
+    """Convert a value from a PostgREST filter string, where everything is text, to a number if it is one."""
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+class LocalQuery:
+    """
+    Chainable query on a local table, mirroring the PostgREST builder calls used
+    in this repo: select/insert/upsert/update/delete, eq/neq/gt/gte/lt/lte,
+    like/ilike/in_/or_ filters, order, limit and range.
+    """
+
+    _OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE", "ilike": "LIKE"}
+
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.action = "select"
+        self.columns = "*"
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []
+        self.params = []
+        self.orders = []
+        self.row_limit = None
+        self.row_offset = 0
+
+    # Actions
+
+    def select(self, columns="*", **kwargs):
+        self.action = "select"
+        self.columns = columns
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action = "insert"
+        self.payload = rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        self.action = "upsert"
+        self.payload = rows
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, values, **kwargs):
+        self.action = "update"
+        self.payload = values
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    # Filters
+
+    def _condition(self, column, operator, value):
+        return f"{_column_sql(column)} {self._OPERATORS[operator]} ?", [value]
+
+    def _add_filter(self, column, operator, value):
+        condition, params = self._condition(column, operator, value)
+        self.filters.append(condition)
+        self.params.extend(params)
+        return self
+
+    def eq(self, column, value):
+        return self._add_filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._add_filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._add_filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._add_filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._add_filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._add_filter(column, "lte", value)
+
+    def like(self, column, pattern):
+        return self._add_filter(column, "like", pattern)
+
+    def ilike(self, column, pattern):
+        # SQLite LIKE is already case-insensitive for ASCII
+        return self._add_filter(column, "ilike", pattern)
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.filters.append("0")
+            return self
+        self.filters.append(f"{_column_sql(column)} IN ({','.join('?' * len(values))})")
+        self.params.extend(values)
+        return self
+
+    def or_(self, filters):
+        """
+        Add a PostgREST-style OR filter, e.g. "owl_locations.ilike.%Owl%,camera.eq.Upper".
+        """
+        conditions = []
+        for part in filters.split(","):
+            column, operator, value = part.split(".", 2)
+            condition, params = self._condition(column, operator, _filter_value(value))
+            conditions.append(condition)
+            self.params.extend(params)
+        self.filters.append(f"({' OR '.join(conditions)})")
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count, **kwargs):
+        self.row_limit = int(count)
+        return self
+
+    def range(self, start, end, **kwargs):
+        """Select rows start through end (inclusive), like PostgREST ranges."""
+        self.row_offset = int(start)
+        self.row_limit = int(end) - int(start) + 1
+        return self
+
+    # Execution
+
+    def _where(self):
+        return (" WHERE " + " AND ".join(self.filters)) if self.filters else ""
+
+    def _project(self, row):
+        if self.columns in (None, "*"):
+            return row
+        columns = [column.strip() for column in self.columns.split(",")]
+        return {column: row.get(column) for column in columns}
+
+    def execute(self):
+        """
+        Run the query.
+
+        Returns:
+            LocalResponse: Rows selected, inserted, updated or deleted
+        """
+        with self.client.lock:
+            table = self.client.ensure_table(self.table_name)
+            if self.action == "select":
+                return LocalResponse([self._project(row) for row in self._select(table)])
+            if self.action == "insert":
+                rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                data = [self.client.insert_row(table, row) for row in rows]
+            elif self.action == "upsert":
+                rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                data = [self._upsert_row(table, row) for row in rows]
+            elif self.action == "update":
+                data = []
+                for row in self._select(table):
+                    row.update(self.payload)
+                    self.client.write_row(table, row)
+                    data.append(row)
+            else:
+                data = self._select(table)
+                self.client.connection.executemany(
+                    f"DELETE FROM {table} WHERE id = ?", [(row["id"],) for row in data]
+                )
+            self.client.connection.commit()
+            return LocalResponse(data)
+
+    def _select(self, table):
+        sql = f"SELECT id, data FROM {table}{self._where()}"
+        params = list(self.params)
+        if self.orders:
+            sql += " ORDER BY " + ", ".join(
+                f"{_column_sql(column)} {'DESC' if desc else 'ASC'}" for column, desc in self.orders
+            )
+        else:
+            sql += " ORDER BY id"
+        if self.row_limit is not None or self.row_offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([self.row_limit if self.row_limit is not None else -1, self.row_offset])
+        return [json.loads(data) for _, data in self.client.connection.execute(sql, params).fetchall()]
+
+    def _upsert_row(self, table, row):
+        keys = [key.strip() for key in (self.on_conflict or "id").split(",")]
+        if all(row.get(key) is not None for key in keys):
+            conditions = " AND ".join(f"{_column_sql(key)} = ?" for key in keys)
+            existing = self.client.connection.execute(
+                f"SELECT data FROM {table} WHERE {conditions} LIMIT 1", [row[key] for key in keys]
+            ).fetchone()
+            if existing:
+                merged = json.loads(existing[0])
+                merged.update(row)
+                self.client.write_row(table, merged)
+                return merged
+        return self.client.insert_row(table, row)
+
+class LocalBucket:
+    """Files of one storage bucket, mirroring the Supabase storage calls used in this repo."""
+
+    def __init__(self, root_dir, base_url, bucket):
+        self.bucket_dir = os.path.join(root_dir, "storage", "v1", "object", "public", bucket)
+        self.base_url = base_url
+        self.bucket = bucket
+
+    def _full_path(self, path):
+        full_path = os.path.normpath(os.path.join(self.bucket_dir, path))
+        if not full_path.startswith(os.path.normpath(self.bucket_dir) + os.sep):
+            raise ValueError(f"Invalid storage path: {path}")
+        return full_path
+
+    def upload(self, path, file, file_options=None):
+        """
+        Store a file. Like Supabase, an existing object is an error unless
+        file_options has "x-upsert": "true".
+
+        Args:
+            path (str): Object path within the bucket
+            file (bytes, str or file object): Content, or a local file path
+            file_options (dict, optional): Upload options
+
+        Returns:
+            LocalResponse: The stored object's key
+        """
+        full_path = self._full_path(path)
+        upsert = str((file_options or {}).get("x-upsert", "false")).lower() == "true"
+        if os.path.exists(full_path) and not upsert:
+            raise FileExistsError(f"The resource already exists: {self.bucket}/{path}")
+
+        if hasattr(file, "read"):
+            content = file.read()
+        elif isinstance(file, (bytes, bytearray)):
+            content = bytes(file)
+        else:
+            with open(file, "rb") as source:
+                content = source.read()
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temp_path = f"{full_path}.tmp"
+        with open(temp_path, "wb") as target:
+            target.write(content)
+        os.replace(temp_path, full_path)
+        return LocalResponse([{"Key": f"{self.bucket}/{path}"}])
+
+    def list(self, path=None, options=None):
+        """
+        List the objects and folders directly under a folder.
+
+        Args:
+            path (str, optional): Folder within the bucket
+
+        Returns:
+            list: Entries with name and size metadata (empty if the folder doesn't exist)
+        """
+        folder = self._full_path(path) if path else self.bucket_dir
+        if not os.path.isdir(folder):
+            return []
+        entries = []
+        with os.scandir(folder) as scan:
+            for entry in scan:
+                if entry.name.endswith(".tmp"):
+                    continue
+                metadata = {"size": entry.stat().st_size} if entry.is_file() else None
+                entries.append({"name": entry.name, "metadata": metadata})
+        return sorted(entries, key=lambda entry: entry["name"])
+
+    def remove(self, paths):
+        """
+        Delete objects.
+
+        Args:
+            paths (list): Object paths within the bucket
+
+        Returns:
+            list: Deleted object names
+        """
+        removed = []
+        for path in paths:
+            try:
+                os.remove(self._full_path(path))
+                removed.append({"name": path})
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def get_public_url(self, path):
+        """Get the object's URL (a file:// URL for the local store)."""
+        return f"{self.base_url}/storage/v1/object/public/{self.bucket}/{path}"
+
+class LocalStorage:
+    """Storage namespace of the local client."""
+
+    def __init__(self, root_dir, base_url):
+        self.root_dir = root_dir
+        self.base_url = base_url
+
+    def from_(self, bucket):
+        return LocalBucket(self.root_dir, self.base_url, bucket)
+
+class LocalRpcCall:
+    """Pending call of a registered local database function."""
+
+    def __init__(self, function, params):
+        self.function = function
+        self.params = params
+
+    def execute(self):
+        return LocalResponse(self.function(**self.params))
+
+class LocalSupabaseClient:
+    """
+    Offline stand-in for the Supabase client: SQLite tables and a filesystem bucket store.
+
+    Attributes:
+        storage (LocalStorage): Bucket access via storage.from_(bucket)
+    """
+
+    def __init__(self, root_dir, base_url=None):
+        """
+        Open (or create) the local database and buckets.
+
+        Args:
+            root_dir (str): Directory holding database.sqlite3 and storage/
+            base_url (str, optional): URL prefix of stored objects (a file:// URL of root_dir by default)
+        """
+        os.makedirs(root_dir, exist_ok=True)
+        self.root_dir = root_dir
+        self.base_url = base_url or Path(root_dir).resolve().as_uri()
+        self.storage = LocalStorage(root_dir, self.base_url)
+        self.functions = {}
+        self.tables = set()
+
+        # Calls come from camera threads, the activity log flusher and alert threads
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(os.path.join(root_dir, "database.sqlite3"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock:
+            for table_name in LOCAL_TABLES:
+                self.ensure_table(table_name)
+            self.connection.commit()
+
+        # Local versions of the database functions in migrations/
+        self.register_function("get_alert_statistics", self._get_alert_statistics)
+
+    def ensure_table(self, table_name):
+        """
+        Create a table on first use. Caller holds the lock.
+
+        Args:
+            table_name (str): Table name
+
+        Returns:
+            str: The validated table name
+        """
+        if table_name not in self.tables:
+            if not _IDENTIFIER.match(table_name):
+                raise ValueError(f"Invalid table name: {table_name}")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)"
+            )
+            for column in LOCAL_INDEXES.get(table_name, []):
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table_name}_{column} ON {table_name} ({_column_sql(column)})"
+                )
+            self.tables.add(table_name)
+        return table_name
+
+    def insert_row(self, table_name, row):
+        """Insert a row, generating id and created_at like Supabase. Caller holds the lock."""
+        row = dict(row)
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        cursor = self.connection.execute(f"INSERT INTO {table_name} (data) VALUES ('{{}}')")
+        row["id"] = cursor.lastrowid
+        self.write_row(table_name, row)
+        return row
+
+    def write_row(self, table_name, row):
+        """Replace a stored row's data. Caller holds the lock."""
+        self.connection.execute(
+            f"UPDATE {table_name} SET data = ? WHERE id = ?", (json.dumps(row, default=str), row["id"])
+        )
+
+    def table(self, table_name):
+        """Start a query on a table."""
+        return LocalQuery(self, table_name)
+
+    def get_table_columns(self, table_name):
+        """
+        Get a table's columns: its declared schema plus any other column stored in its rows.
+
+        Args:
+            table_name (str): Table name
+
+        Returns:
+            list: Column names (empty for an undeclared table without rows)
+        """
+        columns = list(LOCAL_TABLE_COLUMNS.get(table_name, []))
+        with self.lock:
+            self.ensure_table(table_name)
+            stored = self.connection.execute(
+                f"SELECT DISTINCT key FROM {table_name}, json_each({table_name}.data)"
+            ).fetchall()
+        columns += [column for (column,) in stored if column not in columns]
+        return columns
+
+    def register_function(self, name, function):
+        """
+        Provide a local implementation of a database function for rpc().
+
+        Args:
+            name (str): Function name
+            function (callable): Called with the rpc params as keyword arguments,
+                returns a list of result rows
+        """
+        self.functions[name] = function
+
+    def _get_alert_statistics(self, start_time):
+        """
+        Local version of the get_alert_statistics database function
+        (migrations/002_get_alert_statistics.sql).
+
+        Args:
+            start_time (str): ISO start of the period
+
+        Returns:
+            list: Rows of alert_type, alert_count and average_confidence, for
+                alert types with at least one row
+        """
+        created_at = _column_sql("created_at")
+        confidence = _column_sql("owl_confidence_score")
+        queries = [
+            f"SELECT ?, COUNT(*), AVG({confidence}) FROM owl_activity_log "
+            f"WHERE {created_at} > ? AND {_column_sql(field)} = 1"
+            for field in _ALERT_FIELDS
+        ]
+        params = []
+        for alert_type in ALERT_PRIORITIES:
+            params += [alert_type, start_time]
+
+        with self.lock:
+            rows = self.connection.execute(" UNION ALL ".join(queries), params).fetchall()
+        return [
+            {"alert_type": alert_type, "alert_count": count, "average_confidence": average}
+            for alert_type, count, average in rows if count
+        ]
+
+    def rpc(self, name, params=None):
+        """Call a registered local database function."""
+        if name not in self.functions:
+            raise NotImplementedError(f"Database function {name} is not available in the local database")
+        return LocalRpcCall(self.functions[name], params or {})
+
+def get_database_backend():
+    """
+    Get the configured database backend.
+
+    Returns:
+        str: "supabase" (the default) or "local"
+    """
+    return os.getenv('OWL_DATABASE_BACKEND', 'supabase').lower()
+
+def get_supabase_url():
+    """
+    Get the base URL that storage object URLs are built from.
+
+    Returns:
+        str: SUPABASE_URL, or a file:// URL of the local database directory
+    """
+    if get_database_backend() == "local":
+        return get_supabase_client().base_url
+    return os.getenv("SUPABASE_URL")
+
+# Shared client, created on first use
+_supabase_client = None
+_supabase_client_lock = threading.Lock()
+
+def get_supabase_client():
+    """
+    Get the shared database and storage client for the configured backend.
+
+    Returns:
+        supabase.Client or LocalSupabaseClient: The shared client
+
+    Raises:
+        ValueError: If the Supabase backend is selected and credentials are missing
+    """
+    global _supabase_client
+    with _supabase_client_lock:
+        if _supabase_client is None:
+            if get_database_backend() == "local":
+                _supabase_client = LocalSupabaseClient(LOCAL_DATABASE_DIR)
+                logger.info(f"Using local database at {LOCAL_DATABASE_DIR}")
+            else:
+                supabase_url = os.getenv("SUPABASE_URL")
+                supabase_key = os.getenv("SUPABASE_KEY")
+                if not all([supabase_url, supabase_key]):
+                    error_msg = "Supabase credentials are missing. Check the .env file."
+                    logger.error(error_msg)
+                    raise ValueError(error_msg)
+
+                import supabase
+                try:
+                    _supabase_client = supabase.create_client(supabase_url, supabase_key)
+                    logger.info("Supabase client initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize Supabase client: {e}")
+                    raise
+        return _supabase_client
+
+if __name__ == "__main__":
+    try:
+        import argparse
+        import tempfile
+        import time
+        from utilities.activity_log_spool import ActivityLogSpool
+
+        parser = argparse.ArgumentParser(description="Benchmark activity log writes against the local database")
+        parser.add_argument("--cameras", type=int, default=16, help="Number of simulated cameras")
+        parser.add_argument("--hz", type=float, default=10.0, help="Detections per second per camera")
+        parser.add_argument("--seconds", type=float, default=10.0, help="Simulated duration")
+        args = parser.parse_args()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client = LocalSupabaseClient(temp_dir)
+
+            def _insert_batch(rows):
+                return client.table("owl_activity_log").upsert(rows, on_conflict="event_key").execute().data
+
+            spool = ActivityLogSpool(os.path.join(temp_dir, "spool.sqlite3"), _insert_batch, batch_size=50)
+            total = int(args.cameras * args.hz * args.seconds)
+            logger.info(f"Writing {total} activity log rows ({args.cameras} cameras at {args.hz} Hz for {args.seconds} s)...")
+
+            start = time.perf_counter()
+            for i in range(total):
+                camera = i % args.cameras
+                spool.enqueue({
+                    "event_key": f"Camera {camera}|Owl In Box|{i // args.cameras}",
+                    "owl_in_box": 1,
+                    "owl_confidence_score": float(i % 100),
+                    "pixel_change_owl_in_box": 12.5
+                })
+            enqueue_seconds = time.perf_counter() - start
+            spool.flush()
+            total_seconds = time.perf_counter() - start
+
+            stored = client.table("owl_activity_log").select("id").execute().count
+            logger.info(
+                f"Enqueued at {total / enqueue_seconds:.0f} rows/s, stored {stored} rows at "
+                f"{total / total_seconds:.0f} rows/s (needed {args.cameras * args.hz:.0f} rows/s)"
+            )
+
+    except Exception as e:
+        logger.error(f"Local database benchmark failed: {e}")
+        raise